@@ -0,0 +1,151 @@
+import csv
+import os
+import threading
+import config
+
+# Trie node key marking "an alias ends here" (value = (target token list, matches inside a longer phrase))
+_END = "__target__"
+
+
+class AliasExpander:
+    """
+    Longest-match alias expansion over a token trie.
+    "red servo" -> "red servo motor", "where is the dso" -> "where is the oscilloscope".
+    Aliases live in a CSV data file (alias,target,match) and are reloaded when the file changes.
+    match 'phrase' (the default) applies only to the whole query; 'any' also inside it.
+    """
+    def __init__(self, path=None):
+        self.path = path if path else config.ALIASES_PATH
+        self._lock = threading.Lock()
+        self._root = {}
+        self._mtime = None
+        self.alias_count = 0
+        self.reload()
+
+    def reload(self):
+        """
+        (Re)builds the trie from the data file.
+        The new trie is swapped in atomically, so concurrent expand() calls never see a half-built table.
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                print(f"Warning: Alias file not found at {self.path}. Alias expansion disabled.")
+                self._root, self._mtime, self.alias_count = {}, None, 0
+                return False
+
+            root = {}
+            count = 0
+            try:
+                with open(self.path, newline="", encoding="utf-8") as f:
+                    for row in csv.reader(f):
+                        # Skip blanks, comments (# ...) and the header
+                        if not row or row[0].strip().startswith("#"): continue
+                        if len(row) < 2: continue
+                        alias = row[0].lower().split()
+                        target = row[1].lower().split()
+                        if not alias or not target or alias == ["alias"]: continue
+                        anywhere = len(row) > 2 and row[2].strip().lower() == "any"
+
+                        node = root
+                        for tok in alias:
+                            node = node.setdefault(tok, {})
+                        node[_END] = (target, anywhere)
+                        count += 1
+            except Exception as e:
+                print(f"Error loading aliases: {e}")
+                return False
+
+            self._root, self._mtime, self.alias_count = root, mtime, count
+            print(f"Loaded {count} search aliases from {os.path.basename(self.path)}.")
+            return True
+
+    def reload_if_changed(self):
+        """
+        Cheap mtime check (one stat call) so edits to the data file apply without a restart.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime != self._mtime:
+            return self.reload()
+        return False
+
+    def expand(self, text):
+        """
+        Replaces every alias in the phrase with its DB term, preferring the longest alias
+        at each position (leftmost-longest, single left-to-right pass over the tokens).
+        Whole-phrase aliases only match the entire query ("display", not "seven segment display").
+        Expansions are not re-expanded, so cyclic entries (lipo <-> lithium polymer) are safe.
+        """
+        if not text: return text
+        self.reload_if_changed()
+
+        root = self._root # Local ref: a concurrent reload swaps the whole trie
+        tokens = text.split()
+        if not root: return " ".join(tokens)
+
+        out = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            # Walk the trie as far as the phrase allows, remembering the last complete alias
+            node = root
+            match_end, target = -1, None
+            j = i
+            while j < n and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node and (node[_END][1] or (i == 0 and j == n)):
+                    match_end, target = j, node[_END][0]
+
+            if target is None:
+                out.append(tokens[i])
+                i += 1
+                continue
+
+            # Skip if the phrase already spells out the target around the alias
+            # ("raspberry pi" must not become "raspberry raspberry pi", nor "servo motor" -> "servo motor motor")
+            covered_end = self._covered_end(tokens, i, match_end, target)
+            if covered_end is not None:
+                out.extend(tokens[i:covered_end])
+                i = covered_end
+            else:
+                out.extend(target)
+                i = match_end
+
+        return " ".join(out)
+
+    @staticmethod
+    def _covered_end(tokens, start, end, target):
+        """
+        If the alias tokens[start:end] sit inside an occurrence of 'target' in the phrase,
+        returns the index where that occurrence ends. Otherwise None.
+        """
+        alias = tokens[start:end]
+        span = len(alias)
+        for offset in range(len(target) - span + 1):
+            if target[offset:offset + span] != alias: continue
+            t_start = start - offset
+            t_end = t_start + len(target)
+            if t_start >= 0 and tokens[t_start:t_end] == target:
+                return t_end
+        return None
+
+
+# Shared instance (built on first use)
+_EXPANDER = None
+
+def get_alias_expander():
+    global _EXPANDER
+    if _EXPANDER is None:
+        _EXPANDER = AliasExpander()
+    return _EXPANDER
+
+def expand_aliases(text):
+    return get_alias_expander().expand(text)
+
+def reload_aliases():
+    return get_alias_expander().reload()
@@ -1,16 +1,21 @@
 import os
+import sys
 # Suppress ONNX Runtime Warnings (GPU discovery on CPU-only devices)
 os.environ["ORT_LOGGING_LEVEL"] = "3" 
 import ctypes
+import re
+import threading
 import config
-import dll_fix # Ensure DLLs are loaded
-
-from faster_whisper import WhisperModel
 import time
+# faster_whisper and sounddevice are imported on first use (see VoiceListener / AudioRecorder)
 
 
 class VoiceListener:
     def __init__(self, dynamic_vocab=None):
+        if not config.PI_MODE:
+            import dll_fix # Ensure CUDA DLLs are loaded (Windows). Imports torch, so desktop mode only.
+        from faster_whisper import WhisperModel
+
         if config.PI_MODE:
             print(f"ASR Mode: LITE (CPU, Model: {config.WHISPER_MODEL_SIZE})")
             self.model = WhisperModel(config.WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
@@ -55,28 +60,185 @@ class VoiceListener:
         print(f"ASR Prompt: {self.vocab_prompt[:100]}...") # Debug print
 
 
-    def transcribe(self, audio_path):
+    def transcribe(self, audio):
         """
-        Transcribes the given audio file path.
+        Transcribes a float32 mono 16 kHz NumPy buffer (AudioRecorder.record) or an audio file path.
         Returns the text string.
         """
-        if not os.path.exists(audio_path):
-            print(f"Audio file not found: {audio_path}")
+        if isinstance(audio, str):
+            if not os.path.exists(audio):
+                print(f"Audio file not found: {audio}")
+                return ""
+        elif audio is None or len(audio) == 0:
             return ""
 
+        full_text = ""
+        for end, text in self._decode(audio, config.BEAM_SIZE):
+            full_text += text + " "
+            
+        return full_text.strip()
+
+    def _decode(self, audio, beam_size, prefix=None):
+        """
+        Runs Whisper and returns the segments as (end seconds, text).
+        'prefix' forces the start of the transcript (words already known to be right).
+        """
         segments, info = self.model.transcribe(
-            audio_path, 
-            beam_size=config.BEAM_SIZE,
+            audio, 
+            beam_size=beam_size,
             language="en", 
             initial_prompt=self.vocab_prompt,
+            prefix=prefix,
             condition_on_previous_text=False # Better for short commands
         )
-        
-        full_text = ""
-        for segment in segments:
-            full_text += segment.text + " "
-            
-        return full_text.strip()
+        return [(segment.end, segment.text) for segment in segments]
+
+    def stream(self, on_partial=None):
+        """
+        Starts a PartialTranscriber: pass its feed to AudioRecorder.record(on_chunk=...),
+        then call finish() with the recording.
+        """
+        return PartialTranscriber(self, on_partial)
+
+
+def _same_words(a, b):
+    norm = lambda w: re.sub(r"[^\w]", "", w.lower())
+    return len(a) == len(b) and all(norm(x) == norm(y) for x, y in zip(a, b))
+
+
+class PartialTranscriber:
+    """
+    Decodes the live recording while the user is still speaking, so little ASR work
+    is left when they stop.
+
+    Every ASR_PARTIAL_STEP_SEC of new audio (once speech has started), the current
+    window is decoded again with a cheap beam. Words on which two consecutive
+    hypotheses agree are stable (local agreement) and are passed to on_partial,
+    which runs on the decoder thread. Once the window is longer than
+    ASR_PARTIAL_WINDOW_SEC, audio up to the end of the last fully stable segment is
+    dropped and its words are fixed.
+
+    finish() reuses that work: when the last hypothesis already covers the end of
+    speech and every word of it is stable, it is the result and no decode is run.
+    Otherwise the window is decoded once more at full beam, with the stable words
+    as a forced prefix.
+    """
+    def __init__(self, listener, on_partial=None):
+        self.listener = listener
+        self.on_partial = on_partial
+        self.sample_rate = config.SAMPLE_RATE
+        self.step = int(config.ASR_PARTIAL_STEP_SEC * self.sample_rate)
+        self.window = int(config.ASR_PARTIAL_WINDOW_SEC * self.sample_rate)
+        self.decodes = 0
+        self._lock = threading.Lock()
+        self._new_audio = threading.Event()
+        self._chunks = []
+        self._fed = 0 # Samples fed (positions in the recording)
+        self._offset = 0 # Recording position of the window start
+        self._speaking = False
+        self._done = [] # Words of audio slid out of the window
+        self._committed = [] # Stable words within the window
+        self._last = None # (words, segments, recording position decoded up to) of the newest hypothesis
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="asr-partial", daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk, speaking=True):
+        """
+        Next 16 kHz chunk of the recording; 'speaking' once the VAD has heard speech
+        (decoding silence only produces Whisper hallucinations).
+        """
+        if len(chunk) == 0: return
+        with self._lock:
+            self._chunks.append(chunk)
+            self._fed += len(chunk)
+            self._speaking = self._speaking or speaking
+        self._new_audio.set()
+
+    def _window(self):
+        with self._lock:
+            if len(self._chunks) > 1:
+                self._chunks = [np.concatenate(self._chunks)]
+            return (self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)), self._offset
+
+    def _run(self):
+        decoded_upto = 0
+        while not self._stop:
+            self._new_audio.wait(0.1)
+            self._new_audio.clear()
+            if self._stop or not self._speaking or self._fed - decoded_upto < self.step:
+                continue
+            audio, offset = self._window()
+            decoded_upto = offset + len(audio)
+            try:
+                self._hypothesis(audio, offset)
+            except Exception as e:
+                print(f"Partial transcription error: {e}")
+                return
+
+    def _hypothesis(self, audio, offset):
+        segments = self.listener._decode(audio, config.ASR_PARTIAL_BEAM_SIZE)
+        self.decodes += 1
+        words = " ".join(text.strip() for end, text in segments).split()
+        prev = self._last[0] if self._last else []
+        agree = 0
+        while agree < min(len(prev), len(words)) and _same_words(prev[agree:agree + 1], words[agree:agree + 1]):
+            agree += 1
+        n = len(self._committed)
+        if agree > n and _same_words(words[:n], self._committed):
+            self._committed = words[:agree]
+            if self.on_partial:
+                self.on_partial(" ".join(self._done + self._committed))
+        self._last = (words, segments, offset + len(audio))
+        if len(audio) > self.window:
+            self._slide(segments)
+
+    def _slide(self, segments):
+        """
+        Drops window audio up to the end of the last segment whose words are all stable.
+        """
+        cut, count, n = None, 0, 0
+        for end, text in segments:
+            n += len(text.split())
+            if n > len(self._committed): break
+            cut, count = end, n
+        if cut is None: return
+        drop = int(cut * self.sample_rate)
+        with self._lock:
+            self._chunks = [self._chunks[0][drop:]] if self._chunks else []
+            self._offset += drop
+        self._done += self._committed[:count]
+        self._committed = self._committed[count:]
+        words, segments, covered = self._last
+        self._last = (words[count:], [(end - cut, text) for end, text in segments if end > cut], covered)
+
+    def close(self):
+        self._stop = True
+        self._new_audio.set()
+        self._thread.join()
+
+    def finish(self, audio, speech_end=None):
+        """
+        Final transcript of the recording. 'audio' is what AudioRecorder.record returned;
+        'speech_end' its AudioRecorder.last_speech_end (recording position where speech ended).
+        """
+        self.close()
+        if audio is None or len(audio) == 0:
+            return ""
+        if self._last is None:
+            return self.listener.transcribe(audio) # Too short for a partial
+        words, segments, covered = self._last
+        if words and speech_end is not None and covered >= speech_end and len(self._committed) == len(words):
+            print(f"ASR: last partial covers the speech ({self.decodes} partial decodes); no final decode.")
+            return " ".join(self._done + words)
+
+        window, offset = self._window()
+        prefix = " ".join(self._committed) if self._committed else None
+        final = " ".join(text.strip() for end, text in self.listener._decode(window, config.BEAM_SIZE, prefix=prefix)).split()
+        if self._committed and not _same_words(final[:len(self._committed)], self._committed):
+            final = self._committed + final # Output without the forced prefix
+        print(f"ASR: final decode with {len(self._committed)} stable words as prefix ({self.decodes} partial decodes).")
+        return " ".join(self._done + final)
 
 # Note: We need a way to RECORD audio.
 # The user pipeline says: Voice Input -> ASR
@@ -84,8 +246,6 @@ class VoiceListener:
 # Putting it here for cohesion.
 
 # --- Audio Recorder (SoundDevice Version) ---
-import sounddevice as sd
-import soundfile as sf
 import numpy as np
 
 # Context Manager for ALSA Suppression (Module Level)
@@ -130,41 +290,222 @@ def no_alsa_err():
         # Fallback if anything fails
         yield
 
+
+class StreamResampler:
+    """
+    Polyphase FIR resampler for live audio (e.g. a 48 kHz / 44.1 kHz USB mic to
+    Whisper's 16 kHz). Chunks of any size go in, and the output is the same as
+    resampling the whole recording at once.
+
+    The rate ratio is reduced to up/down = L/M. One Kaiser-windowed sinc low-pass
+    (cutoff at the lower Nyquist) is split into L phases of 'taps' coefficients, so
+    each output sample costs 'taps' multiply-adds: zero-stuffed inputs are never touched.
+    """
+    def __init__(self, in_rate, out_rate, taps=32, beta=8.0):
+        from math import gcd
+        g = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        # Prototype filter at the upsampled rate, about 'taps' long per phase. Its length
+        # is chosen so the group delay is a whole number of output samples (dropped
+        # below, so the output lines up with the input); 0.9 leaves a transition band.
+        self._delay = -(-taps * self.up // (2 * self.down))
+        n = 2 * self._delay * self.down + 1
+        self.taps = -(-n // self.up)
+        cutoff = 0.9 * 0.5 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2.0
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, beta)
+        h *= self.up / h.sum() # Unity DC gain after zero-stuffing
+        h = np.concatenate((h, np.zeros(self.taps * self.up - n)))
+        # phases[p, k] = h[p + k*up]: the coefficients met by output samples of phase p
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32)
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._in_count = 0 # Input samples seen
+        self._out_count = 0 # Output samples produced (including the dropped delay)
+        self._skip = self._delay
+
+    def process(self, chunk):
+        """
+        Resamples the next chunk (1-D float) and returns the output samples it completes.
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        start = self._in_count - (self.taps - 1) # Input index of buffer[0]
+        buffer = np.concatenate((self._history, chunk))
+        self._in_count += len(chunk)
+        self._history = buffer[len(buffer) - (self.taps - 1):]
+
+        # Output n reads input (n*down)//up and back 'taps'-1 samples, with phase (n*down)%up
+        end = (self._in_count * self.up + self.down - 1) // self.down
+        n = np.arange(self._out_count, end, dtype=np.int64)
+        self._out_count = end
+        pos = n * self.down
+        newest = pos // self.up - start
+        window = buffer[newest[:, None] - np.arange(self.taps)]
+        out = np.einsum("ij,ij->i", window, self.phases[pos % self.up])
+
+        if self._skip:
+            dropped = min(self._skip, len(out))
+            self._skip -= dropped
+            out = out[dropped:]
+        return out
+
+    def flush(self):
+        """
+        Output still held back by the filter delay at the end of a recording.
+        """
+        total = (self._in_count * self.up + self.down - 1) // self.down
+        emitted = max(0, self._out_count - self._delay)
+        # Zero input until the output reaches 'total' samples past the delay
+        need_in = ((total + self._delay) * self.down + self.up - 1) // self.up
+        out = self.process(np.zeros(max(0, need_in - self._in_count), dtype=np.float32))
+        return out[:max(0, total - emitted)]
+
+
+class Endpointer:
+    """
+    Real-time end-of-speech detection on mono audio (energy + zero-crossing VAD in
+    30 ms frames), so a recording can stop shortly after the user stops talking.
+
+    A frame is speech when its RMS is above the threshold (raised to 3x the noise
+    floor) and it is not broadband hiss (a high zero-crossing rate needs twice the
+    level). Speech starts after 'min_speech_sec' of consecutive speech frames, so
+    clicks and bumps do not count; it has ended after 'silence_sec' without a
+    speech frame.
+
+    The noise floor is a minimum tracker, starting from the first frame (pre-roll):
+    it drops at once to any quieter frame and rises by at most NOISE_RISE_PER_SEC.
+    Speech always has quiet gaps that pull it back down, so it cannot climb over the
+    speech level mid-sentence, while a steady hum louder than the threshold is
+    learned as noise within a few seconds instead of counting as endless speech.
+    """
+    FRAME_SEC = 0.03
+    NOISE_ZCR = 0.35 # Zero-crossing rate above which a frame looks like hiss rather than voice
+    NOISE_RISE_PER_SEC = 1.5 # Fastest growth of the noise floor (x per second)
+
+    def __init__(self, sample_rate, threshold, silence_sec, min_speech_sec=0.09):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * self.FRAME_SEC)
+        self.threshold = threshold
+        self.silence_frames = int(round(silence_sec / self.FRAME_SEC))
+        self.min_speech_frames = max(1, int(round(min_speech_sec / self.FRAME_SEC)))
+        self._rise = self.NOISE_RISE_PER_SEC ** self.FRAME_SEC
+        self.noise = None
+        self.frames = 0 # Frames classified so far
+        self.speech_start = None # First frame of the first speech run (None until speech is heard)
+        self.speech_end = None # Frame after the last speech frame
+        self.ended = False
+        self._run = 0
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def process(self, chunk):
+        """
+        Classifies the complete frames in the next chunk. Returns True once speech has ended.
+        """
+        buf = np.concatenate((self._carry, chunk)) if len(self._carry) else chunk
+        n = len(buf) // self.frame
+        self._carry = buf[n * self.frame:].copy()
+        if n == 0: return self.ended
+        frames = buf[:n * self.frame].reshape(n, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+
+        for i in range(n):
+            idx = self.frames + i
+            # Fast down, slow up
+            self.noise = rms[i] if self.noise is None else min(rms[i], self.noise * self._rise)
+            level = max(self.threshold, 3.0 * self.noise) if self.noise is not None else self.threshold
+            if rms[i] > level and (zcr[i] < self.NOISE_ZCR or rms[i] > 2.0 * level):
+                self._run += 1
+                if self.speech_start is None and self._run >= self.min_speech_frames:
+                    self.speech_start = idx - self._run + 1
+                if self.speech_start is not None:
+                    self.speech_end = idx + 1
+            else:
+                self._run = 0
+                if self.speech_start is not None and idx + 1 - self.speech_end >= self.silence_frames:
+                    self.ended = True
+        self.frames += n
+        return self.ended
+
+    def seconds(self, frame):
+        return frame * self.FRAME_SEC
+
+    def trim(self, audio, pad_sec):
+        """
+        'audio' (the samples fed to process) cut to the speech plus 'pad_sec' on each side.
+        """
+        if self.speech_start is None: return audio[:0]
+        pad = int(pad_sec * self.sample_rate)
+        start = max(0, self.speech_start * self.frame - pad)
+        end = min(len(audio), self.speech_end * self.frame + pad)
+        return audio[start:end]
+
+
 class AudioRecorder:
+    """
+    Keeps one input stream open between turns. The PortAudio callback only copies
+    each block into a preallocated ring buffer (no allocation per block), so a
+    recording starts instantly and includes config.AUDIO_PREROLL_SEC of audio from
+    before it was requested: the first syllable is not lost to stream start-up.
+    """
     def __init__(self):
         self.sample_rate = config.SAMPLE_RATE
         self.channels = 1
         self.device_index = config.AUDIO_CARD_INDEX # Explicit Device from Config
+        self.device_rate = None # Rate the device accepted, found on the first recording
+        self.preroll_sec = config.AUDIO_PREROLL_SEC
+        self.max_record_sec = config.AUDIO_MAX_RECORD_SEC
+        self.overflows = 0 # Blocks PortAudio flagged (input overflow etc.)
+        self._stream = None
+        self._ring = None
+        self._written = 0 # Samples written to the ring since the stream opened
+        # Seconds between the end of speech and the recording stopping, per stop method
+        self.stop_delays = {"vad": [], "enter": []}
+        self.last_speech_end = None
+
+    def _callback(self, indata, frames, time, status):
+        # Runs on the PortAudio thread: no printing, no allocation
+        if status:
+            self.overflows += 1
+        ring = self._ring
+        pos = self._written % len(ring)
+        n = min(frames, len(ring) - pos)
+        ring[pos:pos + n] = indata[:n, 0]
+        if n < frames:
+            ring[:frames - n] = indata[n:, 0]
+        self._written += frames
 
-    def record(self, output_filename, duration=None, silence_threshold=0.01, silence_duration=1.5):
+    def start(self):
         """
-        Records audio to a WAV file.
-        If duration is None, records until silence is detected (VAD-like).
+        Opens the input stream if it is not running. Returns False if no rate works.
         """
-        print(f"Recording... (Device Index: {self.device_index})")
-        
-        recorded_frames = []
-        
-        def callback(indata, frames, time, status):
-            if status:
-                print(status, file=sys.stderr)
-            recorded_frames.append(indata.copy())
+        if self._stream is not None and self._stream.active:
+            return True
+        self.close()
+        import sounddevice as sd
 
         # Wrap stream in ALSA suppression
         with no_alsa_err():
-            # Auto-Negotiate Sample Rate for Raspberry Pi USB Mics
-            supported_rates = [self.sample_rate, 48000, 44100, 16000]
+            # Auto-Negotiate Sample Rate for Raspberry Pi USB Mics (the rate that worked is tried first next time)
+            supported_rates = list(dict.fromkeys([self.device_rate, self.sample_rate, 48000, 44100, 16000]))
             stream = None
             
             for rate in supported_rates:
+                if not rate: continue
                 try:
+                    self._ring = np.zeros(int(rate * config.AUDIO_RING_SEC), dtype=np.float32)
+                    self._written = 0
                     # Try to open stream with this rate
                     stream = sd.InputStream(samplerate=rate, 
                                         device=self.device_index,
                                         channels=self.channels, 
-                                        callback=callback)
+                                        dtype="float32",
+                                        callback=self._callback)
                     stream.start() # Explicit start to trigger error if invalid
-                    print(f"DEBUG: Recording started at {rate}Hz")
+                    if rate != self.device_rate:
+                        print(f"DEBUG: Microphone open at {rate}Hz"
+                              + (f" (resampled to {self.sample_rate}Hz)" if rate != self.sample_rate else ""))
+                    self.device_rate = rate
                     break
                 except Exception as e:
                     if stream: stream.close()
@@ -172,63 +513,170 @@ class AudioRecorder:
                     # print(f"DEBUG: Rate {rate}Hz failed: {e}")
                     continue
             
-            if not stream:
-                print(f"Error: Could not open audio device (Index {self.device_index}) with any common sample rate.")
-                return False
+        if not stream:
+            print(f"Error: Could not open audio device (Index {self.device_index}) with any common sample rate.")
+            self._ring = None
+            return False
+        self._stream = stream
+        return True
+
+    def close(self):
+        stream, self._stream = self._stream, None
+        if stream is None: return
+        try:
+            stream.stop()
+            stream.close()
+        except Exception:
+            pass
+
+    def _read(self, start, end):
+        """
+        Copy of ring samples [start, end) (positions counted like self._written).
+        """
+        ring = self._ring
+        a, b = start % len(ring), end % len(ring)
+        if end - start == 0: return ring[:0].copy()
+        if a < b: return ring[a:b].copy()
+        return np.concatenate((ring[a:], ring[:b]))
+
+    def record(self, output_filename=None, duration=None, silence_threshold=None, silence_duration=None, vad=None,
+               on_chunk=None):
+        """
+        Records audio and returns it as a float32 mono NumPy buffer for VoiceListener.transcribe
+        (None if recording failed). A WAV copy is written only when 'output_filename' or
+        config.AUDIO_DEBUG_WAV is set (debugging; saves SD-card writes on the Pi).
+        If duration is None, records until the user stops speaking ('silence_duration' seconds
+        below 'silence_threshold' RMS; config.AUDIO_VAD*) or ENTER is pressed. Leading and
+        trailing silence is trimmed; an empty buffer means no speech was heard.
+        on_chunk(chunk, speaking) receives the 16 kHz audio as it arrives (PartialTranscriber.feed).
+        Devices that only open at 48/44.1 kHz are resampled to self.sample_rate while recording.
+        """
+        import sounddevice as sd
+        if not self.start():
+            return None
+        print(f"Recording... (Device Index: {self.device_index})")
+        self.last_speech_end = None
+
+        rate = self.device_rate
+        resampler = StreamResampler(rate, self.sample_rate) if rate != self.sample_rate else None
+        record_start = self._written
+        read_pos = max(0, record_start - int(self.preroll_sec * rate))
+        overflows = self.overflows
+        chunks = []
+        vad = (config.AUDIO_VAD if vad is None else vad) and not duration
+        endpointer = Endpointer(self.sample_rate,
+                                silence_threshold if silence_threshold is not None else config.AUDIO_VAD_THRESHOLD,
+                                silence_duration if silence_duration is not None else config.AUDIO_VAD_SILENCE_SEC)
+        stop_method = None
+
+        def drain():
+            # Moves new ring samples into 'chunks' (resampled) before the callback overwrites them
+            nonlocal read_pos
+            end = self._written
+            if end - read_pos > len(self._ring):
+                print("Warning: audio ring buffer overrun, samples lost.")
+                read_pos = end - len(self._ring)
+            chunk = self._read(read_pos, end)
+            read_pos = end
+            chunk = resampler.process(chunk) if resampler else chunk
+            chunks.append(chunk)
+            endpointer.process(chunk)
+            if on_chunk: on_chunk(chunk, endpointer.speech_start is not None)
+
+        try:
+            if vad:
+                print("Recording... Stops when you finish speaking (or press ENTER).")
+            elif not duration:
+                # Manual Control: Press ENTER to Stop (Requested by User)
+                print("Recording... Press ENTER to stop.")
+
+            # We need a non-blocking wait.
+            # On Windows: msvcrt. On Linux: select or just loop (simplified)
+            while True:
+                sd.sleep(100) # Small sleep to prevent CPU hogging
+                drain()
+                elapsed = (self._written - record_start) / float(rate)
+
+                if not self._stream.active:
+                    print("Recording Logic Error: input stream stopped.")
+                    self.close() # Reopened on the next turn
+                    break
 
-            try:
-                # Keep stream open and monitor
                 if duration:
-                    sd.sleep(int(duration * 1000))
+                    if elapsed >= duration: break
+                    continue
+
+                if vad and endpointer.ended:
+                    stop_method = "vad"
+                    break
+                if vad and endpointer.speech_start is None and elapsed > config.AUDIO_VAD_NO_SPEECH_SEC:
+                    print("No speech heard. Stopping.")
+                    break
+
+                # Stop Check
+                should_stop = False
+                
+                if os.name == 'nt':
+                    import msvcrt
+                    if msvcrt.kbhit():
+                        key = msvcrt.getch()
+                        if key == b'\r': should_stop = True
                 else:
-                    # Manual Control: Press ENTER to Stop (Requested by User)
-                    print("Recording... Press ENTER to stop.")
+                    # Linux/Pi Non-blocking Enter check
+                    import select
+                    # select([stdin], [], [], 0) returns immediately
+                    if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
+                        line = sys.stdin.readline()
+                        should_stop = True
+
+                if should_stop:
+                    print("Stop signal received.")
+                    stop_method = "enter"
+                    break
                     
-                    # We need a non-blocking wait.
-                    # On Windows: msvcrt. On Linux: select or just loop (simplified)
+                # Safety Limit (5 minutes), from samples actually captured
+                if elapsed > self.max_record_sec:
+                     print(f"Timeout reached ({self.max_record_sec / 60:.0f} mins). Stopping.")
+                     break
                     
-                    while True:
-                        sd.sleep(100) # Small sleep to prevent CPU hogging
-                        
-                        # Stop Check
-                        should_stop = False
-                        
-                        if os.name == 'nt':
-                            import msvcrt
-                            if msvcrt.kbhit():
-                                key = msvcrt.getch()
-                                if key == b'\r': should_stop = True
-                        else:
-                            # Linux/Pi Non-blocking Enter check
-                            import select
-                            import sys
-                            # select([stdin], [], [], 0) returns immediately
-                            if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                                line = sys.stdin.readline()
-                                should_stop = True
-
-                        if should_stop:
-                            print("Stop signal received.")
-                            break
-                            
-                        # Safety Limit (5 minutes)
-                        if len(recorded_frames) * 1024 / self.sample_rate > 300:
-                             print("Timeout reached (5 mins). Stopping.")
-                             break
-                            
-            except Exception as e:
-                print(f"Recording Logic Error: {e}")
-            finally:
-                if stream:
-                    stream.stop()
-                    stream.close()
-
-        # Save to file
-        if not recorded_frames:
-            return False
-            
-        audio_data = np.concatenate(recorded_frames, axis=0)
-        sf.write(output_filename, audio_data, self.sample_rate)
-        return output_filename
+        except Exception as e:
+            print(f"Recording Logic Error: {e}")
+
+        if self.overflows != overflows:
+            print(f"Warning: {self.overflows - overflows} audio blocks flagged (input overflow).", file=sys.stderr)
+        if resampler:
+            chunks.append(resampler.flush())
+            if on_chunk: on_chunk(chunks[-1], endpointer.speech_start is not None)
+        audio_data = np.concatenate(chunks) if chunks else None
+        if audio_data is None or len(audio_data) == 0:
+            return None
 
+        if stop_method and endpointer.speech_end is not None:
+            # How long after the last speech frame the recording stopped (hangover + polling)
+            delay = endpointer.seconds(endpointer.frames - endpointer.speech_end)
+            self.stop_delays[stop_method].append(delay)
+            print(f"Endpoint ({stop_method}): stopped {delay:.2f}s after speech ended.")
+        # Recording position (16 kHz samples, pre-roll included) where the speech ended
+        if endpointer.speech_end is not None:
+            self.last_speech_end = min(len(audio_data), endpointer.speech_end * endpointer.frame
+                                       + int(config.AUDIO_VAD_PAD_SEC * self.sample_rate))
+        if vad:
+            full_sec = len(audio_data) / float(self.sample_rate)
+            audio_data = endpointer.trim(audio_data, config.AUDIO_VAD_PAD_SEC)
+            print(f"VAD: kept {len(audio_data) / float(self.sample_rate):.2f}s of {full_sec:.2f}s.")
 
+        debug_path = output_filename if output_filename else config.AUDIO_DEBUG_WAV
+        if debug_path and len(audio_data):
+            import soundfile as sf
+            sf.write(debug_path, audio_data, self.sample_rate)
+        return audio_data
+
+    def report(self):
+        """
+        Stop latency after the end of speech: automatic endpointing vs. pressing ENTER.
+        """
+        for method, label in (("vad", "VAD endpoint"), ("enter", "ENTER")):
+            delays = self.stop_delays[method]
+            if delays:
+                print(f"{label}: stopped {np.mean(delays):.2f}s (median {np.median(delays):.2f}s) "
+                      f"after speech ended, over {len(delays)} recordings")
@@ -0,0 +1,156 @@
+"""
+Compares the GGUF models in models/ as the ASR correction LLM.
+
+Every *.gguf in models/ is benchmarked (drop another one in to include it). Each
+model runs in a fresh process, so its load time and RSS are not skewed by the
+model before it. Cases come from llm_corrections.csv (transcript, candidates,
+expected).
+  accuracy  correct_query returned exactly the expected item ("None" cases: returned None),
+            over the cases the model could answer
+  label fail  score mode cases not scored because a candidate label was not one token
+            with this tokenizer (a prompt/tokenizer mismatch, not a wrong answer)
+  ms/case   mean correct_query latency (the static prompt prefix is cached after the first case)
+  prefill/s, gen/s  tokens per second on the reference correction prompt from an empty cache (tune_llm.measure_speed)
+  load, RSS  model load time and resident memory added by the model
+Both correction modes (config.LLM_CORRECTION_MODE) are measured by default. Each model
+is prompted with its own chat template (ChatEngine.template, from the GGUF metadata).
+
+Usage:
+    python bench_llm.py
+    python bench_llm.py --mode score --verbose
+    python bench_llm.py --models models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import config
+
+CASES_PATH = os.path.join(config.BASE_DIR, "llm_corrections.csv")
+MODELS_DIR = os.path.join(config.BASE_DIR, "models")
+# Smaller files are Git LFS pointers, not models
+MIN_MODEL_BYTES = 1024 * 1024
+
+
+def load_cases(path=CASES_PATH):
+    with open(path, encoding="utf-8") as f:
+        reader = csv.DictReader(line for line in f if not line.startswith("#"))
+        return [(r["transcript"], r["candidates"].split("|"), r["expected"]) for r in reader]
+
+
+def bench_model(model_path, modes, cases, n_gen, verbose):
+    """
+    Runs in a child process: load, raw speed, then every case in every mode.
+    """
+    from llm_engine import ChatEngine, PROMPT_TEMPLATES
+    from model_registry import get_rss_mb
+    from tune_llm import REFERENCE_PROMPT, measure_speed
+
+    result = {"model": os.path.basename(model_path), "template": "n/a"}
+    rss_before = get_rss_mb()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = ChatEngine(model_path)
+    result["load_s"] = time.perf_counter() - t0
+    rss_after = get_rss_mb()
+    result["rss_mb"] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    if not engine.enabled:
+        result["error"] = "model did not load"
+        return result
+    result["template"] = next(k for k, v in PROMPT_TEMPLATES.items() if v is engine.template)
+
+    tokens = engine.llm.tokenize(REFERENCE_PROMPT.encode("utf-8"), add_bos=True, special=True)
+    speed = measure_speed(engine.llm, tokens, n_gen)
+    result["prefill_tps"] = speed["prefill_tps"]
+    result["gen_tps"] = speed["gen_tps"]
+
+    for mode in modes:
+        config.LLM_CORRECTION_MODE = mode
+        correct = 0
+        label_fail = 0
+        total_s = 0.0
+        for transcript, candidates, expected in cases:
+            failures = engine.label_failures
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                got = engine.correct_query(transcript, candidates)
+            total_s += time.perf_counter() - t0
+            if engine.label_failures > failures:
+                label_fail += 1
+                if verbose:
+                    print(f"  [{result['model']} {mode}] LABEL FAIL {transcript!r}: labels not single tokens")
+                continue
+            ok = got is None if expected == "None" else got == expected
+            correct += ok
+            if verbose and not ok:
+                print(f"  [{result['model']} {mode}] MISS {transcript!r}: got {got!r}, expected {expected!r}")
+        scored = len(cases) - label_fail
+        result[mode] = {"accuracy": correct / float(scored) if scored else None, "label_fail": label_fail,
+                        "ms_per_case": total_s * 1000.0 / len(cases)}
+    engine.close()
+    return result
+
+
+def find_models(paths):
+    models = []
+    for path in paths if paths else sorted(glob.glob(os.path.join(MODELS_DIR, "*.gguf"))):
+        if not os.path.exists(path):
+            print(f"Skipping {path}: not found")
+        elif os.path.getsize(path) < MIN_MODEL_BYTES:
+            print(f"Skipping {os.path.basename(path)}: {os.path.getsize(path)} bytes (Git LFS pointer? run 'git lfs pull')")
+        else:
+            models.append(path)
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASR correction accuracy and speed of the GGUF models in models/")
+    parser.add_argument("--models", nargs="*", help="GGUF files (default: every *.gguf in models/)")
+    parser.add_argument("--mode", choices=["score", "generate", "both"], default="both")
+    parser.add_argument("--gen", type=int, default=32, help="Tokens generated for the gen tok/s figure")
+    parser.add_argument("--verbose", action="store_true", help="Print every wrong correction")
+    args = parser.parse_args()
+
+    from llm_engine import _import_llama
+    if _import_llama() is None: return
+    cases = load_cases()
+    models = find_models(args.models)
+    if not models:
+        print("No models to benchmark.")
+        return
+    modes = ["score", "generate"] if args.mode == "both" else [args.mode]
+
+    print(f"{len(cases)} correction cases x {len(models)} models, modes: {', '.join(modes)}")
+    results = []
+    for path in models:
+        print(f"\nBenchmarking {os.path.basename(path)}...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+            try:
+                results.append(pool.submit(bench_model, path, modes, cases, args.gen, args.verbose).result())
+            except Exception as e:
+                results.append({"model": os.path.basename(path), "error": str(e)})
+
+    header = f"\n{'model':<42}{'template':>9}{'load s':>8}{'RSS MB':>8}{'prefill/s':>10}{'gen/s':>7}"
+    for mode in modes:
+        header += f"{mode + ' acc':>16}{'label fail':>11}{'ms/case':>9}"
+    print(header)
+    for r in results:
+        if "error" in r:
+            print(f"{r['model']:<42}FAILED: {r['error']}")
+            continue
+        rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "n/a"
+        line = f"{r['model']:<42}{r['template']:>9}{r['load_s']:>8.2f}{rss:>8}{r['prefill_tps']:>10.1f}{r['gen_tps']:>7.1f}"
+        for mode in modes:
+            m = r[mode]
+            acc = f"{m['accuracy']:.3f}" if m["accuracy"] is not None else "n/a"
+            line += f"{acc:>16}{m['label_fail']:>11}{m['ms_per_case']:>9.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Memory and top-5 agreement of quantized (float16 / int8) semantic indexes vs. float32.
+
+Runs on the real inventory by default: item embeddings come from the on-disk semantic
+index (embedding only what is missing), queries are every item name plus a set of
+typical spoken queries.
+
+Usage:
+    python bench_quantization.py                   # real inventory (needs the NLP model)
+    python bench_quantization.py --no-phrases      # item-to-item queries only
+    python bench_quantization.py --synthetic 50000 # clustered synthetic catalogue instead
+"""
+import argparse
+import time
+import numpy as np
+from vector_index import ExactIndex, QuantizedIndex
+
+SPOKEN_QUERIES = [
+    "servo motor", "soldering iron", "dht sensor", "ultrasonic sensor", "12 volt battery",
+    "lipo battery", "motor driver", "raspberry pi", "arduino uno", "multimeter",
+    "oscilloscope", "glue gun", "jumper wires", "lcd display", "oled display",
+    "stepper motor", "bldc motor", "relay module", "power supply", "usb cable",
+    "ir sensor", "gas sensor", "wheel", "drone propeller", "esp32 board",
+    "breadboard", "potentiometer", "buck converter", "bluetooth module", "camera module",
+]
+
+
+class _LazyEncoder:
+    """
+    Loads the NLP model only if something actually needs embedding.
+    """
+    def __init__(self):
+        self.parser = None
+
+    def __call__(self, texts):
+        if self.parser is None:
+            from nlp_engine import IntentParser
+            self.parser = IntentParser()
+        return self.parser.encode_text(texts)
+
+
+def load_real(use_phrases):
+    import db_manager
+    from semantic_index import PersistentSemanticIndex
+    encoder = _LazyEncoder()
+    names = db_manager.get_all_item_names()
+    names, embs = PersistentSemanticIndex().sync(names, encoder)
+    embs = np.asarray(embs, dtype=np.float32)
+    queries = embs
+    if use_phrases:
+        queries = np.vstack([embs, np.asarray(encoder(SPOKEN_QUERIES), dtype=np.float32)])
+    return embs, queries
+
+
+def load_synthetic(n, dim=384):
+    from bench_vector_index import make_catalogue, make_queries
+    data = make_catalogue(n, dim)
+    return data, make_queries(data, min(1000, n))
+
+
+def run_queries(index, queries, k, **kwargs):
+    out, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, idx = index.search(q, k, **kwargs)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        out.append(idx)
+    return out, float(np.median(latencies))
+
+
+def agreement(truth, found, k):
+    overlap = np.mean([len(set(t[:k].tolist()) & set(f[:k].tolist())) / float(k) for t, f in zip(truth, found)])
+    top1 = np.mean([t[0] == f[0] for t, f in zip(truth, found) if len(t) and len(f)])
+    return overlap, top1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized semantic index benchmark")
+    parser.add_argument("--synthetic", type=int, help="Use a synthetic catalogue of this size")
+    parser.add_argument("--no-phrases", action="store_true", help="Skip the spoken-query set")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        embs, queries = load_synthetic(args.synthetic)
+        source = f"synthetic ({args.synthetic:,} items)"
+    else:
+        embs, queries = load_real(not args.no_phrases)
+        source = f"real inventory ({len(embs)} items)"
+    print(f"Catalogue: {source}, {len(queries)} queries, dim {embs.shape[1]}")
+
+    exact = ExactIndex().build(embs)
+    truth, base_ms = run_queries(exact, queries, args.k)
+    base_mb = exact.memory_bytes() / 1e6
+
+    print(f"\n{'mode':<22}{'MB':>9}{'saved':>8}{'top-5 agree':>13}{'top-1 agree':>13}{'p50 ms':>9}")
+    print(f"{'float32':<22}{base_mb:>9.2f}{'-':>8}{1.0:>13.3f}{1.0:>13.3f}{base_ms:>9.3f}")
+    for precision in ("float16", "int8"):
+        index = QuantizedIndex(precision).build(embs)
+        mb = index.memory_bytes() / 1e6
+        for rescore in (0, args.rescore):
+            found, ms = run_queries(index, queries, args.k, rescore=rescore)
+            overlap, top1 = agreement(truth, found, args.k)
+            label = precision + (f" +rescore {rescore}" if rescore else "")
+            print(f"{label:<22}{mb:>9.2f}{1 - mb / base_mb:>7.0%} {overlap:>13.3f}{top1:>13.3f}{ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Retrieval quality and latency of the two search_pipeline engines: the serial
+cascade (exact -> ranked -> semantic) vs. the hybrid BM25 + trigram + vector
+engine with reciprocal rank fusion.
+
+Queries and correct answers come from search_queries.csv (query, expected, kind).
+  hit@1   first result is a correct item
+  recall  share of correct items that appear in the results
+  size    mean number of results (lower = less disambiguation for the user)
+cascade-c is the cascade with its tiers running concurrently.
+
+Usage:
+    python bench_retrieval.py                 # with semantic search if the NLP model loads
+    python bench_retrieval.py --no-vector     # lexical only (both engines)
+    python bench_retrieval.py --verbose       # per-query results and the stage that answered
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import time
+import numpy as np
+import config
+import db_manager
+
+QUERIES_PATH = os.path.join(config.BASE_DIR, "search_queries.csv")
+
+
+def load_queries(path=QUERIES_PATH):
+    with open(path, encoding="utf-8") as f:
+        reader = csv.DictReader(line for line in f if not line.startswith("#"))
+        return [(r["query"], set(r["expected"].split("|")), r["kind"]) for r in reader]
+
+
+def load_semantic():
+    """
+    Returns semantic_fn(query) -> [(name, score)], or None if the NLP model is unavailable.
+    """
+    try:
+        import mini_assistant
+        from nlp_engine import IntentParser
+        nlp = IntentParser()
+        mini_assistant.build_semantic_index(nlp)
+    except Exception as e:
+        print(f"Semantic search unavailable ({e}). Lexical only.")
+        return None
+
+    def semantic_fn(query):
+        return mini_assistant.semantic_search_inventory(query, nlp)
+    return semantic_fn
+
+
+def score(names, expected):
+    hit = 1.0 if names and names[0] in expected else 0.0
+    recall = len(expected & set(names)) / float(len(expected))
+    return hit, recall, len(names)
+
+
+def run(label, search_fn, queries, verbose):
+    stats = {"hit": [], "recall": [], "size": [], "ms": []}
+    per_kind = {}
+    for query, expected, kind in queries:
+        with contextlib.redirect_stdout(io.StringIO()): # search_items prints DEBUG lines
+            t0 = time.perf_counter()
+            names, detail = search_fn(query)
+            ms = (time.perf_counter() - t0) * 1000.0
+        hit, recall, size = score(names, expected)
+        for key, value in (("hit", hit), ("recall", recall), ("size", size), ("ms", ms)):
+            stats[key].append(value)
+        per_kind.setdefault(kind, []).append(hit)
+        if verbose:
+            mark = "OK  " if hit else "MISS"
+            print(f"  [{label}] {mark} {query!r} -> {names[:3]}{' ...' if len(names) > 3 else ''} {detail}")
+    ms = np.array(stats["ms"])
+    kinds = "  ".join(f"{k} {np.mean(v):.2f}" for k, v in sorted(per_kind.items()))
+    print(f"{label:<10}{np.mean(stats['hit']):>8.3f}{np.mean(stats['recall']):>9.3f}{np.mean(stats['size']):>7.1f}"
+          f"{np.percentile(ms, 50):>9.2f}{np.percentile(ms, 95):>9.2f}   {kinds}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade vs. hybrid retrieval benchmark")
+    parser.add_argument("--no-vector", action="store_true", help="Skip semantic search in both engines")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the query set (latency samples)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    queries = load_queries()
+    semantic_fn = None if args.no_vector else load_semantic()
+
+    from search_pipeline import build_pipeline
+    sequential = build_pipeline("cascade", semantic_fn, concurrent=False)
+    concurrent = build_pipeline("cascade", semantic_fn, concurrent=True)
+    t0 = time.perf_counter()
+    hybrid = build_pipeline("hybrid", semantic_fn)
+    print(f"Hybrid index built in {(time.perf_counter() - t0) * 1000.0:.1f} ms")
+
+    def make_search_fn(pipeline):
+        def search_fn(query):
+            result = pipeline.search(query)
+            return [r[0] for r in result.rows], f"[{result.hit_stage}]"
+        return search_fn
+
+    print(f"\n{len(queries)} queries x {args.repeat}, vector {'on' if semantic_fn else 'off'}")
+    print(f"{'engine':<10}{'hit@1':>8}{'recall':>9}{'size':>7}{'p50 ms':>9}{'p95 ms':>9}   hit@1 by kind")
+    run("cascade", make_search_fn(sequential), queries * args.repeat, args.verbose)
+    run("cascade-c", make_search_fn(concurrent), queries * args.repeat, args.verbose)
+    run("hybrid", make_search_fn(hybrid), queries * args.repeat, args.verbose)
+
+    # Worst case for the cascade: queries no tier answers before the last one
+    with contextlib.redirect_stdout(io.StringIO()):
+        misses = [q for q in queries if sequential.search(q[0]).hit_stage != "exact"]
+    if misses:
+        print(f"\nExact-tier misses only ({len(misses)} queries):")
+        run("cascade", make_search_fn(sequential), misses * args.repeat, False)
+        run("cascade-c", make_search_fn(concurrent), misses * args.repeat, False)
+    concurrent.shutdown()
+
+
+if __name__ == "__main__":
+    main()
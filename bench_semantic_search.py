@@ -0,0 +1,108 @@
+"""
+Per-query latency of semantic search: the old torch path (util.cos_sim + torch.topk
+on raw embeddings) vs. the NumPy path (pre-normalized rows, one matmul + argpartition).
+
+Optionally also times query encoding with both embedding backends
+(sentence-transformers vs. ONNX Runtime) when the models are available.
+
+Usage:
+    python bench_semantic_search.py                       # 700, 10k, 100k synthetic items
+    python bench_semantic_search.py --sizes 700 --encode  # also time query encoding
+"""
+import argparse
+import time
+import numpy as np
+import vector_index
+from vector_index import ExactIndex
+from bench_vector_index import make_catalogue, make_queries
+
+
+def percentiles(latencies):
+    lat = np.array(latencies)
+    return float(np.percentile(lat, 50)), float(np.percentile(lat, 95))
+
+
+def bench_torch(data, queries, k):
+    import torch
+    from sentence_transformers import util
+    item_embs = torch.from_numpy(data)
+    latencies, found = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        scores = util.cos_sim(q, item_embs)[0]
+        top = torch.topk(scores, k=k)
+        idx = top.indices.numpy()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        found.append(idx)
+    return found, latencies
+
+
+def bench_numpy(data, queries, k):
+    index = ExactIndex().build(vector_index.normalize_rows(data), normalized=True)
+    latencies, found = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, idx = index.search(q, k)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        found.append(idx)
+    return found, latencies
+
+
+def bench_encode(n_runs=50):
+    import config
+    from nlp_engine import OnnxEmbedder
+    from sentence_transformers import SentenceTransformer
+    text = "do we have the 12 volt dc motor"
+    backends = [("sentence-transformers", lambda: SentenceTransformer(config.NLP_MODEL_NAME))]
+    backends.append(("onnx", OnnxEmbedder))
+    print(f"\n{'encoder':<24}{'load s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for label, factory in backends:
+        try:
+            t0 = time.time()
+            model = factory()
+            load_s = time.time() - t0
+        except Exception as e:
+            print(f"{label:<24}unavailable ({e})")
+            continue
+        model.encode(text) # Warm-up
+        latencies = []
+        for _ in range(n_runs):
+            t0 = time.perf_counter()
+            model.encode(text)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        p50, p95 = percentiles(latencies)
+        print(f"{label:<24}{load_s:>9.2f}{p50:>9.2f}{p95:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Torch vs. NumPy semantic search latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[700, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--encode", action="store_true", help="Also time query encoding per backend")
+    args = parser.parse_args()
+
+    print(f"{'items':>9}{'torch p50':>11}{'torch p95':>11}{'numpy p50':>11}{'numpy p95':>11}{'same top-k':>12}")
+    for n in args.sizes:
+        data = make_catalogue(n, args.dim)
+        queries = make_queries(data, min(args.queries, n)).astype(np.float32)
+        try:
+            torch_found, torch_lat = bench_torch(data, queries, args.k)
+        except ImportError:
+            torch_found, torch_lat = None, None
+        np_found, np_lat = bench_numpy(data, queries, args.k)
+        n50, n95 = percentiles(np_lat)
+        if torch_lat is None:
+            print(f"{n:>9,}{'-':>11}{'-':>11}{n50:>11.3f}{n95:>11.3f}{'-':>12}")
+            continue
+        t50, t95 = percentiles(torch_lat)
+        same = np.mean([set(a.tolist()) == set(b.tolist()) for a, b in zip(torch_found, np_found)])
+        print(f"{n:>9,}{t50:>11.3f}{t95:>11.3f}{n50:>11.3f}{n95:>11.3f}{same:>12.3f}")
+
+    if args.encode:
+        bench_encode()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Recall@5 vs. latency benchmark: exact brute-force search vs. the IVF-PQ index.
+
+Synthetic catalogues mimic inventory embeddings: items come in "families"
+(e.g. many DC motors with different RPM ratings) that sit close together,
+and queries are noisy copies of catalogue items (paraphrased / misheard names).
+
+Usage:
+    python bench_vector_index.py                       # 10k, 100k, 1M items
+    python bench_vector_index.py --sizes 10000 100000 --queries 500
+    python bench_vector_index.py --out bench_output.txt
+
+Note: 1M x 384 float32 needs ~1.5 GB RAM for the raw matrix. Run the large sizes on a desktop.
+"""
+import argparse
+import sys
+import time
+import numpy as np
+import vector_index
+from vector_index import ExactIndex, IVFPQIndex
+
+
+def make_catalogue(n, dim, seed=0, family_size=50, spread=0.35, chunk=100000):
+    rng = np.random.default_rng(seed)
+    n_families = max(10, n // family_size)
+    centers = vector_index.normalize_rows(rng.standard_normal((n_families, dim), dtype=np.float32))
+    data = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        fam = rng.integers(0, n_families, size)
+        noise = rng.standard_normal((size, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+        data[start:start + size] = centers[fam] + noise
+    return data
+
+
+def make_queries(data, n_queries, seed=1, noise=0.25):
+    rng = np.random.default_rng(seed)
+    picks = data[rng.choice(len(data), n_queries, replace=False)]
+    dim = data.shape[1]
+    return picks + rng.standard_normal(picks.shape, dtype=np.float32) * (noise / np.sqrt(dim))
+
+
+def time_queries(search_fn, queries, k):
+    results, latencies = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, idx = search_fn(q, k)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        results.append(idx)
+    lat = np.array(latencies)
+    return results, float(np.percentile(lat, 50)), float(np.percentile(lat, 95))
+
+
+def recall_at_k(truth, found, k):
+    hits = sum(len(set(t[:k].tolist()) & set(f[:k].tolist())) for t, f in zip(truth, found))
+    return hits / float(k * len(truth))
+
+
+def bench_size(n, args, out):
+    out(f"\n=== {n:,} items x {args.dim} dims ===")
+    t0 = time.time()
+    data = make_catalogue(n, args.dim)
+    queries = make_queries(data, args.queries)
+    out(f"Generated catalogue in {time.time()-t0:.1f}s")
+
+    exact = ExactIndex().build(data)
+    truth, p50, p95 = time_queries(lambda q, k: exact.search(q, k), queries, args.k)
+    out(f"{'mode':<28}{'recall@'+str(args.k):>10}{'p50 ms':>10}{'p95 ms':>10}{'index MB':>11}")
+    out(f"{'exact':<28}{1.0:>10.3f}{p50:>10.2f}{p95:>10.2f}{exact.memory_bytes() / 1e6:>11.1f}")
+
+    t0 = time.time()
+    ann = IVFPQIndex(n_subvectors=args.subvectors).build(data)
+    build_s = time.time() - t0
+    mem = ann.memory_bytes() / 1e6
+
+    for rerank in args.rerank:
+        for nprobe in args.nprobe:
+            found, p50, p95 = time_queries(lambda q, k: ann.search(q, k, nprobe=nprobe, rerank=rerank), queries, args.k)
+            label = f"ivfpq nprobe={nprobe} rerank={rerank}"
+            out(f"{label:<28}{recall_at_k(truth, found, args.k):>10.3f}{p50:>10.2f}{p95:>10.2f}{mem:>11.1f}")
+    out(f"IVF-PQ build: {build_s:.1f}s, {len(ann.centroids)} lists, {args.subvectors} bytes/item")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact vs. IVF-PQ semantic search benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dim (MiniLM = 384)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 50])
+    parser.add_argument("--subvectors", type=int, default=48)
+    parser.add_argument("--out", help="Also append results to this file")
+    args = parser.parse_args()
+
+    log = open(args.out, "a") if args.out else None
+
+    def out(line):
+        print(line)
+        sys.stdout.flush()
+        if log:
+            log.write(line + "\n")
+
+    for n in args.sizes:
+        bench_size(n, args, out)
+
+    if log:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
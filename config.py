@@ -15,9 +15,22 @@ PI_MODE = True if os.name == 'posix' else True # Force True for Simulation on Wi
 # On Pi/Simulation, use tiny/base for speed. small for accuracy.
 WHISPER_MODEL_SIZE = "small.en" if PI_MODE else "medium.en" 
 BEAM_SIZE = 5 # Better accuracy, slightly slower than 1
+# Transcribe while the user is still speaking (partial hypotheses; little ASR work left at the end)
+ASR_STREAMING = True
+# Decode the live audio again after this much new audio
+ASR_PARTIAL_STEP_SEC = 0.5
+# Longest audio decoded per partial; older audio is dropped once its words are stable
+ASR_PARTIAL_WINDOW_SEC = 20
+# Beam for partial decodes (the final decode, when one is needed, uses BEAM_SIZE)
+ASR_PARTIAL_BEAM_SIZE = 1
+# Run intent detection on stable partials, and reuse it when the final transcript matches
+ASR_EARLY_INTENT = True
 
 # NLP Settings
 NLP_MODEL_NAME = "all-MiniLM-L6-v2"
+# Embedding backend: "sentence_transformers" (torch) or "onnx" (onnxruntime, no torch; ~1 GB less RAM)
+NLP_BACKEND = "sentence_transformers"
+NLP_ONNX_DIR = os.path.join(BASE_DIR, "models", "all-MiniLM-L6-v2-onnx")
 # Intent detection threshold
 INTENT_THRESHOLD = 0.30
 
@@ -36,6 +49,24 @@ LANGUAGE_IDX = "en"
 
 # Audio Settings
 SAMPLE_RATE = 16000
+# Also save each recording to this WAV file (debugging only; None = audio stays in memory)
+AUDIO_DEBUG_WAV = None
+# The microphone stream stays open between turns, feeding a ring buffer of this many seconds
+AUDIO_RING_SEC = 10
+# Audio from just before a recording starts that is kept (so the first syllable is not clipped)
+AUDIO_PREROLL_SEC = 0.5
+# Safety limit for one recording
+AUDIO_MAX_RECORD_SEC = 300
+# Stop recording automatically when the user stops speaking (ENTER still works)
+AUDIO_VAD = True
+# Frame RMS that counts as speech (raised automatically in a noisy room)
+AUDIO_VAD_THRESHOLD = 0.01
+# Silence after speech that ends the recording
+AUDIO_VAD_SILENCE_SEC = 0.7
+# Give up if nothing is said for this long
+AUDIO_VAD_NO_SPEECH_SEC = 8.0
+# Audio kept before and after the speech when trimming silence
+AUDIO_VAD_PAD_SEC = 0.2
 # Audio Output Device Keyword (Partial match)
 # e.g. "Headphones", "bcm2835 Headphones", "USB Audio"
 AUDIO_OUTPUT_KEYWORD = "Headphones"
@@ -50,3 +81,80 @@ LLM_MODEL_PATH = os.path.join(BASE_DIR, "models", LLM_MODEL_FILENAME)
 LLM_CONTEXT_WINDOW = 2048
 # On Pi (CPU), GPU layers should be 0.
 LLM_GPU_LAYERS = 0 if PI_MODE else 50
+# ASR correction: "score" reads the chosen candidate from one forward pass (no generation),
+# "generate" asks for free text and maps it back to a candidate.
+LLM_CORRECTION_MODE = "score"
+# "score" mode: below this probability the correction is dropped ("I didn't catch that")
+LLM_CORRECTION_MIN_CONFIDENCE = 0.5
+# Evaluate each static system prompt once and restore its KV-cache snapshot on later calls.
+# Only the KV data is kept: 32 KB per prompt token for Llama 3.2 1B with an f16 cache
+# (16 layers x 2 x 8 KV heads x 64 x 2 bytes), so a few MB per prompt; the size is printed
+# when a prefix is saved. False = full prefill every call, for comparison.
+LLM_PREFIX_CACHE = True
+# Chat replies: speak each sentence as soon as the LLM has produced it
+LLM_STREAM_TTS = True
+# Host the LLM in a worker process (llm_worker) so a slow or stuck call cannot freeze the voice loop.
+LLM_OUT_OF_PROCESS = True
+# Deadline for a correction, and for the first token / each token gap of a streamed reply.
+# When it passes, the turn is answered without the LLM.
+LLM_DEADLINE_SEC = 10.0
+# Deadline for a complete (non-streamed) chat reply
+LLM_REPLY_DEADLINE_SEC = 60.0
+# A request still running this long after its deadline means a wedged worker: kill and restart it
+LLM_KILL_GRACE_SEC = 5.0
+# A worker not ready this long after it was started is stuck loading: it is killed and restarted.
+# (Requests never wait for a load longer than their own deadline.)
+LLM_LOAD_TIMEOUT_SEC = 120.0
+# Delay before restarting a dead worker, doubled for each crash in a row
+LLM_RESTART_BACKOFF_SEC = 2.0
+# Crashes in a row (no answer in between) after which the worker is not restarted again
+LLM_MAX_RESTARTS = 3
+# Threads / n_batch / mmap+mlock / KV-cache type measured on this device by tune_llm.py
+LLM_TUNING_PATH = os.path.join(BASE_DIR, "llm_tuning.json")
+
+# Search Alias Table (alias,target). Reloaded automatically when edited.
+ALIASES_PATH = os.path.join(BASE_DIR, "search_aliases.csv")
+
+# Model Memory Management (4 GB Pi)
+# Models load on first use; idle/heavy ones are unloaded (LLM first) when RSS exceeds the budget.
+MEMORY_BUDGET_MB = 3072
+# Unload the LLM after this many idle seconds (it is only used for ASR correction).
+LLM_IDLE_UNLOAD_SEC = 300
+
+# Startup: components load concurrently; the first query is accepted once these are ready.
+# (TTS, the semantic index and the LLM finish loading / load on demand afterwards.)
+STARTUP_WORKERS = 4
+STARTUP_CRITICAL_PATH = ("asr", "nlp")
+
+# Semantic Index (item-name embeddings cached on disk between runs)
+SEMANTIC_INDEX_DIR = os.path.join(BASE_DIR, "semantic_index")
+# Rewrite the file once this fraction of rows belongs to deleted/renamed items
+SEMANTIC_INDEX_COMPACT_RATIO = 0.2
+
+# Vector Index for semantic search: "exact", "ivfpq" (approximate) or "auto"
+# auto = exact below ANN_MIN_ITEMS items (the real inventory), IVF-PQ above.
+VECTOR_INDEX = "auto"
+ANN_MIN_ITEMS = 50000
+ANN_PQ_SUBVECTORS = 48 # Bytes per item (must divide the embedding dim, 384 for MiniLM)
+ANN_NPROBE = 8         # IVF lists scanned per query (higher = better recall, slower)
+ANN_RERANK = 50        # Candidates re-scored with full vectors (0 = off)
+
+# Storage precision for exact semantic search: "float32", "float16" or "int8" (per-vector scale)
+SEMANTIC_INDEX_PRECISION = "int8"
+# Re-score this many top candidates with full-precision vectors (0 = off)
+SEMANTIC_RESCORE = 20
+
+# Item search engine: "cascade" (exact -> ranked -> semantic fallbacks) or "hybrid" (single fused pass)
+SEARCH_ENGINE = "cascade"
+# Run the cascade tiers (exact, ranked, semantic) concurrently; the first hit by tier priority wins.
+# Off by default: the lexical tiers take ~1 ms, so a full miss already costs about the semantic
+# tier alone, while the query encoding competes for CPU with the common exact hit.
+SEARCH_CONCURRENT = False
+SEARCH_WORKERS = 3
+
+# Hybrid Retrieval (BM25 + trigram + vector, fused with reciprocal rank fusion)
+HYBRID_RRF_K = 60          # RRF damping constant (standard value)
+HYBRID_DEPTH = 50          # Candidates taken from each ranked list
+HYBRID_LIMIT = 100         # Max rows returned
+HYBRID_TRIGRAM_MIN = 0.65  # Name-level trigram similarity that alone accepts an item (typos)
+HYBRID_VECTOR_MIN = 0.45   # Cosine similarity that alone accepts an item (synonyms)
@@ -0,0 +1,107 @@
+"""
+Persistent memo of LLM ASR corrections.
+
+The same mishearings come back all day ("solder ion", "servo motor" variants) with
+the same candidate lists, so each (normalized transcript, sorted candidates) pair
+is answered by the LLM once and then read back from SQLite, across restarts.
+
+Entries are dropped when the set of item names changes (a rename or a new item
+may change the right answer) and when the user rejects a cached answer.
+Only positive corrections are stored: a None may just mean the LLM timed out.
+"""
+import hashlib
+import re
+from datetime import datetime
+import db_manager
+
+
+def normalize_transcript(text):
+    """
+    "Solder-ion, please." -> "solder ion please"
+    """
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def inventory_fingerprint(names=None):
+    """
+    Hash of the sorted item names (quantities and locations do not affect corrections).
+    """
+    names = names if names is not None else db_manager.get_all_item_names()
+    return hashlib.sha1("\n".join(sorted(names)).encode("utf-8")).hexdigest()[:16]
+
+
+class CorrectionCache:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        conn = db_manager.get_db_connection()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_corrections (
+                    cache_key TEXT PRIMARY KEY,
+                    transcript TEXT,
+                    result TEXT,
+                    inventory TEXT,
+                    hits INTEGER DEFAULT 0,
+                    created TEXT
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+        self.fingerprint = None
+        self._check_inventory()
+
+    @staticmethod
+    def key(transcript, candidates):
+        text = normalize_transcript(transcript) + "\n" + "\n".join(sorted(set(candidates)))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _check_inventory(self):
+        """
+        Drops every entry made against a different set of item names.
+        """
+        fingerprint = inventory_fingerprint()
+        if fingerprint == self.fingerprint: return
+        self.fingerprint = fingerprint
+        removed = db_manager.execute_query("DELETE FROM llm_corrections WHERE inventory != ?", (fingerprint,))
+        if removed:
+            print(f"Correction cache: inventory changed, dropped {removed} entries.")
+
+    def get(self, transcript, candidates):
+        """
+        Returns (cache key, cached correction or None).
+        """
+        self._check_inventory()
+        key = self.key(transcript, candidates)
+        res = db_manager.execute_query("SELECT result FROM llm_corrections WHERE cache_key = ?", (key,))
+        if not res:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        db_manager.execute_query("UPDATE llm_corrections SET hits = hits + 1 WHERE cache_key = ?", (key,))
+        return key, res[0][0]
+
+    def put(self, key, transcript, result):
+        if not result: return
+        db_manager.execute_query('''
+            INSERT OR REPLACE INTO llm_corrections (cache_key, transcript, result, inventory, hits, created)
+            VALUES (?, ?, ?, ?, 0, ?)
+        ''', (key, normalize_transcript(transcript), result, self.fingerprint, datetime.now().isoformat()))
+
+    def reject(self, key):
+        """
+        The user said the answer was wrong: forget it, so the next time the LLM is asked again.
+        """
+        if db_manager.execute_query("DELETE FROM llm_corrections WHERE cache_key = ?", (key,)):
+            self.rejected += 1
+            print("Correction cache: rejected answer removed.")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / float(lookups) if lookups else 0.0
+        res = db_manager.execute_query("SELECT count(*), coalesce(sum(hits), 0) FROM llm_corrections")
+        entries, lifetime_hits = res[0] if res else (0, 0)
+        return (f"{self.hits}/{lookups} hits ({rate:.0%}), {self.rejected} rejected | "
+                f"{entries} entries, {lifetime_hits} hits since they were stored")
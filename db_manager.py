@@ -1,9 +1,19 @@
 import sqlite3
-import pandas as pd
 import os
 import config
 from datetime import datetime
 
+# Bumped whenever item names are added, so in-memory name indexes
+# (FuzzyIndex, PhoneticIndex, HybridRetriever) know to rebuild
+_names_version = 0
+
+def names_version():
+    return _names_version
+
+def _names_changed():
+    global _names_version
+    _names_version += 1
+
 def get_db_connection():
     conn = sqlite3.connect(config.DB_PATH)
     return conn
@@ -46,6 +56,7 @@ def init_db(csv_path=None, csv_columns=None):
     if count == 0 and os.path.exists(target_csv):
         print(f"Loading data from {target_csv}...")
         try:
+            import pandas as pd # Only needed for the one-time CSV import
             df = pd.read_csv(target_csv)
             
             # Map columns if provided
@@ -81,6 +92,7 @@ def init_db(csv_path=None, csv_columns=None):
                     INSERT OR REPLACE INTO inventory (item_name, quantity, location, last_updated)
                     VALUES (?, ?, ?, ?)
                 ''', (str(item), qty, str(loc), timestamp))
+            _names_changed()
             print("Data loaded successfully.")
         except Exception as e:
             print(f"Error loading CSV: {e}")
@@ -286,6 +298,7 @@ def update_stock(item_name, quantity_change):
         if quantity_change > 0:
             execute_query("INSERT INTO inventory (item_name, quantity, location, last_updated) VALUES (?, ?, ?, ?)", 
                           (item_name, quantity_change, "Unknown Location", timestamp))
+            _names_changed()
             return (item_name, quantity_change)
         
         return f"Item {item_name} not found to remove from."
@@ -355,6 +368,18 @@ def get_all_item_names():
     conn.close()
     return [i[0] for i in items]
 
+def get_items_by_names(names):
+    """
+    Returns (item_name, quantity, location) rows for exact item names,
+    in the order the names are given (one round trip instead of one query per name).
+    """
+    if not names: return []
+    placeholders = ",".join("?" * len(names))
+    res = execute_query(f"SELECT item_name, quantity, location FROM inventory WHERE item_name IN ({placeholders})", tuple(names))
+    if not res: return []
+    order = {name: i for i, name in enumerate(names)}
+    return sorted(res, key=lambda r: order[r[0]])
+
 def save_memory(key, value):
     """
     Saves a key-value pair to user_memory.
@@ -0,0 +1,24 @@
+import os
+from download_llm_lite import download_file
+
+# all-MiniLM-L6-v2 exported to ONNX (official sentence-transformers repo), for config.NLP_BACKEND = "onnx"
+REPO_URL = "https://huggingface.co/sentence-transformers/all-MiniLM-L6-v2/resolve/main"
+FILES = {
+    "model.onnx": f"{REPO_URL}/onnx/model.onnx",
+    "tokenizer.json": f"{REPO_URL}/tokenizer.json",
+}
+TARGET_DIR = os.path.join("models", "all-MiniLM-L6-v2-onnx")
+
+def setup_nlp_onnx():
+    if not os.path.exists(TARGET_DIR):
+        os.makedirs(TARGET_DIR)
+
+    for filename, url in FILES.items():
+        target_path = os.path.join(TARGET_DIR, filename)
+        if not os.path.exists(target_path):
+            download_file(url, target_path)
+        else:
+            print(f"{filename} already exists.")
+
+if __name__ == "__main__":
+    setup_nlp_onnx()
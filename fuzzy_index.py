@@ -0,0 +1,172 @@
+"""
+Typo-tolerant lookup over the whole catalogue.
+
+Word level: a symmetric-delete index over every item-name word. Deleting up to
+N characters from both the query word and each catalogue word makes every pair
+within N edits meet on a shared key, so a misspelt word costs a few dozen dict
+lookups plus a bounded edit-distance check on the hits instead of a scan.
+
+Name level: cached character-trigram sets give similarity(), a cheap
+order-insensitive replacement for difflib.SequenceMatcher in sort keys.
+"""
+import re
+import db_manager
+
+# Words shorter than this are never fuzzy-matched ("ac", "5v")
+MIN_FUZZY_LEN = 3
+# Size-bounded cache of name trigram sets for similarity()
+_TRIGRAMS = {}
+
+
+def max_edits(word):
+    """
+    Edit budget by word length: 1 for 3-5 letters ("dhd" -> "dht", "moter" -> "motor"), 2 above.
+    """
+    if len(word) < MIN_FUZZY_LEN or not word.isalpha(): return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def edit_distance(a, b, max_dist):
+    """
+    Damerau-Levenshtein (adjacent transpositions) distance with early exit:
+    returns max_dist + 1 as soon as the distance must exceed max_dist.
+    """
+    if abs(len(a) - len(b)) > max_dist: return max_dist + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_dist: return max_dist + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def deletes(word, depth):
+    """
+    The word plus every string obtained by deleting up to 'depth' characters.
+    """
+    out = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def words(text):
+    """
+    Letter runs and digit runs: "RMCS1106 Driver" -> ["rmcs", "1106", "driver"].
+    """
+    return re.findall(r'[a-z]+|\d+', text.lower())
+
+
+def trigrams(text):
+    s = " " + " ".join(text.lower().split()) + " "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def similarity(a, b):
+    """
+    Trigram Dice similarity in [0, 1]. Trigram sets are cached, so sorting
+    candidates by similarity to the same query costs one set intersection each.
+    """
+    sets = []
+    for text in (a, b):
+        t = _TRIGRAMS.get(text)
+        if t is None:
+            if len(_TRIGRAMS) > 20000: _TRIGRAMS.clear()
+            t = _TRIGRAMS[text] = trigrams(text)
+        sets.append(t)
+    ta, tb = sets
+    if not ta or not tb: return 0.0
+    return 2.0 * len(ta & tb) / (len(ta) + len(tb))
+
+
+class FuzzyIndex:
+    """
+    Edit-distance-bounded item search. Every query word must match a word of the
+    item name exactly or within max_edits(word); numbers must match exactly.
+    """
+    def __init__(self, names=None):
+        self.version = db_manager.names_version() if names is None else None
+        self.build(names if names is not None else db_manager.get_all_item_names())
+
+    def build(self, names):
+        self.names = list(dict.fromkeys(names))
+        self.word_items = {}
+        for i, name in enumerate(self.names):
+            for w in set(words(name)):
+                self.word_items.setdefault(w, set()).add(i)
+
+        # Catalogue side uses the largest budget any query word can have
+        depth = max_edits("x" * 6)
+        self.delete_index = {}
+        for w in self.word_items:
+            if max_edits(w) == 0: continue
+            for d in deletes(w, depth):
+                self.delete_index.setdefault(d, []).append(w)
+        self._match_cache = {}
+
+    def refresh(self):
+        """
+        Rebuilds from the DB if an item was added since the last build (db_manager.names_version).
+        Indexes built from an explicit name list are left alone.
+        """
+        if self.version is None or self.version == db_manager.names_version(): return
+        self.version = db_manager.names_version()
+        self.build(db_manager.get_all_item_names())
+
+    def match_word(self, word):
+        """
+        Catalogue words within the edit budget of 'word': {catalogue_word: distance}.
+        An exact hit short-circuits, so a correctly spelt "motor" never matches "rotor".
+        """
+        cached = self._match_cache.get(word)
+        if cached is not None: return cached
+        if word in self.word_items:
+            matches = {word: 0}
+        else:
+            matches = {}
+            k = max_edits(word)
+            if k:
+                candidates = set()
+                for d in deletes(word, k):
+                    candidates.update(self.delete_index.get(d, ()))
+                for c in candidates:
+                    dist = edit_distance(word, c, k)
+                    if dist <= k: matches[c] = dist
+        if len(self._match_cache) > 4096: self._match_cache.clear()
+        self._match_cache[word] = matches
+        return matches
+
+    def search(self, query, limit=20):
+        """
+        Returns [(item_name, total_edits)] for items matching every query word, closest first.
+        """
+        self.refresh()
+        q_words = list(dict.fromkeys(words(query)))
+        if not q_words: return []
+        best = None # item id -> total edits
+        for w in q_words:
+            hits = {}
+            for match, dist in self.match_word(w).items():
+                for i in self.word_items[match]:
+                    if dist < hits.get(i, dist + 1): hits[i] = dist
+            if best is None:
+                best = hits
+            else:
+                best = {i: best[i] + d for i, d in hits.items() if i in best}
+            if not best: return []
+        ranked = sorted(best.items(), key=lambda kv: (kv[1], len(self.names[kv[0]])))
+        return [(self.names[i], dist) for i, dist in ranked[:limit]]
+
+    def search_rows(self, query):
+        """
+        search() as inventory rows (item_name, quantity, location), for a SearchPipeline stage.
+        """
+        return db_manager.get_items_by_names([name for name, dist in self.search(query)])
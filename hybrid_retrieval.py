@@ -0,0 +1,272 @@
+"""
+Hybrid lexical + vector retrieval with reciprocal rank fusion (RRF).
+
+One pass scores every candidate with three rankers:
+  lexical  BM25 over name tokens, with LIKE-style substring matching ("gear" -> "gearbox")
+  trigram  character-trigram Dice similarity (typos: "dhd sensor" -> "DHT Sensor")
+  vector   semantic index (optional; "wire" -> "cable")
+The ranked lists are fused with RRF, then hard numeric constraints are applied
+(a bare "10" in the query must appear as the integer 10 in the item name).
+"""
+import math
+import re
+import time
+import numpy as np
+import config
+import db_manager
+from fuzzy_index import FuzzyIndex, max_edits, trigrams
+
+
+# BM25 weight of a substring match ("9" inside "19v") and of a typo match, relative to an exact word
+SUBSTRING_WEIGHT = 0.6
+FUZZY_WEIGHT = 0.5
+
+
+def tokenize(text):
+    """
+    Same split as db_manager.search_items: "RMCS1106" -> "rmcs", "1106"; "13.5" stays whole.
+    """
+    words = []
+    for w in text.lower().split():
+        w = w.strip(".,?!")
+        if not w: continue
+        if re.match(r'^\d+\.\d+$', w):
+            words.append(w)
+        else:
+            words.extend(p for p in re.split(r'(\d+)', w) if p)
+    return words
+
+
+def token_variants(token):
+    """
+    Spellings the inventory uses for the same token ("13.5" -> "13point5", "x" -> "cross").
+    """
+    variants = [token]
+    if re.match(r'^\d+\.\d+$', token):
+        variants.append(token.replace(".", "point"))
+    elif "x" in token:
+        variants.append(token.replace("x", "cross"))
+    return variants
+
+
+def strict_ints(query):
+    """
+    Integers an item must contain: bare numbers ("10 rpm motor" -> {10}) and
+    numbers glued to a unit ("adaptor 9v" -> {9}, so "19V" is rejected).
+    Model codes ("esp32", "ut33d") are left to the rankers.
+    """
+    ints = set()
+    for w in query.lower().split():
+        m = re.match(r'^(\d+)[a-z]*$', w.strip(".,?!"))
+        if m: ints.add(int(m.group(1)))
+    return ints
+
+
+class RetrievalResult:
+    """
+    Ranked rows (item_name, quantity, location) plus per-stage timings (ms) and candidate counts.
+    """
+    def __init__(self, query):
+        self.query = query
+        self.rows = []
+        self.scores = {}   # item_name -> fused RRF score
+        self.timings = {}
+        self.counts = {}
+
+    def names(self):
+        return [r[0] for r in self.rows]
+
+    def summary(self):
+        stages = " | ".join(f"{k} {self.counts[k]} ({ms:.2f} ms)" if k in self.counts else f"{k} {ms:.2f} ms"
+                            for k, ms in self.timings.items())
+        return f"'{self.query}': {len(self.rows)} results | {stages}"
+
+
+class HybridRetriever:
+    """
+    In-memory index over item names. Quantities and locations are read from the DB
+    per query, so stock updates never need a rebuild; items added through db_manager
+    trigger one on the next search (refresh).
+    """
+    def __init__(self, names=None, vector_search=None, rrf_k=None, depth=None):
+        # vector_search(query, k) -> [(item_name, score)], e.g. semantic_search_inventory
+        self.vector_search = vector_search
+        self.rrf_k = rrf_k if rrf_k else config.HYBRID_RRF_K
+        self.depth = depth if depth else config.HYBRID_DEPTH
+        self.k1, self.b = 1.2, 0.75
+        self.version = db_manager.names_version() if names is None else None
+        self.build(names if names is not None else db_manager.get_all_item_names())
+
+    def build(self, names):
+        self.names = list(dict.fromkeys(names)) # Unique, order kept
+        self.doc_id = {name: i for i, name in enumerate(self.names)}
+        n = len(self.names)
+
+        term_docs = {}
+        tri_docs = {}
+        doc_len = np.zeros(n, dtype=np.float32)
+        self.doc_ints = []
+        self.doc_tri_count = np.zeros(n, dtype=np.float32)
+        for i, name in enumerate(self.names):
+            lower = name.lower()
+            # Index split tokens and raw words, so substring matches behave like SQL LIKE
+            tokens = tokenize(lower)
+            raw = [w.strip(".,?!") for w in lower.split()]
+            doc_len[i] = len(tokens)
+            for term in set(tokens) | set(raw):
+                if term: term_docs.setdefault(term, []).append(i)
+            tris = trigrams(lower)
+            self.doc_tri_count[i] = len(tris)
+            for t in tris:
+                tri_docs.setdefault(t, []).append(i)
+            self.doc_ints.append({int(x) for x in re.findall(r'\d+', lower)})
+
+        self.term_docs = {t: np.array(d, dtype=np.int32) for t, d in term_docs.items()}
+        self.tri_docs = {t: np.array(d, dtype=np.int32) for t, d in tri_docs.items()}
+        self.vocab = list(self.term_docs)
+        self.doc_len = doc_len
+        self.avg_len = float(doc_len.mean()) if n else 1.0
+        self.fuzzy = FuzzyIndex(self.names)
+        self._match_cache = {}
+
+    def refresh(self):
+        """
+        Rebuilds from the DB if an item was added since the last build (db_manager.names_version).
+        Indexes built from an explicit name list are left alone.
+        """
+        if self.version is None or self.version == db_manager.names_version(): return
+        self.version = db_manager.names_version()
+        self.build(db_manager.get_all_item_names())
+
+    def _docs_for_token(self, token):
+        """
+        Items matching one query token, with a match weight per item:
+        1.0 exact word, SUBSTRING_WEIGHT substring (LIKE semantics: "gear" in "gearbox"),
+        or, when nothing matches literally, a word within the fuzzy index's edit
+        budget scaled by FUZZY_WEIGHT ("multimetre" -> "multimeter", "moter" -> "motor").
+        """
+        cached = self._match_cache.get(token)
+        if cached is not None: return cached
+        variants = token_variants(token)
+        weights = {}
+        for term in self.vocab:
+            if term in variants:
+                w = 1.0
+            elif any(v in term for v in variants):
+                w = SUBSTRING_WEIGHT
+            else:
+                continue
+            for d in self.term_docs[term]:
+                if w > weights.get(d, 0.0): weights[d] = w
+
+        if not weights and max_edits(token):
+            for term, dist in self.fuzzy.match_word(token).items():
+                w = FUZZY_WEIGHT * (1.0 - dist / float(len(token)))
+                for d in self.term_docs.get(term, ()):
+                    if w > weights.get(d, 0.0): weights[d] = w
+
+        docs = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+        w = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        if len(self._match_cache) > 4096: self._match_cache.clear()
+        self._match_cache[token] = (docs, w)
+        return docs, w
+
+    # --- Rankers ---
+    def _lexical(self, tokens):
+        n = len(self.names)
+        scores = np.zeros(n, dtype=np.float32)
+        coverage = np.zeros(n, dtype=np.int32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / self.avg_len)
+        for token in set(tokens):
+            docs, weights = self._docs_for_token(token)
+            if not len(docs): continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += weights * idf * (self.k1 + 1) / (1 + norm[docs]) # Names are short: tf = 1
+            coverage[docs] += 1
+        return scores, coverage
+
+    def _trigram(self, query):
+        q = trigrams(query)
+        hits = [self.tri_docs[t] for t in q if t in self.tri_docs]
+        n = len(self.names)
+        if not hits: return np.zeros(n, dtype=np.float32)
+        shared = np.bincount(np.concatenate(hits), minlength=n).astype(np.float32)
+        return 2.0 * shared / (len(q) + self.doc_tri_count)
+
+    def _vector(self, query):
+        scores = {}
+        if self.vector_search is None: return scores
+        for name, score in self.vector_search(query, self.depth):
+            i = self.doc_id.get(name)
+            if i is not None: scores[i] = max(score, scores.get(i, -1.0))
+        return scores
+
+    # --- Query ---
+    def search(self, query, limit=None):
+        self.refresh()
+        limit = limit if limit else config.HYBRID_LIMIT
+        result = RetrievalResult(query)
+        total = time.perf_counter()
+        tokens = tokenize(query)
+        if not tokens or not self.names: return result
+
+        def timed(stage, t0, count):
+            result.timings[stage] = (time.perf_counter() - t0) * 1000.0
+            result.counts[stage] = count
+
+        t0 = time.perf_counter()
+        bm25, coverage = self._lexical(tokens)
+        timed("lexical", t0, int((coverage > 0).sum()))
+
+        t0 = time.perf_counter()
+        dice = self._trigram(query)
+        timed("trigram", t0, int((dice >= config.HYBRID_TRIGRAM_MIN).sum()))
+
+        t0 = time.perf_counter()
+        vec = self._vector(query)
+        timed("vector", t0, len(vec))
+
+        # Reciprocal rank fusion over the top 'depth' of each ranked list
+        t0 = time.perf_counter()
+        fused = {}
+        lists = [
+            [int(i) for i in np.argsort(-bm25)[:self.depth] if bm25[i] > 0],
+            [int(i) for i in np.argsort(-dice)[:self.depth] if dice[i] > 0],
+            sorted(vec, key=vec.get, reverse=True),
+        ]
+        for ranked in lists:
+            for rank, i in enumerate(ranked):
+                fused[i] = fused.get(i, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        timed("fuse", t0, len(fused))
+
+        # Acceptance: items matching every query token win outright (search_items semantics).
+        # Otherwise accept strong partial lexical, trigram or vector evidence.
+        t0 = time.perf_counter()
+        required = strict_ints(query)
+        n_tokens = len(set(tokens))
+        # Full matches beyond the fusion depth still count ("sensor" matches 60 items)
+        for i in np.nonzero(coverage == n_tokens)[0]:
+            fused.setdefault(int(i), 0.0)
+        candidates = [i for i in fused if required.issubset(self.doc_ints[i])]
+        accepted = [i for i in candidates if coverage[i] == n_tokens]
+        if not accepted:
+            max_cov = max((coverage[i] for i in candidates), default=0)
+            min_cov = max(2 if n_tokens >= 2 else 1, math.ceil(max_cov * 0.85))
+            accepted = [
+                i for i in candidates
+                if coverage[i] >= min_cov
+                or dice[i] >= config.HYBRID_TRIGRAM_MIN
+                or vec.get(i, 0.0) >= config.HYBRID_VECTOR_MIN
+            ]
+        accepted.sort(key=lambda i: (fused[i], bm25[i]), reverse=True)
+        accepted = accepted[:limit]
+        timed("constrain", t0, len(accepted))
+
+        t0 = time.perf_counter()
+        names = [self.names[i] for i in accepted]
+        result.rows = db_manager.get_items_by_names(names)
+        result.scores = {self.names[i]: fused[i] for i in accepted}
+        timed("fetch", t0, len(result.rows))
+
+        result.timings["total"] = (time.perf_counter() - total) * 1000.0
+        return result
@@ -1,54 +1,254 @@
 import config
+import json
 import os
+import platform
 import time
 
-try:
-    from llama_cpp import Llama
-    HAS_LLAMA = True
-except ImportError:
-    HAS_LLAMA = False
-    print("Warning: 'llama-cpp-python' module not found. Chat features will be disabled.")
+# GGML tensor type ids for the KV cache (llama.cpp ggml_type)
+KV_TYPES = {"f16": 1, "q8_0": 8, "q4_0": 2}
+
+# Candidate labels for choose_candidate ("0" = none of them)
+CANDIDATE_LABELS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Chat markup per model family: turn openers, turn terminator, generation stop strings
+PROMPT_TEMPLATES = {
+    "llama3": {
+        "system": "<|start_header_id|>system<|end_header_id|>\n\n",
+        "user": "<|start_header_id|>user<|end_header_id|>\n\n",
+        "assistant": "<|start_header_id|>assistant<|end_header_id|>\n\n",
+        "end": "<|eot_id|>",
+        "stop": ["<|eot_id|>", "<|end_of_text|>"],
+    },
+    "phi3": {
+        "system": "<|system|>\n",
+        "user": "<|user|>\n",
+        "assistant": "<|assistant|>\n",
+        "end": "<|end|>\n",
+        "stop": ["<|end|>", "<|endoftext|>"],
+    },
+    "zephyr": { # TinyLlama-Chat
+        "system": "<|system|>\n",
+        "user": "<|user|>\n",
+        "assistant": "<|assistant|>\n",
+        "end": "</s>\n",
+        "stop": ["</s>"],
+    },
+}
+
+def _import_llama():
+    """
+    Imports llama_cpp on first use (it maps a large native library).
+    Returns the Llama class, or None if the package is missing.
+    """
+    try:
+        from llama_cpp import Llama
+        return Llama
+    except ImportError:
+        print("Warning: 'llama-cpp-python' module not found. Chat features will be disabled.")
+        return None
+
+def detect_template(chat_template, model_path):
+    """
+    PROMPT_TEMPLATES key for a model: from the GGUF tokenizer.chat_template, else from
+    the file name. Llama 3 when neither is recognized.
+    """
+    chat_template = chat_template or ""
+    if "<|start_header_id|>" in chat_template: return "llama3"
+    if "<|end|>" in chat_template: return "phi3"
+    if "<|assistant|>" in chat_template: return "zephyr"
+    name = os.path.basename(model_path or "").lower()
+    if "phi-3" in name or "phi3" in name: return "phi3"
+    if "tinyllama" in name or "zephyr" in name: return "zephyr"
+    return "llama3"
+
+def llama_kwargs(params):
+    """
+    Tuning parameters as saved by tune_llm.py -> Llama() keyword arguments.
+    """
+    kwargs = {k: params[k] for k in ("n_threads", "n_batch", "use_mmap", "use_mlock") if k in params}
+    if "n_threads" in kwargs:
+        kwargs["n_threads_batch"] = kwargs["n_threads"] # Prefill uses its own thread count
+    kv_type = params.get("kv_type", "f16")
+    if kv_type != "f16":
+        kwargs["type_k"] = kwargs["type_v"] = KV_TYPES[kv_type]
+        kwargs["flash_attn"] = True # llama.cpp only quantizes the V cache with flash attention
+    return kwargs
+
+def load_tuned_params(model_path=None):
+    """
+    Llama() keyword arguments tuned on this host for this model (tune_llm.py), or {} if none.
+    """
+    path = config.LLM_TUNING_PATH
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            tuning = json.load(f)
+    except Exception as e:
+        print(f"Warning: could not read {path}: {e}")
+        return {}
+    entry = tuning.get(os.path.basename(model_path if model_path else config.LLM_MODEL_PATH))
+    if not entry:
+        return {}
+    if entry.get("host") != platform.node():
+        print(f"LLM tuning in {os.path.basename(path)} was made on '{entry.get('host')}'. Ignored; re-run tune_llm.py here.")
+        return {}
+    return llama_kwargs(entry["params"])
 
 class ChatEngine:
-    def __init__(self):
+    def __init__(self, model_path=None):
         self.enabled = False
+        # Static prompt prefix name -> (tokens, KV-cache copy of sequence 0 after evaluating them)
+        self._prefixes = {}
+        self.template = PROMPT_TEMPLATES["llama3"]
+        self.label_failures = 0 # choose_candidate calls whose labels were not single tokens
         
-        if not HAS_LLAMA:
+        Llama = _import_llama()
+        if Llama is None:
             print("Chat Engine Disabled: Missing llama-cpp-python.")
             return
 
-        if os.path.exists(config.LLM_MODEL_PATH):
-            print(f"Loading Local LLM (LlamaCPP): {config.LLM_MODEL_FILENAME}...")
+        model_path = model_path if model_path else config.LLM_MODEL_PATH
+        if os.path.exists(model_path):
+            print(f"Loading Local LLM (LlamaCPP): {os.path.basename(model_path)}...")
+            tuned = load_tuned_params(model_path)
+            if tuned:
+                print(f"LLM runtime tuning: {tuned}")
             try:
                 # Initialize Llama model
                 # n_gpu_layers=-1 to offload all to GPU if available, or set specific number
                 # n_ctx should match model support (Phi-3 is 4096)
                 self.llm = Llama(
-                    model_path=config.LLM_MODEL_PATH,
+                    model_path=model_path,
                     n_ctx=config.LLM_CONTEXT_WINDOW,
                     n_gpu_layers=config.LLM_GPU_LAYERS,
-                    verbose=False # Reduce noise
+                    verbose=False, # Reduce noise
+                    **tuned
                 )
+                metadata = getattr(self.llm, "metadata", None) or {}
+                template = detect_template(metadata.get("tokenizer.chat_template"), model_path)
+                self.template = PROMPT_TEMPLATES[template]
                 self.enabled = True
-                print("LLM Loaded Successfully.")
+                print(f"LLM Loaded Successfully ({template} prompt template).")
             except Exception as e:
                 print(f"Failed to load LLM: {e}")
                 print("Try: pip install llama-cpp-python")
         else:
-            print(f"LLM Model not found at {config.LLM_MODEL_PATH}. Chat features disabled.")
+            print(f"LLM Model not found at {model_path}. Chat features disabled.")
+
+    def close(self):
+        """
+        Frees the model weights and KV cache (called by the ModelRegistry on idle unload).
+        """
+        if getattr(self, "llm", None) is not None:
+            close = getattr(self.llm, "close", None)
+            if callable(close):
+                close()
+            self.llm = None
+        self._prefixes = {}
+        self.enabled = False
+
+    def _last_logits(self):
+        """
+        Logits of the last evaluated token, read from the llama.cpp context.
+        Llama.scores is only kept for every position with logits_all=True (n_ctx x n_vocab
+        floats); without it, llama-cpp-python 0.3+ leaves those rows zeroed or stale.
+        """
+        import numpy as np
+        import llama_cpp
+        ptr = llama_cpp.llama_get_logits_ith(self.llm.ctx, -1)
+        if not ptr:
+            raise ValueError("llama.cpp returned no logits for the last token")
+        logits = np.ctypeslib.as_array(ptr, shape=(self.llm.n_vocab(),)).astype(np.float64)
+        if not np.any(logits):
+            raise ValueError("last-token logits are all zero")
+        return logits
+
+    def _save_sequence(self):
+        """
+        Copy of the KV cache of sequence 0 (the evaluated tokens), or None if this
+        llama-cpp-python has no sequence state API. Only the KV data is kept: a full
+        save_state() also copies the logits buffer (rows x vocab floats, hundreds of MB).
+        """
+        import ctypes
+        import llama_cpp
+        if not hasattr(llama_cpp, "llama_state_seq_get_data"):
+            print("LLM prefix cache disabled: llama-cpp-python has no llama_state_seq_* API.")
+            config.LLM_PREFIX_CACHE = False
+            return None
+        size = llama_cpp.llama_state_seq_get_size(self.llm.ctx, 0)
+        buf = (ctypes.c_uint8 * size)()
+        if llama_cpp.llama_state_seq_get_data(self.llm.ctx, buf, size, 0) != size:
+            print("LLM prefix cache: could not copy the sequence state.")
+            return None
+        return buf
+
+    def _load_sequence(self, tokens, state):
+        """
+        Restores a _save_sequence() copy and the matching llama-cpp-python token bookkeeping,
+        so the next eval() continues right after 'tokens'.
+        """
+        import llama_cpp
+        if llama_cpp.llama_state_seq_set_data(self.llm.ctx, state, len(state), 0) != len(state):
+            raise ValueError("could not restore the prefix sequence state")
+        self.llm.n_tokens = len(tokens)
+        self.llm.input_ids[:len(tokens)] = tokens
+
+    def _prefill(self, name, prefix, suffix):
+        """
+        Evaluates prompt = static 'prefix' + dynamic 'suffix' and returns its tokens.
+        With config.LLM_PREFIX_CACHE the prefix is evaluated once per model load and
+        its llama.cpp state snapshotted; later calls restore the snapshot and prefill
+        only the suffix. Prefilled tokens and latency are printed either way.
+        """
+        start = time.time()
+        cached = self._prefixes.get(name) if config.LLM_PREFIX_CACHE else None
+        if cached is None:
+            prefix_tokens = self.llm.tokenize(prefix.encode("utf-8"), add_bos=True, special=True)
+        else:
+            prefix_tokens, state = cached
+        # Tokenized separately so the prefix tokens never depend on the suffix
+        suffix_tokens = self.llm.tokenize(suffix.encode("utf-8"), add_bos=False, special=True)
+
+        if cached is None:
+            self.llm.reset()
+            self.llm.eval(prefix_tokens)
+            if config.LLM_PREFIX_CACHE:
+                state = self._save_sequence()
+                if state is not None:
+                    self._prefixes[name] = (prefix_tokens, state)
+                    print(f"LLM Prefill ({name}): prefix state saved ({len(prefix_tokens)} tokens, "
+                          f"{len(state) / 1024.0 / 1024.0:.1f} MB)")
+            reused = 0
+        else:
+            self._load_sequence(prefix_tokens, state)
+            reused = len(prefix_tokens)
+        self.llm.eval(suffix_tokens)
+
+        tokens = prefix_tokens + suffix_tokens
+        print(f"LLM Prefill ({name}): {len(tokens) - reused} of {len(tokens)} tokens evaluated "
+              f"({reused} restored) in {time.time() - start:.2f}s")
+        return tokens
 
     def generate_reply(self, prompt, context_data=None):
+        return "".join(self.stream_reply(prompt, context_data)).strip()
+
+    def stream_reply(self, prompt, context_data=None):
+        """
+        generate_reply as a generator: yields the reply text piece by piece while it
+        is generated, so speech can start before the last token (tts_engine.Speaker.speak_stream).
+        """
         if not self.enabled:
-            return "My conversational engine is offline. Please run reinstall.bat to fix it."
+            yield "My conversational engine is offline. Please run reinstall.bat to fix it."
+            return
         
         # Build Context String from Memory
         memory_str = ""
         if context_data:
             memory_str = "Context from database:\n" + "\n".join([f"- {k}: {v}" for k,v in context_data.items()])
         
-        # Llama 3 Prompt Template
-        # <|start_header_id|>system<|end_header_id|>\n ... <|eot_id|><|start_header_id|>user<|end_header_id|>\n ... <|eot_id|><|start_header_id|>assistant<|end_header_id|>
-        
+        # Chat markup of this model (PROMPT_TEMPLATES): system turn, user turn, assistant opener
+        t = self.template
         system_msg = (
             "You are Invenova, an AI inventory assistant. "
             "STRICT RULES:\n"
@@ -58,39 +258,133 @@ class ChatEngine:
             "4. Be concise."
         )
         
-        full_prompt = (
-            f"<|start_header_id|>system<|end_header_id|>\n\n{system_msg}\n{memory_str}<|eot_id|>"
-            f"<|start_header_id|>user<|end_header_id|>\n\n{prompt}<|eot_id|>"
-            f"<|start_header_id|>assistant<|end_header_id|>\n\n"
+        static_prompt = f"{t['system']}{system_msg}\n"
+        dynamic_prompt = (
+            f"{memory_str}{t['end']}"
+            f"{t['user']}{prompt}{t['end']}"
+            f"{t['assistant']}"
         )
         
         print(f"LLM Thinking...")
         start = time.time()
+        first_token = None
+        n_chunks = 0
         
         try:
-            output = self.llm(
+            # The completion call finds these tokens already in the KV cache and only decodes
+            full_prompt = self._prefill("reply", static_prompt, dynamic_prompt)
+            stream = self.llm(
                 full_prompt, 
                 max_tokens=200, 
                 temperature=0.6,
-                stop=["<|eot_id|>", "<|end_of_text|>"],
-                echo=False
+                stop=t["stop"],
+                echo=False,
+                stream=True
             )
-            # LlamaCPP returns dict: {'choices': [{'text': '...', ...}], ...}
-            response = output['choices'][0]['text'].strip()
-            print(f"LLM Gen Time: {time.time() - start:.2f}s")
-            return response
+            # Each chunk: {'choices': [{'text': '<token text>', ...}], ...}
+            for chunk in stream:
+                text = chunk['choices'][0]['text']
+                if not text: continue
+                if first_token is None: first_token = time.time() - start
+                n_chunks += 1
+                yield text
+            print(f"LLM Gen Time: {time.time() - start:.2f}s ({n_chunks} tokens, first after {first_token or 0.0:.2f}s)")
         except Exception as e:
             print(f"LLM Error: {e}")
-            return "I encountered an error while thinking."
+            yield "I encountered an error while thinking."
 
     def correct_query(self, user_text, candidates):
         """
         Uses LLM to correct ASR errors by selecting the best match from candidates.
         candidates: List of item names (strings).
         Returns: Corrected item name or None.
+        config.LLM_CORRECTION_MODE "score" picks by candidate likelihood (no generation),
+        "generate" asks for free text and maps it back to a candidate.
         """
         if not self.enabled or not candidates:
             return None
+        if config.LLM_CORRECTION_MODE != "score":
+            return self._generate_correction(user_text, candidates)
+
+        index, confidence = self.choose_candidate(user_text, candidates)
+        if index is None:
+            return None
+        if confidence < config.LLM_CORRECTION_MIN_CONFIDENCE:
+            print(f"LLM Correction rejected: '{candidates[index]}' (confidence {confidence:.2f})")
+            return None
+        print(f"LLM Correction: '{user_text}' -> '{candidates[index]}' (confidence {confidence:.2f})")
+        return candidates[index]
+
+    def choose_candidate(self, user_text, candidates):
+        """
+        Constrained correction: the candidates are labelled A, B, C..., "0" means none
+        of them, and the answer is read from the logits of the first reply token after one
+        forward pass over the prompt. Nothing is generated, so the model can only
+        pick a listed label.
+        Returns (candidate index or None, confidence), confidence being the
+        probability of the chosen label among all labels.
+        """
+        if not self.enabled or not candidates:
+            return None, 0.0
+        import numpy as np
+
+        # Single letters keep every label one token for every tokenizer (numbers past 9 would not be)
+        if len(candidates) > len(CANDIDATE_LABELS):
+            print(f"LLM Correction: scoring the first {len(CANDIDATE_LABELS)} of {len(candidates)} candidates.")
+            candidates = candidates[:len(CANDIDATE_LABELS)]
+        labels = ["0"] + list(CANDIDATE_LABELS[:len(candidates)])
+        candidates_str = "\n".join([f"{labels[i+1]}. {c}" for i, c in enumerate(candidates)])
+        system_msg = (
+            "You are an ASR Correction Assistant. Your job is to match a noisy audio transcript to the correct item from a list.\n"
+            "Answer with the letter of the item only. Answer 0 if no item matches."
+        )
+        t = self.template
+        static_prompt = (
+            f"{t['system']}{system_msg}{t['end']}"
+            f"{t['user']}"
+            f"Candidate List:\n0. None of these\n"
+        )
+        dynamic_prompt = (
+            f"{candidates_str}\n\n"
+            f"User Audio Input: '{user_text}'\n"
+            f"Which item did they mean?{t['end']}"
+            f"{t['assistant']}"
+        ).encode("utf-8")
+
+        start = time.time()
+        try:
+            suffix = self.llm.tokenize(dynamic_prompt, add_bos=False, special=True)
+            # Label token as it follows the prompt (tokenizers may merge it with a leading space)
+            label_ids = []
+            for label in labels:
+                full = self.llm.tokenize(dynamic_prompt + label.encode("utf-8"), add_bos=False, special=True)
+                if full[:len(suffix)] != suffix or len(full) != len(suffix) + 1:
+                    # Not a wrong answer: this tokenizer cannot be scored this way (bench_llm counts these)
+                    self.label_failures += 1
+                    print(f"LLM Correction Error: label {label} is not a single token after the prompt")
+                    return None, 0.0
+                label_ids.append(full[-1])
+
+            tokens = self._prefill("correct", static_prompt, dynamic_prompt.decode("utf-8"))
+            logits = self._last_logits()[label_ids]
+        except Exception as e:
+            print(f"LLM Correction Error: {e}")
+            return None, 0.0
+
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        label = int(probs.argmax())
+        print(f"LLM Scored {len(candidates)} candidates in {time.time() - start:.2f}s "
+              f"({len(tokens)} prompt tokens, 0 generated): label {labels[label]} p={probs[label]:.2f}")
+        if label == 0:
+            return None, float(probs[0])
+        return label - 1, float(probs[label])
+
+    def _generate_correction(self, user_text, candidates):
+        """
+        Free-text correction: up to 50 generated tokens, mapped back to a candidate
+        by substring and token-overlap heuristics.
+        """
 
         # Format candidates list
         # "1. DC Motor\n2. AC Motor..."
@@ -104,22 +398,27 @@ class ChatEngine:
             "3. If NO reasonable match exists, validly return 'None'.\n"
         )
         
-        prompt = (
-            f"<|start_header_id|>system<|end_header_id|>\n\n{system_msg}<|eot_id|>"
-            f"<|start_header_id|>user<|end_header_id|>\n\n"
-            f"Candidate List:\n{candidates_str}\n\n"
+        t = self.template
+        static_prompt = (
+            f"{t['system']}{system_msg}{t['end']}"
+            f"{t['user']}"
+            f"Candidate List:\n"
+        )
+        dynamic_prompt = (
+            f"{candidates_str}\n\n"
             f"User Audio Input: '{user_text}'\n"
-            f"Which item did they mean?<|eot_id|>"
-            f"<|start_header_id|>assistant<|end_header_id|>\n\n"
+            f"Which item did they mean?{t['end']}"
+            f"{t['assistant']}"
         )
 
         print(f"LLM Correcting '{user_text}' against {len(candidates)} candidates...")
         try:
+            prompt = self._prefill("correct_generate", static_prompt, dynamic_prompt)
             output = self.llm(
                 prompt,
                 max_tokens=50, 
                 temperature=0.1, # Low temp for precision
-                stop=["<|eot_id|>", "<|end_of_text|>", "\n"],
+                stop=t["stop"] + ["\n"],
                 echo=False
             )
             response = output['choices'][0]['text'].strip()
@@ -0,0 +1,286 @@
+"""
+ChatEngine hosted in a child process, so a slow or wedged llama.cpp call can never
+freeze the voice loop.
+
+Requests go to the worker over a queue and every call has a deadline. When the
+deadline passes, the caller gets the same answer as if the LLM were unavailable
+(None / the offline reply) and the request is cancelled. Queued requests are then
+skipped, and a streaming reply stops at the next token. A request still running
+LLM_KILL_GRACE_SEC after its deadline is treated as wedged: the worker is killed
+and restarted, as it is after a crash.
+
+The model loads in the background: the constructor only spawns the worker, and a
+request made before it is ready waits for it no longer than its own deadline.
+Restarts back off exponentially, and after LLM_MAX_RESTARTS crashes in a row
+without a single answer the worker is given up on (no LLM until the next load).
+"""
+import multiprocessing as mp
+import queue
+import threading
+import time
+import config
+from model_registry import read_rss_mb
+
+TIMEOUT_REPLY = "Sorry, that is taking too long. Please ask me again."
+
+
+def _worker_main(requests, responses, cancel_upto):
+    """
+    Child process: loads the model, then serves (req_id, method, args) requests in order.
+    Responses are (req_id, kind, payload), kind in ready/start/result/chunk/done/cancelled/error.
+    """
+    from llm_engine import ChatEngine
+    engine = ChatEngine()
+    responses.put((0, "ready", engine.enabled))
+    while True:
+        msg = requests.get()
+        if msg is None: break
+        req_id, method, args = msg
+        if req_id <= cancel_upto.value:
+            responses.put((req_id, "cancelled", None))
+            continue
+        responses.put((req_id, "start", None))
+        try:
+            if method == "stream_reply":
+                stream = engine.stream_reply(*args)
+                for piece in stream:
+                    if req_id <= cancel_upto.value:
+                        stream.close() # Stops the llama.cpp generation loop
+                        break
+                    responses.put((req_id, "chunk", piece))
+                responses.put((req_id, "done", None))
+            else:
+                responses.put((req_id, "result", getattr(engine, method)(*args)))
+        except Exception as e:
+            responses.put((req_id, "error", repr(e)))
+    engine.close()
+
+
+class LLMWorker:
+    """
+    Same calls as ChatEngine (correct_query, choose_candidate, generate_reply,
+    stream_reply, close), answered by a worker process within config.LLM_DEADLINE_SEC.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.timeouts = 0
+        self.restarts = 0
+        self.failed = False # Gave up after LLM_MAX_RESTARTS crashes in a row
+        self._crashes = 0 # Consecutive worker deaths without an answer in between
+        self._ctx = mp.get_context("spawn") # No fork: the parent runs loader and monitor threads
+        self._lock = threading.Lock()
+        self._ready = threading.Event() # Set while a loaded worker is serving requests
+        self._pending = {} # req_id -> queue.Queue of (kind, payload)
+        self._next_id = 0
+        self._busy_id = None
+        self._closing = False
+        self._process = None
+        self._start() # Returns at once; the model loads in the worker
+
+    # --- Process lifecycle ---
+    def _start(self):
+        if self._closing: return
+        self._requests = self._ctx.Queue()
+        self._responses = self._ctx.Queue()
+        self._cancel_upto = self._ctx.Value("q", self._next_id, lock=False)
+        self._process = self._ctx.Process(target=_worker_main, name="llm-worker", daemon=True,
+                                          args=(self._requests, self._responses, self._cancel_upto))
+        self._process.start()
+        print(f"LLM worker started (pid {self._process.pid}).")
+        threading.Thread(target=self._read_responses, args=(self._process, self._responses),
+                         name="llm-reader", daemon=True).start()
+        timer = threading.Timer(config.LLM_LOAD_TIMEOUT_SEC, self._kill_if_loading, args=(self._process,))
+        timer.daemon = True
+        timer.start()
+
+    def _read_responses(self, process, responses):
+        """
+        Routes worker responses to the waiting callers; restarts the worker if it dies.
+        """
+        while True:
+            try:
+                req_id, kind, payload = responses.get(timeout=0.5)
+            except queue.Empty:
+                if process.is_alive(): continue
+                if self._closing or process is not self._process: return
+                self.enabled = False
+                self._ready.clear()
+                self._busy_id = None
+                with self._lock:
+                    pending, self._pending = self._pending, {}
+                for q in pending.values():
+                    q.put(("error", "worker died"))
+                self._crashes += 1
+                if self._crashes > config.LLM_MAX_RESTARTS:
+                    self.failed = True
+                    print(f"LLM worker died (exit code {process.exitcode}) {self._crashes} times in a row. "
+                          f"Giving up; continuing without the LLM.")
+                    return
+                backoff = config.LLM_RESTART_BACKOFF_SEC * 2 ** (self._crashes - 1)
+                print(f"LLM worker died (exit code {process.exitcode}). Restarting in {backoff:.1f}s...")
+                self.restarts += 1
+                timer = threading.Timer(backoff, self._start)
+                timer.daemon = True
+                timer.start()
+                return
+            if kind == "ready":
+                self.enabled = payload
+                self._ready.set()
+                print(f"LLM worker ready (enabled={payload}).")
+                continue
+            if kind in ("result", "done"):
+                self._crashes = 0
+            if kind == "start":
+                self._busy_id = req_id
+                continue
+            if kind in ("result", "done", "cancelled", "error") and self._busy_id == req_id:
+                self._busy_id = None
+            with self._lock:
+                q = self._pending.get(req_id)
+            if q is not None:
+                q.put((kind, payload))
+
+    def _kill_if_loading(self, process):
+        """
+        A worker that is not ready after LLM_LOAD_TIMEOUT_SEC is stuck loading: kill it
+        (counted as a crash, so restarts back off).
+        """
+        if self._closing or process is not self._process or self._ready.is_set(): return
+        if process.is_alive():
+            print(f"LLM worker not ready after {config.LLM_LOAD_TIMEOUT_SEC:.0f}s. Killing it.")
+            process.kill()
+
+    def _kill_if_busy(self, req_id):
+        """
+        Deadline + grace passed: if the request is still running, the worker is wedged.
+        """
+        if self._closing: return
+        if self._busy_id == req_id and self._process is not None and self._process.is_alive():
+            print(f"LLM worker stuck on request {req_id}. Killing it.")
+            self._process.kill() # The reader notices and restarts it
+
+    def close(self):
+        """
+        Stops the worker process, which frees all model memory (registry idle unload).
+        """
+        self._closing = True
+        self.enabled = False
+        process = self._process
+        if process is None: return
+        try:
+            self._requests.put(None)
+            process.join(timeout=2.0)
+        except Exception:
+            pass
+        if process.is_alive():
+            process.kill()
+        self._process = None
+
+    def rss_mb(self):
+        """
+        Resident memory of the worker process (counted by the ModelRegistry memory budget).
+        """
+        process = self._process
+        return read_rss_mb(process.pid) if process is not None and process.is_alive() else None
+
+    # --- Requests ---
+    def _submit(self, method, args):
+        with self._lock:
+            self._next_id += 1
+            req_id = self._next_id
+            q = self._pending[req_id] = queue.Queue()
+        self._requests.put((req_id, method, args))
+        return req_id, q
+
+    def _finish(self, req_id):
+        with self._lock:
+            self._pending.pop(req_id, None)
+
+    def cancel(self, req_id=None):
+        """
+        Cancels request 'req_id' and everything queued before it (default: all outstanding).
+        """
+        req_id = req_id if req_id is not None else self._next_id
+        if req_id > self._cancel_upto.value:
+            self._cancel_upto.value = req_id
+
+    def _timed_out(self, req_id, method, deadline):
+        self.timeouts += 1
+        print(f"LLM {method} missed its {deadline:.1f}s deadline. Cancelled; answering without the LLM.")
+        self.cancel(req_id)
+        timer = threading.Timer(config.LLM_KILL_GRACE_SEC, self._kill_if_busy, args=(req_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _wait_ready(self, method, deadline):
+        """
+        Waits up to 'deadline' for the worker to finish loading. False: answer without the LLM.
+        """
+        if self.failed or self._closing: return False
+        if not self._ready.wait(deadline):
+            self.timeouts += 1
+            print(f"LLM {method}: worker still loading after {deadline:.1f}s; answering without the LLM.")
+            return False
+        return self.enabled
+
+    def _call(self, method, args, deadline, fallback):
+        start = time.time()
+        if not self._wait_ready(method, deadline):
+            return fallback
+        deadline = max(0.1, deadline - (time.time() - start))
+        req_id, q = self._submit(method, args)
+        try:
+            kind, payload = q.get(timeout=deadline)
+        except queue.Empty:
+            self._timed_out(req_id, method, deadline)
+            return fallback
+        except BaseException:
+            self.cancel(req_id) # Ctrl+C while waiting
+            raise
+        finally:
+            self._finish(req_id)
+        if kind != "result":
+            print(f"LLM {method} failed ({kind}: {payload}).")
+            return fallback
+        print(f"LLM {method} answered in {time.time() - start:.2f}s (worker).")
+        return payload
+
+    def correct_query(self, user_text, candidates):
+        return self._call("correct_query", (user_text, candidates), config.LLM_DEADLINE_SEC, None)
+
+    def choose_candidate(self, user_text, candidates):
+        return self._call("choose_candidate", (user_text, candidates), config.LLM_DEADLINE_SEC, (None, 0.0))
+
+    def generate_reply(self, prompt, context_data=None):
+        return self._call("generate_reply", (prompt, context_data), config.LLM_REPLY_DEADLINE_SEC, TIMEOUT_REPLY)
+
+    def stream_reply(self, prompt, context_data=None):
+        """
+        Yields reply pieces as the worker produces them. The deadline applies to the
+        first piece and to every gap between pieces; closing the generator early
+        cancels the generation.
+        """
+        if not self._wait_ready("stream_reply", config.LLM_DEADLINE_SEC):
+            yield TIMEOUT_REPLY
+            return
+        req_id, q = self._submit("stream_reply", (prompt, context_data))
+        got_any = False
+        try:
+            while True:
+                try:
+                    kind, payload = q.get(timeout=config.LLM_DEADLINE_SEC)
+                except queue.Empty:
+                    self._timed_out(req_id, "stream_reply", config.LLM_DEADLINE_SEC)
+                    if not got_any: yield TIMEOUT_REPLY
+                    return
+                if kind == "chunk":
+                    got_any = True
+                    yield payload
+                    continue
+                if kind != "done":
+                    print(f"LLM stream_reply failed ({kind}: {payload}).")
+                    if not got_any: yield TIMEOUT_REPLY
+                return
+        finally:
+            self.cancel(req_id) # No-op once done; stops generation if the consumer quit early
+            self._finish(req_id)
@@ -1,7 +1,6 @@
 import os
 import sys
-# Fix DLLs immediately
-import dll_fix 
+# NOTE: dll_fix (imports torch) is applied by asr_engine only when CUDA is used
 import time
 import argparse
 import site
@@ -40,6 +39,7 @@ from nlp_engine import IntentParser
 from asr_engine import VoiceListener
 from tts_engine import Speaker
 from llm_engine import ChatEngine
+from llm_worker import LLMWorker
 
 # Helper to extract specs (RPM, Voltage, etc.) from a list of names
 def extract_specs(names):
@@ -298,8 +298,18 @@ from asr_engine import VoiceListener, AudioRecorder
 from nlp_engine import IntentParser
 from tts_engine import Speaker
 import db_manager
+import alias_engine
+from model_registry import ModelRegistry
+from semantic_index import PersistentSemanticIndex
+import vector_index
+from phonetic_index import PhoneticIndex
+from correction_cache import CorrectionCache
+from search_pipeline import build_pipeline, filter_by_critical_tokens, filter_by_strict_numbers
 
 # ------------------ SEARCH HELPERS --------------------
+# Start of a turn that rejects the previous answer
+REJECTION_PATTERN = re.compile(r"^(no\b|nope\b|wrong\b|not that\b|that's not\b|that is not\b|i meant\b|i said\b|actually\b)")
+
 def clean_entity_name(item_name):
     """
     Removes linguistic artifacts that NLP might capture as part of the item name.
@@ -335,169 +345,15 @@ def clean_entity_name(item_name):
              clean = clean[len(s):].strip()
     
     # --- ALIAS MAPPING ---
-    # Explicit synonyms for robust search
-    # Map LOWERCASE phrase -> DB Term
-    SEARCH_ALIASES = {
-        # --- POWER & BATTERIES ---
-        "universal power supply": "ups",
-        "uninterruptible power supply": "ups",
-        "backup power": "ups",
-        "battery backup": "ups",
-        "lipo": "lithium polymer",
-        "li po": "lithium polymer",
-        "lithium polymer": "lipo", # Or reverse depending on DB. DB has "Lipo" or "Lead Acid"
-        "adapter": "adaptor", # Spell fix
-        "smps": "switched mode power supply",
-        "power supply": "variable power supply", # Default to bench supply if vague? Or list all.
-        
-        # --- BOARDS & CONTROLLERS ---
-        "rpi": "raspberry pi",
-        "pi": "raspberry pi",
-        "raspi": "raspberry pi",
-        "arduino": "development board arduino", # Triggers wider search
-        "esp8266": "development board esp8266",
-        "esp32": "development board esp 32",
-        "nucleo": "stm32",
-        "flight controller": "drone flight controller",
-        "kk board": "drone flight controller kk board",
-        
-        # --- COMPONENTS ---
-        "led": "led",
-        "resistor": "resistors microssed", # DB has "Resistors Microssed"
-        "capacitor": "capacitor",
-        "pot": "potentiometer",
-        "variable resistor": "potentiometer",
-        "stepper": "stepper motor",
-        "servo": "servo motor",
-        "bldc": "bldc motor",
-        "motor driver": "motor driver module",
-        "relay": "relay module",
-        "display": "lcd display",
-        "screen": "lcd display",
-        "oled": "oled display",
-        
-        # --- TOOLS ---
-        "soldering iron": "soldering station", # Prefer station or iron? DB has both. "Soldering Iron" finds specific.
-        "solder ion": "soldering iron",     # Correc AS
-        "solder gun": "soldering iron",
-        "multimeter": "multimeter", # DB has "Multimeter UT33D", etc.
-        "dmm": "multimeter",
-        "cro": "oscilloscope",
-        "dso": "oscilloscope",
-        "scope": "oscilloscope",
-        "function generator": "waveform generator",
-        "glue gun": "glue gun 60w",
-        "hot glue": "glue sticks",
-        
-        # --- CABLES & CONN ---
-        "usb cable": "arduino cable usb",
-        "jumper": "jumper wires",
-        "connector": "connector",
-        "header": "berg pins",
-        
-        # --- SENSORS ---
-        "distance sensor": "ultrasonic sensor",
-        "sonar": "ultrasonic sensor",
-        "line sensor": "ir sensor module",
-        "ir sensor": "ir sensor module",
-        "pir": "sensor pir",
-        "motion sensor": "sensor pir",
-        "gas sensor": "sensor mq", # Triggers MQ list
-        "smoke sensor": "sensor mq 2",
-        "temp sensor": "temperature sensor",
-        "humidity sensor": "dht sensor",
-        "dht": "dht sensor",
-        "imu": "sensor imu",
-        "gyro": "sensor gyroscopic",
-        "magnetometer": "sensor imu",
-        "accel": "accelerometer sensor",
-        
-        # --- BRAND SPECIFIC ---
-        "ni": "national instruments",
-        "myrio": "ni myrio",
-        "roborio": "robo rio",
-        "keysight": "keysight",
-        "tektronix": "tektronicross", # DB spelling fix "Tektronicross"
-        "tektronics": "tektronicross"
-    }
-    
-    if clean in SEARCH_ALIASES:
-        return SEARCH_ALIASES[clean]
-
-    return clean
-
-def filter_by_critical_tokens(results, query):
-    """
-    Enforces that keywords present in BOTH the query and the top result
-    must be present in all other results.
-    Ex: Query "Plastic Gearbox". Top Result "DC Motor Plastic Gear...".
-    Critical: "Plastic", "Gear".
-    Item "Metal Gearbox" (Missing Plastic): Dropped.
-    """
-    if not results: return []
-    
-    # 1. Identify Critical Tokens from Top Result
-    top_item = results[0][0].lower()
-    query_tokens = query.lower().split()
-    
-    critical_tokens = []
-    # Stopwords to ignore
-    stopwords = {"s", "parts", "part", "item", "items", "the", "a", "an", "of", "in", "is", "are", "do", "you", "have", "looking", "for", "please", "show", "me", "where", "stock", "check", "find", "search", "list", "all"}
-    
-    for token in query_tokens:
-        clean_token = token.strip(".,?!")
-        if clean_token in stopwords: continue
-        
-        # If token from query is found in the top result, it is critical
-        if clean_token in top_item:
-            critical_tokens.append(clean_token)
-            
-    if not critical_tokens:
-        return results
-    
-    # 2. Filter Results
-    filtered = []
-    for r in results:
-        name = r[0].lower()
-        if all(token in name for token in critical_tokens):
-            filtered.append(r)
-            
-    return filtered
-
-def filter_by_strict_numbers(results, query):
-    """
-    Enforces EXACT number matching.
-    Query: "10 RPM" -> Must contain integer "10".
-    Result "100 RPM" -> Contains "100" (Not "10") -> REJECT.
-    Result "10 RPM" -> Contains "10" -> ACCEPT.
-    """
-    if not results: return []
-    
-    # Extract standalone digits from query
-    import re
-    # Look for digits bounded by non-digits
-    q_nums = set(re.findall(r'\b\d+\b', query))
-    
-    if not q_nums: 
-        return results
-
-    # print(f"DEBUG: Strict Num Check: Need {q_nums}")
-    
-    filtered = []
-    for r in results:
-        # Extract standalone digits from item name
-        r_text = r[0]
-        # normalize "1.5" -> "1" "5" is fine for now, but usually looking for integers
-        r_nums = set(re.findall(r'\b\d+\b', r_text))
-        
-        # Check subset: Query numbers must be in Result numbers
-        if q_nums.issubset(r_nums):
-            filtered.append(r)
-            
-    return filtered
+    # Explicit synonyms for robust search, loaded from search_aliases.csv.
+    # Longest-match expansion: generic aliases only for the whole phrase ("display" -> "lcd display"),
+    # specific ones anywhere in it ("red servo" -> "red servo motor")
+    return alias_engine.expand_aliases(clean)
 
 # Semantic Search Global Index
-SEMANTIC_INDEX = None # (item_names_list, embeddings_tensor)
+SEMANTIC_INDEX = None # (item_names_list, normalized embeddings matrix)
+# Search structure over SEMANTIC_INDEX: exact, quantized or approximate (see config.VECTOR_INDEX)
+VECTOR_INDEX = None
 
 def semantic_search_inventory(query, nlp, threshold=0.45):
     """
@@ -505,34 +361,72 @@ def semantic_search_inventory(query, nlp, threshold=0.45):
     Ex: "Servo Motor" -> "MG996R TowerPro"
     """
     global SEMANTIC_INDEX
-    if not SEMANTIC_INDEX: return []
-    
-    import torch
-    from sentence_transformers import util
+    if not SEMANTIC_INDEX or VECTOR_INDEX is None: return []
     
     item_names, item_embs = SEMANTIC_INDEX
     # Encode user query
     query_emb = nlp.encode_text(query)
-    
-    # Cosine Similarity
-    scores = util.cos_sim(query_emb, item_embs)[0]
+
+    # Cosine similarity + top 5 in NumPy (no torch needed on this path)
+    scores, indices = VECTOR_INDEX.search(query_emb, k=5)
     
     results = []
-    # Get top 5 matches
-    # scores is a tensor. We use torch.topk
-    k = min(5, len(item_names))
-    if k == 0: return []
-    
-    top_results = torch.topk(scores, k=k)
-    
-    for score, idx in zip(top_results.values, top_results.indices):
-        if score.item() < threshold: continue
-        name = item_names[idx.item()]
+    for score, idx in zip(scores, indices):
+        if score < threshold: continue
         # Return matched name and score
-        results.append((name, score.item()))
+        results.append((item_names[idx], float(score)))
         
     return results
 
+def build_vector_index(store, item_names, item_embs):
+    """
+    Builds the search structure for the semantic index: exact (float32), quantized
+    (int8/float16) or, for large catalogues, approximate IVF-PQ (cached on disk).
+    """
+    index = vector_index.make_vector_index(len(item_names))
+    if index.kind == "exact":
+        # Rows are stored pre-normalized, so this wraps the memory map without copying
+        return index.build(item_embs, normalized=True)
+
+    if index.kind == "quantized":
+        # Cheap to build (one pass), so no disk cache
+        index.build(item_embs)
+        print(f"Quantized semantic index ({index.precision}): {index.memory_bytes() / 1e6:.2f} MB "
+              f"vs {len(item_names) * item_embs.shape[1] * 4 / 1e6:.2f} MB float32.")
+        return index
+
+    cache_path = os.path.join(config.SEMANTIC_INDEX_DIR, "ann_index.npz")
+    fingerprint = store.fingerprint()
+    t0 = time.time()
+    if index.load(cache_path, fingerprint, vectors=item_embs):
+        print(f"ANN index loaded from disk ({len(index)} items).")
+    else:
+        print(f"Building ANN index ({index.kind}) for {len(item_names)} items...")
+        index.build(item_embs)
+        index.save(cache_path, fingerprint)
+        print(f"ANN index built in {time.time()-t0:.1f}s ({index.memory_bytes() / 1e6:.1f} MB).")
+    return index
+
+def build_semantic_index(nlp):
+    """
+    Loads SEMANTIC_INDEX from disk, embedding only items that are new or renamed
+    since the last run (see semantic_index.PersistentSemanticIndex).
+    """
+    global SEMANTIC_INDEX, VECTOR_INDEX
+    print("Constructing Semantic Index...")
+    all_items = db_manager.get_all_item_names()
+    if all_items:
+        print(f"Indexing {len(all_items)} items...")
+        store = PersistentSemanticIndex()
+        item_names, item_embs = store.sync(all_items, nlp.encode_text)
+        # Publish the search structure before the index so searches never see one without the other
+        VECTOR_INDEX = build_vector_index(store, item_names, item_embs)
+        SEMANTIC_INDEX = (item_names, item_embs)
+        print("Semantic Index Ready.")
+    else:
+        print("Warning: Inventory empty. Semantic Index skipped.")
+    return SEMANTIC_INDEX
+
 # ------------------ CSV CONFIG ------------------------
 CSV_PATH = "inventory.csv"
 
@@ -557,46 +451,65 @@ def main():
         print(f"Database initialization failed: {e}")
         return
 
-    # 2️⃣ Load Models
-    try:
-        print("Loading ASR...")
-        # Fetch vocabulary for ASR Priming
-        print("Fetching Dynamic Vocabulary for ASR...")
-        db_vocab = db_manager.get_unique_vocabulary()
-        asr = VoiceListener(dynamic_vocab=db_vocab)
-
-        print("Loading NLP...")
-        nlp = IntentParser()
-        
-        # Init Semantic Index
-        print("Constructing Semantic Index...")
-        all_items = db_manager.get_all_item_names()
-        if all_items:
-            print(f"Indexing {len(all_items)} items...")
-            item_embs = nlp.encode_text(all_items)
-            global SEMANTIC_INDEX
-            SEMANTIC_INDEX = (all_items, item_embs)
-            print("Semantic Index Ready.")
-        else:
-            print("Warning: Inventory empty. Semantic Index skipped.")
-        
-        print("Loading Chat Engine...")
-        chat_ai = ChatEngine()
-
-        print("Loading TTS...")
-        tts = Speaker()
+    # 2️⃣ Register Models (loaded concurrently on a thread pool)
+    # Dependencies: ASR priming needs the DB vocabulary, the semantic index needs the NLP model.
+    # The LLM is only needed on the rare correct_query path, so it is never loaded
+    # up front and is unloaded again when idle or when RAM runs short.
+    registry = ModelRegistry()
+
+    registry.register("vocab", db_manager.get_unique_vocabulary)
+    registry.register("asr", lambda vocab: VoiceListener(dynamic_vocab=vocab), deps=("vocab",))
+    registry.register("nlp", IntentParser)
+    registry.register("index", build_semantic_index, deps=("nlp",))
+    registry.register("tts", Speaker, unload_priority=1)
+    # Out of process: every LLM call has a deadline and a stuck worker is restarted
+    llm_loader = LLMWorker if config.LLM_OUT_OF_PROCESS else ChatEngine
+    registry.register("llm", llm_loader, unload_priority=0, idle_unload=config.LLM_IDLE_UNLOAD_SEC)
+
+    # Longest loads first so the critical path starts immediately
+    registry.start(["asr", "nlp", "vocab", "tts", "index"])
+    registry.start_monitor()
+
+    asr = registry.proxy("asr")
+    nlp = registry.proxy("nlp")
+    chat_ai = registry.proxy("llm")
+    tts = registry.proxy("tts")
+
+    # One search pipeline for every item lookup (semantic stage is a no-op until the index is built).
+    # The phonetic index is shared so the LLM correction step can try it first.
+    phonetic = PhoneticIndex()
+    llm_avoided = 0
+    pipeline = build_pipeline(semantic_fn=lambda q: semantic_search_inventory(q, nlp), phonetic=phonetic)
+    print(f"Search pipeline: {' -> '.join(pipeline.stage_names())}")
 
+    try:
         recorder = AudioRecorder()
+        recorder.start() # Stream stays open, so recordings start instantly with pre-roll
+    except Exception as e:
+        print(f"CRITICAL ERROR initializing recorder: {e}")
+        import traceback
+        traceback.print_exc()
+        return
 
+    # Accept the first query once the critical path is up; the rest keeps loading
+    try:
+        registry.wait_for(config.STARTUP_CRITICAL_PATH)
     except Exception as e:
         print(f"CRITICAL ERROR loading models: {e}")
         import traceback
         traceback.print_exc()
+        registry.shutdown()
         return
+    registry.print_timings()
 
     print("\n" + "=" * 45)
     print("  SYSTEM READY — VOICE INVENTORY ONLINE  ")
     print("=" * 45)
+    registry.mark_ready()
+
+    # LLM corrections already made (persisted); the key of the last one, until the user confirms or rejects it
+    correction_cache = CorrectionCache()
+    last_correction_key = None
 
     # ------------------ MAIN LOOP ----------------------
     context = {}
@@ -622,27 +535,48 @@ def main():
 
             # 🎤 Record Audio
             # print("Listening...") # Handled by recorder now
+            # Intent detection on stable partial transcripts, while the user is still speaking
+            early_nlp = {}
+            def on_partial(partial):
+                print(f"... {partial}")
+                if config.ASR_EARLY_INTENT and len(partial.split()) >= 2:
+                    early_nlp.clear()
+                    early_nlp.update(text=partial, intent=nlp.detect_intent(partial),
+                                     entities=nlp.extract_entities(partial))
+            partials = asr.stream(on_partial) if config.ASR_STREAMING else None
             try:
-                # duration=None enables Press-to-Stop
-                audio_file = recorder.record("input.wav", duration=None)
-                if not audio_file:
+                # duration=None: stops when the user stops speaking (or on ENTER). Audio stays in memory (no WAV round trip).
+                audio = recorder.record(duration=None, on_chunk=partials.feed if partials else None)
+                if audio is None:
                     print("Error: Recording failed. Check microphone.")
+                    if partials: partials.close()
                     continue
             except KeyboardInterrupt:
+                if partials: partials.close()
                 break
 
             # 🧠 Transcribe
             print("Transcribing...")
             t0 = time.time()
-            text = asr.transcribe(audio_file)
+            turn_start = t0
+            text = partials.finish(audio, recorder.last_speech_end) if partials else asr.transcribe(audio)
             print(f"User Said: {text} | ASR Time: {time.time()-t0:.2f}s")
 
             if not text.strip():
                 tts.speak("I didn't hear anything. Please try again.")
                 continue
 
+            # "No, I meant ..." right after an LLM correction rejects it
+            if last_correction_key and REJECTION_PATTERN.match(text.strip().lower()):
+                correction_cache.reject(last_correction_key)
+            last_correction_key = None
+
             # ------------------ ACTIONS ------------------
             intent = None # Reset intent for this turn
+            # Refinement below may already provide the results (skips the primary search)
+            skip_primary_search = False
+            results = []
+            already_spoken = False
             
             # Context Handling (Refinement)
             # If we were waiting for a spec (e.g. "which RPM?"), try to combine it
@@ -787,8 +721,13 @@ def main():
             if not intent: # If we didn't force it via context
                 print("Analyzing intent...")
                 t0 = time.time()
-                intent, score = nlp.detect_intent(text)
-                entities = nlp.extract_entities(text)
+                if early_nlp.get("text") == text:
+                    print("Intent: reusing the analysis of the stable partial transcript.")
+                    intent, score = early_nlp["intent"]
+                    entities = dict(early_nlp["entities"])
+                else:
+                    intent, score = nlp.detect_intent(text)
+                    entities = nlp.extract_entities(text)
                 
                 # CLEAN ENTITY NAME (Fix: "I need AC..." -> "i ac..." -> "ac...")
                 if entities.get("item_name"):
@@ -848,7 +787,7 @@ def main():
                                    else:
                                         ratio_threshold = 0.6
                                    
-                                   # Calculate fuzzy ratio
+                                   # Calculate fuzzy ratio (thresholds above are tuned for SequenceMatcher, not trigram Dice)
                                    top_cand = matches_ranked[0][0]
                                    ratio = SequenceMatcher(None, item_check.lower(), top_cand.lower()).ratio()
                                    
@@ -863,14 +802,26 @@ def main():
                                 # Falling through to LLM Correction below.
                                    intent = "check_location"
             
-            # Skip primary search if we already have results from Refinement
-            skip_primary_search = False
-            results = [] 
-            
+            # --- PHONETIC CORRECTION STEP ---
+            # Sound-alike lookup ("kable usb" -> "USB Cable") is a hash probe; only misses go to the LLM.
+            # Only the extracted item name is looked up: raw replies ("no", "stop") are not items.
+            if intent == "unknown" and entities.get("item_name"):
+                 phonetic_query = entities["item_name"]
+                 phonetic_names = phonetic.correct(phonetic_query)
+                 if phonetic_names:
+                      print(f"DEBUG: Phonetic match for '{phonetic_query}': {phonetic_names[:3]}")
+                      intent = "check_location"
+                      entities = {"item_name": phonetic_query, "quantity": 1}
+                      results = filter_by_strict_numbers(db_manager.get_items_by_names(phonetic_names), phonetic_query)
+                      skip_primary_search = True
+                      llm_avoided += 1
+
             # --- LLM ASR CORRECTION STEP ---
             # If still unknown, and we have an item entity but fuzzy search failed (or NLP failed to get entity),
             # Let's try to get candidates and ask LLM.
             if intent == "unknown":
+                 # Warm the LLM in the background while candidates are gathered
+                 registry.preload("llm")
                  query_for_correction = entities.get("item_name") if entities.get("item_name") else text
                  
                  # LOG QUERY
@@ -907,8 +858,15 @@ def main():
                                 seen.add(sc[0])
                 
                  if candidates:
-                      corrected_item = chat_ai.correct_query(text, candidates)
+                      # Recurring mishearings are answered from the persistent cache
+                      correction_key, corrected_item = correction_cache.get(text, candidates)
+                      if corrected_item:
+                           print(f"DEBUG: Cached LLM Correction: '{text}' -> '{corrected_item}'")
+                      else:
+                           corrected_item = chat_ai.correct_query(text, candidates)
+                           correction_cache.put(correction_key, text, corrected_item)
                       if corrected_item:
+                           last_correction_key = correction_key
                            print(f"DEBUG: LLM Corrected Intent to check_location for '{corrected_item}'")
                            intent = "check_location"
                            entities = {"item_name": corrected_item, "quantity": 1}
@@ -936,58 +894,28 @@ def main():
             elif intent == "chat":
                 # Generate conversational response
                 memories = db_manager.get_all_memories()
-                reply = chat_ai.generate_reply(text, memories)
-                response_text = reply
+                if config.LLM_STREAM_TTS:
+                    # Spoken sentence by sentence while the LLM is still generating
+                    t0 = time.time()
+                    response_text = tts.speak_stream(
+                        chat_ai.stream_reply(text, memories),
+                        on_first_sentence=lambda: registry.mark_first_answer(time.time() - turn_start))
+                    print(f"TTS Time (streamed): {time.time()-t0:.2f}s")
+                    already_spoken = True
+                else:
+                    reply = chat_ai.generate_reply(text, memories)
+                    response_text = reply
 
             elif intent == "check_stock":
                 item = entities.get("item_name")
                 if not item:
                     response_text = "Which item should I check?"
                 else:
-                    # Use search_items to get ALL matches
-                    results = db_manager.search_items(item)
-                    
-                    # Fallback: Ranked Search (Relaxed Match)
-                    if not results:
-                        fallback_res = db_manager.search_items_ranked(item)
-                        if fallback_res:
-                            # Filter results: Drop items with significantly lower relevance
-                            # fallback_res is sorted by score DESC. Max score is first.
-                            if len(fallback_res[0]) >= 4: # Ensure score exists
-                                max_score = fallback_res[0][3]
-                                # Keep items with score >= 85% of max matches
-                                cutoff = max_score * 0.85
-                                results = [r for r in fallback_res if r[3] >= cutoff]
-                                
-                                # Critical Token Filter (Enforce 'Plastic' if in top result)
-                                results = filter_by_critical_tokens(results, item)
-                                results = filter_by_strict_numbers(results, item)
-
-                            else:
-                                results = fallback_res
-                            
-                            # Fuzzy Sort: Prioritize items closest to "DHD Sensor" (e.g. DHT Sensor)
-                            try:
-                                import difflib
-                                results.sort(key=lambda x: difflib.SequenceMatcher(None, item.lower(), x[0].lower()).ratio(), reverse=True)
-                            except ImportError:
-                                pass
-                            except ImportError:
-                                pass
-                    
-                    # Fallback: Semantic Search (Vectors)
-                    if not results and SEMANTIC_INDEX:
-                         semantic_matches = semantic_search_inventory(item, nlp)
-                         if semantic_matches:
-                              # Fetch full details for matched names
-                              results = []
-                              seen = set()
-                              for name, score in semantic_matches:
-                                   if name in seen: continue
-                                   seen.add(name)
-                                   # Get strict details
-                                   details = db_manager.search_items(name)
-                                   results.extend(details)
+                    # Exact -> ranked -> semantic (see search_pipeline)
+                    if not skip_primary_search:
+                         search = pipeline.search(item)
+                         results = search.rows
+                         print(f"Search: {search.summary()}")
 
                     # Filter Zero Quantity Items (User Request: Do not read 0 qty)
                     # Keep backup to distinguish "Not Found" vs "Out of Stock"
@@ -1102,31 +1030,9 @@ def main():
                 else:
                     # 1. Search for Item (if not already found via Refinement)
                     if not skip_primary_search:
-                         results = db_manager.search_items(item)
-                    
-                    if not results and not skip_primary_search:
-                        # Fallback 1: Ranked Search (Phonetic)
-                        fallback_res = db_manager.search_items_ranked(item)
-                        if fallback_res:
-                             if len(fallback_res[0]) >= 4:
-                                 max_score = fallback_res[0][3]
-                                 cutoff = max_score * 0.85
-                                 results = [r for r in fallback_res if r[3] >= cutoff]
-                                 results = filter_by_critical_tokens(results, item)
-                                 results = filter_by_strict_numbers(results, item)
-                             else:
-                                 results = fallback_res
-
-                    # Fallback: Semantic Search
-                    if not results and SEMANTIC_INDEX:
-                         semantic_matches = semantic_search_inventory(item, nlp)
-                         if semantic_matches:
-                              results = []
-                              seen = set()
-                              for name, score in semantic_matches:
-                                   if name in seen: continue
-                                   seen.add(name)
-                                   results.extend(db_manager.search_items(name))
+                         search = pipeline.search(item)
+                         results = search.rows
+                         print(f"Search: {search.summary()}")
                     
                     # FILTER LOGIC FOR REMOVE INTENT
                     # If removing stock, we cannot remove from 0-qty items.
@@ -1187,46 +1093,11 @@ def main():
                 if not item:
                     response_text = "Which item are you looking for?"
                 else:
-                    # Use search_items to get ALL matches
+                    # Exact -> ranked -> semantic (see search_pipeline)
                     if not skip_primary_search:
-                         results = db_manager.search_items(item)
-                    
-                    # Fallback: Ranked Search (Relaxed Match)
-                    # "Green Motor Driver" -> Matches "Motor Driver" (Score 2)
-                    if not results and not skip_primary_search:
-                        fallback_res = db_manager.search_items_ranked(item)
-                        if fallback_res:
-                            # Filter results: Drop items with significantly lower relevance
-                            if len(fallback_res[0]) >= 4:
-                                max_score = fallback_res[0][3]
-                                cutoff = max_score * 0.85
-                                results = [r for r in fallback_res if r[3] >= cutoff]
-                                
-                                # Critical Token Filter
-                                results = filter_by_critical_tokens(results, item)
-                                results = filter_by_strict_numbers(results, item)
-                            else:
-                                results = fallback_res
-                            
-                            # Fuzzy Sort: Prioritize closest string matches (DHD -> DHT)
-                            try:
-                                import difflib
-                                results.sort(key=lambda x: difflib.SequenceMatcher(None, item.lower(), x[0].lower()).ratio(), reverse=True)
-                            except ImportError:
-                                pass
-                            except ImportError:
-                                pass
-                    
-                    # Fallback: Semantic Search
-                    if not results and SEMANTIC_INDEX:
-                         semantic_matches = semantic_search_inventory(item, nlp)
-                         if semantic_matches:
-                              results = []
-                              seen = set()
-                              for name, score in semantic_matches:
-                                   if name in seen: continue
-                                   seen.add(name)
-                                   results.extend(db_manager.search_items(name))
+                         search = pipeline.search(item)
+                         results = search.rows
+                         print(f"Search: {search.summary()}")
 
                     # Filter Zero Quantity Items
                     found_matches = results
@@ -1333,7 +1204,10 @@ def main():
             #    continue
 
             # 🔊 Speak Response
+            if already_spoken:
+                continue
             print(f"Assistant: {response_text}")
+            registry.mark_first_answer(time.time() - turn_start)
             t0 = time.time()
             tts.speak(response_text)
             print(f"TTS Time: {time.time()-t0:.2f}s")
@@ -1347,6 +1221,14 @@ def main():
             import traceback
             traceback.print_exc()
 
+    registry.report()
+    print(f"Correction cache: {correction_cache.stats()}")
+    print(f"Phonetic index: {phonetic.lookups} lookups, {phonetic.hits} hits, {llm_avoided} LLM corrections avoided")
+    recorder.report()
+    recorder.close()
+    pipeline.shutdown()
+    registry.shutdown()
+
 
 # ------------------ ENTRY POINT -----------------------
 if __name__ == "__main__":
@@ -0,0 +1,464 @@
+import gc
+import inspect
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+
+# ------------------ MEMORY HELPERS --------------------
+def _read_proc_status(field, pid="self"):
+    """
+    Reads a kB field (VmRSS, VmHWM) from /proc/<pid>/status. Linux/Pi only.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except Exception:
+        pass
+    return None
+
+def get_rss_mb():
+    """
+    Current resident memory of this process in MB (None if unavailable, e.g. Windows).
+    """
+    return _read_proc_status("VmRSS")
+
+def read_rss_mb(pid):
+    """
+    Resident memory of another process (e.g. a model worker) in MB.
+    """
+    return _read_proc_status("VmRSS", pid)
+
+def get_peak_rss_mb():
+    """
+    Peak resident memory of this process in MB.
+    """
+    peak = _read_proc_status("VmHWM")
+    if peak is not None:
+        return peak
+    try:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kB on Linux, bytes on macOS
+        return maxrss / (1024.0 * 1024.0) if sys.platform == "darwin" else maxrss / 1024.0
+    except Exception:
+        return None
+
+def _fmt_mb(value):
+    return f"{value:.0f} MB" if value is not None else "n/a"
+
+
+# ------------------ MODEL REGISTRY --------------------
+class _Entry:
+    def __init__(self, name, loader, deps, unload_priority, idle_unload):
+        self.name = name
+        self.loader = loader
+        self.deps = tuple(deps)                # Loaded first; their instances are passed to loader()
+        self.unload_priority = unload_priority # Lower = unloaded first. None = never unloaded for budget.
+        self.idle_unload = idle_unload         # Seconds idle before unloading. None = keep.
+        self.slot = None                       # (instance,) once loaded. A loader may return None.
+        self.lock = threading.Lock()
+        self.future = None                     # Pending background load
+        self.error = None
+        self.last_used = 0.0
+        self.started_at = None                 # Seconds after registry start
+        self.load_time = 0.0
+        self.rss_delta = None
+        self.load_count = 0
+        self.in_use = 0                        # Calls running on the instance; never unloaded while > 0
+
+
+class _ModelProxy:
+    """
+    Stand-in for a registered engine. Any attribute access loads the model on demand
+    and marks it as used, so callers keep writing 'chat_ai.correct_query(...)'.
+    Method calls hold the model in use until they return (or, for a generator such as
+    stream_reply, until it is exhausted or closed), so it is not unloaded mid-call.
+    """
+    def __init__(self, registry, name):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr):
+        registry, name = self._registry, self._name
+        value = getattr(registry.get(name), attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            instance = registry.acquire(name)
+            try:
+                result = getattr(instance, attr)(*args, **kwargs)
+            except BaseException:
+                registry.release(name)
+                raise
+            if inspect.isgenerator(result):
+                return _HeldGenerator(registry, name, result)
+            registry.release(name)
+            return result
+        return call
+
+    def __setattr__(self, attr, value):
+        setattr(self._registry.get(self._name), attr, value)
+
+
+class _HeldGenerator:
+    """
+    Generator returned through a proxy: the model stays in use until it finishes,
+    is closed, or is garbage collected.
+    """
+    def __init__(self, registry, name, gen):
+        self._registry = registry
+        self._name = name
+        self._gen = gen
+
+    def _release(self):
+        registry, self._registry = self._registry, None
+        if registry is not None:
+            registry.release(self._name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._gen)
+        except BaseException:
+            self._release()
+            raise
+
+    def close(self):
+        try:
+            self._gen.close()
+        finally:
+            self._release()
+
+    def __del__(self):
+        self._release()
+
+
+class ModelRegistry:
+    """
+    Loads engines on first use (optionally in the background), tracks last-use time and
+    approximate RSS per model, and unloads idle heavy models (LLM first) to stay under
+    config.MEMORY_BUDGET_MB on a 4 GB Pi.
+    """
+    def __init__(self, memory_budget_mb=None, check_interval=10.0, workers=None):
+        self.memory_budget_mb = memory_budget_mb if memory_budget_mb is not None else config.MEMORY_BUDGET_MB
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Model loads are mostly file I/O and native code that release the GIL, so they overlap well
+        self._executor = ThreadPoolExecutor(max_workers=workers if workers else config.STARTUP_WORKERS,
+                                            thread_name_prefix="load")
+        self._monitor = None
+        self._stop = threading.Event()
+        self.start_time = time.time()
+        self.ready_time = None
+        self.first_answer_time = None
+        self._peak_sampled = 0.0
+
+    def register(self, name, loader, deps=(), unload_priority=None, idle_unload=None):
+        """
+        loader(*dep_instances) builds the component. 'deps' must be registered first.
+        """
+        for dep in deps:
+            if dep not in self._entries:
+                raise ValueError(f"{name} depends on unregistered component '{dep}'")
+        self._entries[name] = _Entry(name, loader, deps, unload_priority, idle_unload)
+
+    @staticmethod
+    def _own_rss(entry):
+        """
+        engine.rss_mb for an engine hosted in its own process (LLMWorker), else None.
+        """
+        slot = entry.slot
+        rss_fn = getattr(slot[0], "rss_mb", None) if slot is not None else None
+        return rss_fn if callable(rss_fn) else None
+
+    def total_rss_mb(self):
+        """
+        RSS of this process plus any loaded engine hosted in its own process (engine.rss_mb()).
+        """
+        rss = get_rss_mb()
+        if rss is None: return None
+        for entry in self._entries.values():
+            rss_fn = self._own_rss(entry)
+            if rss_fn:
+                rss += rss_fn() or 0.0
+        return rss
+
+    def _rss_of(self, entry):
+        """
+        MB attributed to one model: a worker's current RSS, else the growth measured at load.
+        """
+        rss_fn = self._own_rss(entry)
+        return rss_fn() if rss_fn else entry.rss_delta
+
+    def proxy(self, name):
+        return _ModelProxy(self, name)
+
+    def is_loaded(self, name):
+        return self._entries[name].slot is not None
+
+    # --- Loading ---
+    def _load(self, entry):
+        """
+        Runs the loader for one entry. Caller must hold entry.lock.
+        """
+        slot = entry.slot
+        if slot is not None:
+            return slot[0]
+
+        # Dependencies first (waits if they are loading on another worker)
+        dep_instances = [self.get(dep) for dep in entry.deps]
+
+        # Make room before pulling another model into RAM
+        self.enforce_budget(exclude=entry.name)
+
+        print(f"Loading {entry.name}...")
+        rss_before = self.total_rss_mb()
+        t0 = time.time()
+        entry.started_at = t0 - self.start_time
+        try:
+            instance = entry.loader(*dep_instances)
+            entry.slot = (instance,)
+            entry.error = None
+        except Exception as e:
+            entry.error = e
+            print(f"Failed to load {entry.name}: {e}")
+            raise
+        entry.load_time = time.time() - t0
+        rss_after = self.total_rss_mb()
+        # A worker process is still loading its model here; its RSS is read live instead
+        if self._own_rss(entry):
+            entry.rss_delta = None
+        elif rss_before is not None and rss_after is not None:
+            entry.rss_delta = max(0.0, rss_after - rss_before)
+        entry.load_count += 1
+        entry.last_used = time.time()
+        self._sample_peak()
+        print(f"{entry.name} ready in {entry.load_time:.2f}s (+{_fmt_mb(self._rss_of(entry))})")
+        return instance
+
+    def preload(self, name):
+        """
+        Queues a background load on the loader pool. Returns immediately.
+        Dependencies are resolved inside the worker, so components can be queued in any order.
+        """
+        entry = self._entries[name]
+        with self._lock:
+            if entry.slot is not None or (entry.future is not None and not entry.future.done()):
+                return
+
+            def worker():
+                try:
+                    with entry.lock:
+                        self._load(entry)
+                except Exception:
+                    pass # Error is kept on the entry; get() retries the load and raises
+
+            entry.future = self._executor.submit(worker)
+
+    def start(self, names):
+        """
+        Queues several components at once (dependencies before dependents for best overlap).
+        """
+        for name in names:
+            self.preload(name)
+
+    def wait_for(self, names):
+        """
+        Blocks until the given components are loaded (the startup critical path).
+        """
+        for name in names:
+            self.get(name)
+
+    def get(self, name):
+        """
+        Returns the loaded model, loading it now (or waiting for a background load) if needed.
+        """
+        entry = self._entries[name]
+        slot = entry.slot
+        if slot is None:
+            with entry.lock:
+                instance = self._load(entry)
+        else:
+            instance = slot[0]
+        entry.last_used = time.time()
+        return instance
+
+    def acquire(self, name):
+        """
+        get(), and marks the model in use until release(name).
+        """
+        entry = self._entries[name]
+        while True:
+            instance = self.get(name)
+            with self._lock:
+                slot = entry.slot
+                if slot is not None and slot[0] is instance: # Not unloaded since get()
+                    entry.in_use += 1
+                    return instance
+
+    def release(self, name):
+        entry = self._entries[name]
+        with self._lock:
+            entry.in_use -= 1
+        entry.last_used = time.time()
+
+    # --- Unloading ---
+    def unload(self, name, reason="manual"):
+        """
+        Unloads a model unless a call is still running on it. Returns True if unloaded.
+        """
+        entry = self._entries[name]
+        with entry.lock:
+            with self._lock:
+                slot = entry.slot
+                if slot is None or entry.in_use:
+                    return False
+                entry.slot = None
+        instance = slot[0]
+        del slot
+
+        # Release native memory eagerly where the engine supports it
+        close = getattr(instance, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                print(f"Warning: {name}.close() failed: {e}")
+        del instance, close # Bound method also holds a reference
+        gc.collect()
+        print(f"Unloaded {name} ({reason}). RSS now {_fmt_mb(self.total_rss_mb())}.")
+        return True
+
+    def unload_idle(self):
+        """
+        Unloads models idle longer than their idle_unload, and engines that gave up
+        (LLMWorker.failed), so the next use loads a fresh one.
+        """
+        now = time.time()
+        for entry in self._entries.values():
+            slot = entry.slot
+            if slot is None or entry.in_use: continue
+            if entry.lock.locked(): continue # Loading right now
+            if getattr(slot[0], "failed", False):
+                entry.error = RuntimeError(f"{entry.name} failed")
+                self.unload(entry.name, reason="failed")
+                continue
+            if entry.idle_unload is None: continue
+            idle = now - entry.last_used
+            if idle > entry.idle_unload:
+                self.unload(entry.name, reason=f"idle {idle:.0f}s")
+
+    def enforce_budget(self, exclude=None, min_idle=5.0):
+        """
+        Unloads models in unload_priority order until RSS fits the budget.
+        Models in use, or used within the last 'min_idle' seconds, are left alone.
+        """
+        if not self.memory_budget_mb: return
+        rss = self.total_rss_mb()
+        if rss is None or rss <= self.memory_budget_mb: return
+
+        now = time.time()
+        victims = [e for e in self._entries.values()
+                   if e.slot is not None and e.unload_priority is not None
+                   and e.name != exclude and not e.in_use and now - e.last_used > min_idle]
+        victims.sort(key=lambda e: e.unload_priority)
+
+        for entry in victims:
+            print(f"Memory budget exceeded ({_fmt_mb(rss)} > {self.memory_budget_mb} MB).")
+            if not self.unload(entry.name, reason="memory budget"): continue # Taken into use meanwhile
+            rss = self.total_rss_mb()
+            if rss is None or rss <= self.memory_budget_mb: break
+
+    # --- Background Monitor ---
+    def start_monitor(self):
+        if self._monitor: return
+
+        def loop():
+            while not self._stop.wait(self.check_interval):
+                try:
+                    self._sample_peak()
+                    self.unload_idle()
+                    self.enforce_budget()
+                except Exception as e:
+                    print(f"Model monitor error: {e}")
+
+        self._monitor = threading.Thread(target=loop, name="model-monitor", daemon=True)
+        self._monitor.start()
+
+    def shutdown(self):
+        """
+        Stops the monitor and drops queued (not yet started) loads.
+        """
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Reporting ---
+    def _sample_peak(self):
+        rss = get_rss_mb()
+        if rss is not None and rss > self._peak_sampled:
+            self._peak_sampled = rss
+
+    def peak_rss_mb(self):
+        peak = get_peak_rss_mb()
+        if peak is None:
+            return self._peak_sampled or None
+        return max(peak, self._peak_sampled)
+
+    def mark_ready(self):
+        """
+        Records startup time (process start -> accepting the first query).
+        """
+        self.ready_time = time.time() - self.start_time
+        print(f"PERF: Ready in {self.ready_time:.2f}s | RSS {_fmt_mb(get_rss_mb())}")
+
+    def mark_first_answer(self, turn_latency):
+        """
+        Records time-to-first-answer: startup plus the first turn's processing latency
+        (recording stop -> reply ready), excluding time spent waiting for the user.
+        Only the first call counts.
+        """
+        if self.first_answer_time is None:
+            startup = self.ready_time if self.ready_time is not None else 0.0
+            self.first_answer_time = startup + turn_latency
+            print(f"PERF: Time to first answer {self.first_answer_time:.2f}s "
+                  f"(startup {startup:.2f}s + first turn {turn_latency:.2f}s) | Peak RSS {_fmt_mb(self.peak_rss_mb())}")
+
+    def print_timings(self):
+        """
+        Per-component startup timeline (start offset and load duration).
+        """
+        print("\n--- Startup Timings ---")
+        for entry in sorted(self._entries.values(), key=lambda e: (e.started_at is None, e.started_at or 0.0)):
+            if entry.started_at is None:
+                state = "loading..." if entry.future is not None and not entry.future.done() else "deferred (on first use)"
+                print(f"{entry.name:<8} {state}")
+                continue
+            deps = f" after {', '.join(entry.deps)}" if entry.deps else ""
+            if entry.slot is None:
+                status = "FAILED" if entry.error else "loading..."
+                print(f"{entry.name:<8} start +{entry.started_at:.2f}s  {status}{deps}")
+            else:
+                print(f"{entry.name:<8} start +{entry.started_at:.2f}s  took {entry.load_time:.2f}s{deps}")
+
+    def report(self):
+        print("\n--- Model Registry ---")
+        now = time.time()
+        for entry in self._entries.values():
+            state = "loaded" if entry.slot is not None else "failed" if entry.error else "unloaded"
+            idle = f"{now - entry.last_used:.0f}s" if entry.last_used else "never used"
+            print(f"{entry.name:<6} {state:<9} loads={entry.load_count} load_time={entry.load_time:.2f}s "
+                  f"rss=+{_fmt_mb(self._rss_of(entry))} idle={idle}")
+        if self.ready_time is not None:
+            print(f"Startup: {self.ready_time:.2f}s")
+        if self.first_answer_time is not None:
+            print(f"Time to first answer: {self.first_answer_time:.2f}s")
+        print(f"RSS: {_fmt_mb(self.total_rss_mb())} | Peak RSS: {_fmt_mb(self.peak_rss_mb())} | Budget: {self.memory_budget_mb} MB")
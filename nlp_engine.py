@@ -1,11 +1,72 @@
-from sentence_transformers import SentenceTransformer, util
 import config
+import os
 import re
+import numpy as np
+
+class OnnxEmbedder:
+    """
+    Torch-free MiniLM encoder: ONNX Runtime + HF tokenizers (both already installed with faster-whisper).
+    Same output as SentenceTransformer.encode: mean pooling over tokens, then L2 normalization.
+    Files (config.NLP_ONNX_DIR): model.onnx, tokenizer.json  (see download_nlp_onnx.py)
+    """
+    def __init__(self, model_dir=None, max_length=128):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = model_dir if model_dir else config.NLP_ONNX_DIR
+        model_path = os.path.join(model_dir, "model.onnx")
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        if not (os.path.exists(model_path) and os.path.exists(tokenizer_path)):
+            raise FileNotFoundError(f"ONNX NLP model not found in {model_dir}. Run download_nlp_onnx.py.")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = max(1, min(4, os.cpu_count() or 1))
+        self.session = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=64):
+        single = isinstance(texts, str)
+        if single: texts = [texts]
+        out = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            ids = np.array([e.ids for e in batch], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in batch], dtype=np.int64)
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            tokens = self.session.run(None, feeds)[0] # (batch, seq, dim)
+            weights = mask[:, :, None].astype(np.float32)
+            pooled = (tokens * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            out.append(pooled.astype(np.float32))
+        embs = np.vstack(out) if out else np.zeros((0, 0), np.float32)
+        return embs[0] if single else embs
+
+
+def load_embedder():
+    """
+    Picks the embedding backend (config.NLP_BACKEND). "onnx" falls back to
+    sentence-transformers when the ONNX files or runtime are missing.
+    """
+    if config.NLP_BACKEND == "onnx":
+        try:
+            print(f"Loading NLP model (ONNX): {config.NLP_ONNX_DIR}...")
+            return OnnxEmbedder()
+        except Exception as e:
+            print(f"ONNX NLP backend unavailable ({e}). Using sentence-transformers.")
+    # Deferred: sentence_transformers pulls in torch + transformers (seconds on a Pi)
+    from sentence_transformers import SentenceTransformer
+    print(f"Loading NLP model: {config.NLP_MODEL_NAME}...")
+    return SentenceTransformer(config.NLP_MODEL_NAME)
+
 
 class IntentParser:
     def __init__(self):
-        print(f"Loading NLP model: {config.NLP_MODEL_NAME}...")
-        self.model = SentenceTransformer(config.NLP_MODEL_NAME)
+        self.model = load_embedder()
         
         # Define Anchor Sentences for Intents
         self.intents = {
@@ -82,10 +143,11 @@ class IntentParser:
             ]
         }
         
-        # Pre-compute embeddings for anchors
+        # Pre-compute embeddings for anchors (normalized once, so scoring is a dot product)
         self.intent_embeddings = {}
         for intent, phrases in self.intents.items():
-            self.intent_embeddings[intent] = self.model.encode(phrases)
+            embs = np.asarray(self.model.encode(phrases), dtype=np.float32)
+            self.intent_embeddings[intent] = embs / np.maximum(np.linalg.norm(embs, axis=1, keepdims=True), 1e-12)
             
         print("NLP model loaded.")
 
@@ -104,14 +166,15 @@ class IntentParser:
         if not text:
             return None, 0.0
 
-        text_emb = self.model.encode(text)
+        text_emb = np.asarray(self.model.encode(text), dtype=np.float32)
+        text_emb = text_emb / max(float(np.linalg.norm(text_emb)), 1e-12)
         
         best_intent = None
         best_score = -1.0
         
         for intent, anchor_embs in self.intent_embeddings.items():
-            # semantic search against all anchors for this intent
-            scores = util.cos_sim(text_emb, anchor_embs)[0]
+            # Cosine similarity against all anchors for this intent
+            scores = anchor_embs @ text_emb
             max_score = float(scores.max())
             
             if max_score > best_score:
@@ -0,0 +1,343 @@
+"""
+Phonetic index over item-name words, for recovering Whisper mishearings
+("kable" -> "cable", "sensar" -> "sensor", "fone" -> "phone") with a hash lookup
+before the LLM correction step is tried.
+
+Keys are Metaphone-style consonant skeletons (a compact subset of the Double
+Metaphone rules, primary key only). Numbers are normalized first and
+keyed with the unit after them, so "twenty four volt" and "24v" both key to "24 F".
+"""
+import re
+from difflib import SequenceMatcher
+import db_manager
+
+VOWELS = set("aeiou")
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+}
+MULTIPLIERS = {"hundred": 100, "thousand": 1000}
+# Spoken units as the inventory abbreviates them ("twelve volt" -> "12", "v")
+UNIT_WORDS = {
+    "volt": "v", "volts": "v", "amp": "a", "amps": "a", "watt": "w", "watts": "w",
+    "ohms": "ohm", "gram": "grams", "millimeter": "mm", "millimeters": "mm",
+}
+
+# Shortest query key that may match the start of a longer item key ("sold" -> "soldering")
+MIN_PREFIX_KEY = 3
+
+# Words that are never item names: replies and commands ("no", "stop") must not be
+# "corrected" into items (Jetson Nano, Stepper)
+STOP_WORDS = {
+    "a", "an", "and", "the", "of", "for", "to", "in", "on", "at", "is", "it", "me", "my", "i",
+    "you", "we", "there", "this", "that", "what", "where", "which", "how", "do", "does", "have",
+    "yes", "no", "not", "nope", "yeah", "ok", "okay", "please", "thanks", "thank", "hello", "hi",
+    "hey", "stop", "cancel", "exit", "quit", "bye", "wait", "again", "sorry", "one", "some", "any",
+}
+# A correction needs at least this much key (consonants) over its content words
+MIN_CORRECTION_KEY = 3
+# Below this total key length, only exact word keys count (no prefix matches)
+MIN_PREFIX_QUERY_KEY = 5
+
+
+def normalize_numbers(words):
+    """
+    Spoken numbers to digits: ["twenty", "four", "volt"] -> ["24", "volt"],
+    ["one", "thousand", "rpm"] -> ["1000", "rpm"].
+    """
+    out = []
+    value = None
+    for w in words:
+        if w in NUMBER_WORDS:
+            n = NUMBER_WORDS[w]
+            if value is not None and value % 10 == 0 and 20 <= value % 100 and n < 10:
+                value += n # "twenty four"
+            elif value is not None and value >= 100 and value % 100 == 0 and n < 100:
+                value += n # "one hundred fifty"
+            else:
+                if value is not None: out.append(str(value))
+                value = n
+        elif w in MULTIPLIERS and value is not None:
+            value *= MULTIPLIERS[w]
+        else:
+            if value is not None:
+                out.append(str(value))
+                value = None
+            out.append(w)
+    if value is not None:
+        out.append(str(value))
+    return out
+
+
+def split_words(text):
+    """
+    Letter runs and digit runs, spoken numbers normalized: "RMCS1106" -> ["rmcs", "1106"].
+    """
+    words = normalize_numbers(re.findall(r'[a-z]+|\d+', text.lower()))
+    return [UNIT_WORDS.get(w, w) for w in words]
+
+
+def metaphone(word):
+    """
+    Consonant skeleton of one word. Digit tokens are returned unchanged.
+    """
+    if word.isdigit(): return word
+    w = re.sub(r'[^a-z]', '', word.lower())
+    if not w: return ""
+
+    # Initial exceptions
+    if w[:2] in ("kn", "gn", "pn", "wr", "ae"): w = w[1:]
+    if w[0] == "x": w = "s" + w[1:]
+    if w[:2] == "wh": w = "w" + w[2:]
+
+    out = []
+    n = len(w)
+    i = 0
+    while i < n:
+        c = w[i]
+        prev = w[i - 1] if i > 0 else ""
+        nxt = w[i + 1] if i + 1 < n else ""
+        nxt2 = w[i + 2] if i + 2 < n else ""
+        code = ""
+        if c == prev and c != "c":
+            i += 1
+            continue
+        if c in VOWELS:
+            code = c.upper() if i == 0 else ""
+        elif c == "b":
+            code = "" if prev == "m" and i == n - 1 else "B"
+        elif c == "c":
+            if nxt == "i" and nxt2 == "a" or nxt == "h":
+                code = "K" if prev == "s" else "X"
+                if nxt == "h": i += 1
+            elif nxt in ("i", "e", "y"):
+                code = "" if prev == "s" else "S"
+            else:
+                code = "K"
+        elif c == "d":
+            code = "J" if nxt == "g" and nxt2 in ("e", "i", "y") else "T"
+        elif c == "g":
+            if nxt == "h" and not (i + 2 < n and nxt2 not in VOWELS):
+                code = "" if i > 0 else "K"
+                i += 1
+            elif nxt == "n" and (i + 2 == n or w[i + 2:i + 4] == "ed"):
+                code = ""
+            elif nxt in ("i", "e", "y") and prev != "g":
+                code = "J"
+            else:
+                code = "K"
+        elif c == "h":
+            code = "H" if nxt in VOWELS and prev not in VOWELS and prev not in ("c", "s", "p", "t", "g") else ""
+        elif c == "k":
+            code = "" if prev == "c" else "K"
+        elif c == "p":
+            code = "F" if nxt == "h" else "P"
+            if nxt == "h": i += 1
+        elif c == "q":
+            code = "K"
+        elif c == "s":
+            if nxt == "h" or (nxt == "i" and nxt2 in ("o", "a")):
+                code = "X"
+                if nxt == "h": i += 1
+            else:
+                code = "S"
+        elif c == "t":
+            if nxt == "i" and nxt2 in ("o", "a"):
+                code = "X"
+            elif nxt == "h":
+                code = "0" # "th"
+                i += 1
+            elif nxt == "c" and nxt2 == "h":
+                code = ""
+            else:
+                code = "T"
+        elif c == "v":
+            code = "F"
+        elif c == "w" or c == "y":
+            code = c.upper() if nxt in VOWELS else ""
+        elif c == "x":
+            code = "KS"
+        elif c == "z":
+            code = "S"
+        else:
+            code = c.upper() # f, j, l, m, n, r
+
+        # Collapse repeated codes ("osc" -> S, not SS)
+        if code and not (out and out[-1] == code):
+            out.append(code)
+        i += 1
+    return "".join(out)
+
+
+def terms(words):
+    """
+    Words as (number, unit) terms, a number taking the letter word after it as its
+    unit: ["dc", "motor", "100", "rpm"] -> [("", "dc"), ("", "motor"), ("100", "rpm")].
+    """
+    out = []
+    i = 0
+    while i < len(words):
+        if words[i].isdigit():
+            unit = words[i + 1] if i + 1 < len(words) and not words[i + 1].isdigit() else ""
+            out.append((words[i], unit))
+            i += 2 if unit else 1
+        else:
+            out.append(("", words[i]))
+            i += 1
+    return out
+
+
+def join_term(number, unit):
+    return f"{number} {unit}" if number and unit else number or unit
+
+
+def term_key(number, unit, keyed=False):
+    """
+    Index key of a term: the number with the unit's key ("48 F"), or the word's key.
+    """
+    return join_term(number, unit if keyed else metaphone(unit))
+
+
+def one_code_off(a, b):
+    return len(a) == len(b) and sum(x != y for x, y in zip(a, b)) == 1
+
+
+class PhoneticIndex:
+    """
+    Item-name words by spelling and by phonetic key (plus key prefixes, so a short
+    query word can match a longer name word). A number is keyed together with the
+    unit word after it ("48V" -> "48 F"), so "24 volt" cannot match "48V 24 AH".
+
+    An item matches when it has every query word: spelled the same when any item
+    has that spelling ("servo" finds servos, not "Survey"), otherwise by key, and
+    as a last resort by a key with two codes swapped ("sevr" -> "servo") or a unit
+    one code off for the same number ("100 rqm" -> "100 RPM"). A query split into
+    several words also tries them joined ("bread bord" -> "Breadboard").
+    """
+    def __init__(self, names=None):
+        self.lookups = 0
+        self.hits = 0
+        self.version = db_manager.names_version() if names is None else None
+        self.build(names if names is not None else db_manager.get_all_item_names())
+
+    def build(self, names):
+        self.names = list(dict.fromkeys(names))
+        self.word_items = {}
+        self.key_items = {}
+        self.units = {} # number -> unit keys following it in some name
+        self.words = []
+        for i, name in enumerate(self.names):
+            words = split_words(name)
+            self.words.append(words)
+            for number, unit in terms(words):
+                if not term_key(number, unit): continue
+                if number and unit:
+                    self.units.setdefault(number, set()).add(metaphone(unit))
+                for table, term in ((self.word_items, join_term(number, unit)), (self.key_items, term_key(number, unit))):
+                    table.setdefault(term, set()).add(i)
+                if number: # a bare number matches "100 RPM" too
+                    self.key_items.setdefault(number, set()).add(i)
+                    continue
+                key = metaphone(unit)
+                for end in range(MIN_PREFIX_KEY, len(key)):
+                    self.key_items.setdefault("^" + key[:end], set()).add(i)
+
+    def refresh(self):
+        """
+        Rebuilds from the DB if an item was added since the last build (db_manager.names_version).
+        Indexes built from an explicit name list are left alone.
+        """
+        if self.version is None or self.version == db_manager.names_version(): return
+        self.version = db_manager.names_version()
+        self.build(db_manager.get_all_item_names())
+
+    def _items_for(self, key, prefix=True):
+        exact = self.key_items.get(key, set())
+        if prefix and len(key) >= MIN_PREFIX_KEY and " " not in key and not key.isdigit():
+            return exact | self.key_items.get("^" + key, set())
+        return exact
+
+    def _term_items(self, number, unit, prefix=True):
+        """
+        Item ids having one query term, trying the spelling, the key, then near keys.
+        """
+        items = self.word_items.get(join_term(number, unit))
+        if items: return items
+        items = self._items_for(term_key(number, unit), prefix)
+        if items or not unit: return items
+        key = metaphone(unit)
+        if number:
+            near = [u for u in self.units.get(number, ()) if one_code_off(key, u)]
+        else:
+            near = [key[:i] + key[i + 1] + key[i] + key[i + 2:] for i in range(len(key) - 1)]
+        found = set()
+        for k in near:
+            found |= self.key_items.get(term_key(number, k, keyed=True), set())
+        return found
+
+    def _match(self, term_list, found=None, prefix=True):
+        """
+        Item ids having every (number, unit) term, optionally within 'found'.
+        """
+        for number, unit in dict.fromkeys(t for t in term_list if term_key(*t)):
+            items = self._term_items(number, unit, prefix)
+            found = set(items) if found is None else found & items
+            if not found: return set()
+        return found if found is not None else set()
+
+    def _spelling(self, i, words):
+        """
+        How closely item i's words are spelled like the query words, to rank sound-alikes.
+        """
+        return sum(max((SequenceMatcher(None, w, iw).ratio() for iw in self.words[i]), default=0) for w in words)
+
+    def search(self, query, limit=20, prefix=True):
+        """
+        Returns item names having every query word, joined compounds first, then
+        the closest spelling, then the shortest name.
+        Counts lookups and hits, so callers can report how often it answered.
+        """
+        self.refresh()
+        self.lookups += 1
+        words = split_words(query)
+        keys = [metaphone(w) for w in words]
+        # A longer word reduced to one consonant ("xyz" -> "S") would match almost anything
+        if any(len(k) == 1 and len(w) >= 3 and not w.isdigit() and w not in self.word_items
+               for w, k in zip(words, keys)): return []
+        query_terms = terms(words)
+        found = self._match(query_terms, prefix=prefix)
+        joined = set()
+        letters = [unit for number, unit in query_terms if not number]
+        if len(letters) > 1:
+            # Compound reading, when the catalogue has it as one word, ranks first
+            # (unless it collapses to one word's key: "arduino nano" -> "arduino")
+            key = metaphone("".join(letters))
+            joined = set(self.key_items.get(key, ())) if key not in keys else set()
+            joined = self._match([t for t in query_terms if t[0]], joined)
+        found |= joined
+        if not found: return []
+        self.hits += 1
+        letters = [w for w in words if not w.isdigit()]
+        ranked = sorted(found, key=lambda i: (i not in joined, -self._spelling(i, letters), len(self.names[i])))
+        return [self.names[i] for i in ranked[:limit]]
+
+    def correct(self, item_name):
+        """
+        search() guarded for overriding an unknown intent: stop words are dropped, a
+        query with too little left ("no", "stop", "it") gives no match, and short
+        queries must match whole words (no prefix matches).
+        """
+        words = [w for w in split_words(item_name or "") if w not in STOP_WORDS]
+        strength = sum(len(metaphone(w)) for w in words if not w.isdigit())
+        if strength < MIN_CORRECTION_KEY: return []
+        return self.search(" ".join(words), prefix=strength >= MIN_PREFIX_QUERY_KEY)
+
+    def search_rows(self, query):
+        """
+        search() as inventory rows (item_name, quantity, location), for a SearchPipeline stage.
+        """
+        return db_manager.get_items_by_names(self.search(query))
@@ -0,0 +1,185 @@
+"""
+Startup profiler: import-time tree and cumulative cost per module.
+
+Runs a fresh interpreter with 'python -X importtime' so every run is a cold import.
+
+Usage:
+    python profile_imports.py                          # profile 'import mini_assistant'
+    python profile_imports.py --module nlp_engine      # profile another module
+    python profile_imports.py --code "import nlp_engine; nlp_engine.IntentParser()"
+    python profile_imports.py --save before.json       # keep numbers for a later comparison
+    python profile_imports.py --compare before.json    # before/after cold-start table
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ImportNode:
+    def __init__(self, name, self_us, cumulative_us, depth):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+        self.children = []
+
+
+def run_importtime(code):
+    """
+    Runs 'code' in a child interpreter with -X importtime. Returns (stderr lines, returncode).
+    """
+    cmd = [sys.executable, "-X", "importtime", "-c", code]
+    proc = subprocess.run(cmd, cwd=BASE_DIR, capture_output=True, text=True)
+    return proc.stderr.splitlines(), proc.returncode
+
+
+def parse_importtime(lines):
+    """
+    Builds the import tree from -X importtime output.
+    Lines arrive in post-order (children before their parent), indented 2 spaces per level.
+    """
+    pending = [] # Nodes waiting for their parent
+    for line in lines:
+        if not line.startswith("import time:"): continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3: continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue # Header line
+        raw_name = parts[2].rstrip()
+        stripped = raw_name.lstrip()
+        depth = (len(raw_name) - len(stripped) - 1) // 2
+        node = ImportNode(stripped, self_us, cumulative_us, depth)
+
+        # Everything pending that is deeper than this node is one of its children
+        children = []
+        while pending and pending[-1].depth > depth:
+            children.append(pending.pop())
+        node.children = list(reversed(children))
+        pending.append(node)
+
+    return pending # Top-level imports, in import order
+
+
+def walk(nodes):
+    for node in nodes:
+        yield node
+        yield from walk(node.children)
+
+
+def print_tree(nodes, min_ms, max_depth, indent=0):
+    for node in sorted(nodes, key=lambda n: n.cumulative_us, reverse=True):
+        cum_ms = node.cumulative_us / 1000.0
+        if cum_ms < min_ms: continue
+        print(f"{cum_ms:9.1f} ms {node.self_us / 1000.0:8.1f} ms  {'  ' * indent}{node.name}")
+        if indent + 1 < max_depth:
+            print_tree(node.children, min_ms, max_depth, indent + 1)
+
+
+def summarize(roots):
+    """
+    Per-module cumulative cost plus self-time rolled up per top-level package (torch, pandas, ...).
+    """
+    modules = {}
+    packages = {}
+    for node in walk(roots):
+        modules[node.name] = node.cumulative_us / 1000.0
+        pkg = node.name.split(".")[0]
+        packages[pkg] = packages.get(pkg, 0.0) + node.self_us / 1000.0
+    total = sum(n.cumulative_us for n in roots) / 1000.0
+    return {"total_ms": total, "modules": modules, "packages": packages}
+
+
+def measure_wall(code, runs):
+    """
+    Wall-clock import time over several fresh interpreters (median, in ms).
+    """
+    probe = f"import time; _t = time.perf_counter()\n{code}\nprint((time.perf_counter() - _t) * 1000.0)"
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", probe], cwd=BASE_DIR, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr)
+            return None
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def compare(before, after, top):
+    print("\n--- Before / After ---")
+    print(f"{'':28}{'before':>12}{'after':>12}{'delta':>12}")
+    for key, label in (("wall_ms", "Cold start (wall)"), ("total_ms", "Import tree total")):
+        b, a = before.get(key), after.get(key)
+        if b is None or a is None: continue
+        print(f"{label:<28}{b:10.1f}ms{a:10.1f}ms{a - b:+10.1f}ms")
+
+    pkgs = set(before["packages"]) | set(after["packages"])
+    rows = sorted(pkgs, key=lambda p: before["packages"].get(p, 0.0), reverse=True)[:top]
+    print("\nPer package (self time):")
+    for pkg in rows:
+        b = before["packages"].get(pkg, 0.0)
+        a = after["packages"].get(pkg, 0.0)
+        print(f"  {pkg:<26}{b:10.1f}ms{a:10.1f}ms{a - b:+10.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profiler for the assistant's startup.")
+    parser.add_argument("--module", default="mini_assistant", help="Module to import (default: mini_assistant)")
+    parser.add_argument("--code", help="Python statement(s) to profile instead of a plain import")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="Hide tree nodes cheaper than this")
+    parser.add_argument("--depth", type=int, default=4, help="Maximum tree depth to print")
+    parser.add_argument("--top", type=int, default=20, help="Rows in the per-module/per-package tables")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters for the wall-clock median")
+    parser.add_argument("--save", help="Write the summary to this JSON file")
+    parser.add_argument("--compare", help="Compare against a summary saved earlier with --save")
+    args = parser.parse_args()
+
+    code = args.code if args.code else f"import {args.module}"
+    print(f"Profiling: {code}")
+
+    lines, returncode = run_importtime(code)
+    if returncode != 0:
+        # Still useful: shows how far the import got before failing
+        print("WARNING: Target raised an error. Partial profile follows.")
+        print("\n".join(l for l in lines if not l.startswith("import time:"))[-2000:])
+
+    roots = parse_importtime(lines)
+    summary = summarize(roots)
+    summary["code"] = code
+    summary["wall_ms"] = measure_wall(code, args.runs) if returncode == 0 else None
+
+    print("\n--- Import Tree (cumulative | self) ---")
+    print_tree(roots, args.min_ms, args.depth)
+
+    print(f"\n--- Top {args.top} Modules by Cumulative Cost ---")
+    for name, ms in sorted(summary["modules"].items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{ms:9.1f} ms  {name}")
+
+    print(f"\n--- Top {args.top} Packages by Self Time ---")
+    for pkg, ms in sorted(summary["packages"].items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{ms:9.1f} ms  {pkg}")
+
+    print(f"\nImport tree total: {summary['total_ms']:.1f} ms")
+    if summary["wall_ms"] is not None:
+        print(f"Cold start (median of {args.runs}): {summary['wall_ms']:.1f} ms")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            before = json.load(f)
+        compare(before, summary, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Item search pipeline shared by check_stock, check_location and update_stock.
+
+Stages are tiers in priority order: the first one that finds something answers
+(early termination), and its refiners post-process what it found. Tiers run one
+after another or all at once (config.SEARCH_CONCURRENT). Every run records
+per-stage result counts and timings, so retrieval can be profiled and tuned
+without the audio loop.
+
+Plain-text entry point:
+    python search_pipeline.py "dc motor 100 rpm"
+    python search_pipeline.py                          # interactive prompt
+    python search_pipeline.py --engine hybrid "dht sensr"
+    python search_pipeline.py --semantic "hot glue"    # loads the NLP model + semantic index
+    python search_pipeline.py --concurrent "servo"     # all tiers at once (default: config.SEARCH_CONCURRENT)
+"""
+import argparse
+import re
+import time
+import config
+import db_manager
+from fuzzy_index import FuzzyIndex, similarity
+from phonetic_index import PhoneticIndex
+
+
+# ------------------ REFINERS --------------------
+def filter_by_critical_tokens(results, query):
+    """
+    Enforces that keywords present in BOTH the query and the top result
+    must be present in all other results.
+    Ex: Query "Plastic Gearbox". Top Result "DC Motor Plastic Gear...".
+    Critical: "Plastic", "Gear".
+    Item "Metal Gearbox" (Missing Plastic): Dropped.
+    """
+    if not results: return []
+
+    # 1. Identify Critical Tokens from Top Result
+    top_item = results[0][0].lower()
+    query_tokens = query.lower().split()
+
+    critical_tokens = []
+    # Stopwords to ignore
+    stopwords = {"s", "parts", "part", "item", "items", "the", "a", "an", "of", "in", "is", "are", "do", "you", "have", "looking", "for", "please", "show", "me", "where", "stock", "check", "find", "search", "list", "all"}
+
+    for token in query_tokens:
+        clean_token = token.strip(".,?!")
+        if clean_token in stopwords: continue
+
+        # If token from query is found in the top result, it is critical
+        if clean_token in top_item:
+            critical_tokens.append(clean_token)
+
+    if not critical_tokens:
+        return results
+
+    # 2. Filter Results
+    filtered = []
+    for r in results:
+        name = r[0].lower()
+        if all(token in name for token in critical_tokens):
+            filtered.append(r)
+
+    return filtered
+
+def filter_by_strict_numbers(results, query):
+    """
+    Enforces EXACT number matching.
+    Query: "10 RPM" -> Must contain integer "10".
+    Result "100 RPM" -> Contains "100" (Not "10") -> REJECT.
+    Result "10 RPM" -> Contains "10" -> ACCEPT.
+    """
+    if not results: return []
+
+    # Look for digits bounded by non-digits
+    q_nums = set(re.findall(r'\b\d+\b', query))
+
+    if not q_nums:
+        return results
+
+    filtered = []
+    for r in results:
+        # Extract standalone digits from item name
+        r_nums = set(re.findall(r'\b\d+\b', r[0]))
+
+        # Check subset: Query numbers must be in Result numbers
+        if q_nums.issubset(r_nums):
+            filtered.append(r)
+
+    return filtered
+
+def ranked_cutoff(results, query, ratio=0.85):
+    """
+    Drops ranked matches scoring below 85% of the best one (results are sorted by score DESC).
+    """
+    if not results or len(results[0]) < 4: return results
+    cutoff = results[0][3] * ratio
+    return [r for r in results if r[3] >= cutoff]
+
+def fuzzy_sort(results, query):
+    """
+    Closest spelling first ("DHD Sensor" -> "DHT Sensor").
+    """
+    return sorted(results, key=lambda r: similarity(query, r[0]), reverse=True)
+
+
+# ------------------ PIPELINE --------------------
+class Stage:
+    """
+    One retrieval step: fn(query) -> rows (item_name, quantity, location, ...),
+    plus refiners [(name, fn(rows, query) -> rows)] applied to what it found.
+    """
+    def __init__(self, name, fn, refiners=()):
+        self.name = name
+        self.fn = fn
+        self.refiners = list(refiners)
+
+
+class PipelineResult:
+    def __init__(self, query):
+        self.query = query
+        self.rows = []
+        self.hit_stage = None # Stage that produced the rows
+        self.trace = []       # (step, result count, ms), in stage order
+        self.ignored = []     # Concurrent mode: lower-priority stages not waited for
+        self.wall_ms = 0.0
+
+    def summary(self):
+        steps = " -> ".join(f"{name} {count} ({ms:.1f} ms)" for name, count, ms in self.trace)
+        if self.ignored: steps += f" | ignored {', '.join(self.ignored)}"
+        return f"'{self.query}': {len(self.rows)} results via {self.hit_stage} | {steps} | total {self.wall_ms:.1f} ms"
+
+
+class SearchPipeline:
+    """
+    Sequential mode runs a stage only after the previous one missed.
+    Concurrent mode launches every stage at once on a small thread pool and takes
+    the first non-empty result in stage (priority) order, so a full miss costs about
+    the slowest stage instead of the sum of all stages.
+    """
+    def __init__(self, stages, concurrent=None, workers=None):
+        self.stages = list(stages)
+        self.concurrent = config.SEARCH_CONCURRENT if concurrent is None else concurrent
+        self.workers = workers if workers else config.SEARCH_WORKERS
+        self._executor = None
+
+    def stage_names(self):
+        return [s.name for s in self.stages]
+
+    def _run_stage(self, stage, query, skip):
+        """
+        Runs one stage and its refiners. Returns (rows, trace entries).
+        """
+        trace = []
+        t0 = time.perf_counter()
+        rows = stage.fn(query) or []
+        trace.append((stage.name, len(rows), (time.perf_counter() - t0) * 1000.0))
+        if not rows: return rows, trace
+
+        for name, refine in stage.refiners:
+            if name in skip: continue
+            t0 = time.perf_counter()
+            rows = refine(rows, query)
+            trace.append((name, len(rows), (time.perf_counter() - t0) * 1000.0))
+        return rows, trace
+
+    def search(self, query, skip=()):
+        """
+        Returns the first stage's non-empty result. 'skip' names stages or refiners to leave out.
+        """
+        stages = [s for s in self.stages if s.name not in skip]
+        t0 = time.perf_counter()
+        if self.concurrent and len(stages) > 1:
+            result = self._search_concurrent(query, stages, skip)
+        else:
+            result = PipelineResult(query)
+            for stage in stages:
+                rows, trace = self._run_stage(stage, query, skip)
+                result.trace.extend(trace)
+                if rows:
+                    result.rows, result.hit_stage = rows, stage.name
+                    break
+        result.wall_ms = (time.perf_counter() - t0) * 1000.0
+        return result
+
+    def _search_concurrent(self, query, stages, skip):
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search")
+        result = PipelineResult(query)
+        futures = [self._executor.submit(self._run_stage, stage, query, skip) for stage in stages]
+        for i, (stage, future) in enumerate(zip(stages, futures)):
+            rows, trace = future.result() # Waits only for this tier; higher tiers already missed
+            result.trace.extend(trace)
+            if rows:
+                result.rows, result.hit_stage = rows, stage.name
+                # Not-yet-started tiers are dropped; running ones finish in the background, unread
+                for later, pending in zip(stages[i + 1:], futures[i + 1:]):
+                    pending.cancel()
+                    result.ignored.append(later.name)
+                break
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def semantic_stage(semantic_fn):
+    """
+    Wraps semantic_fn(query) -> [(item_name, score)] as a stage returning inventory rows.
+    """
+    def run(query):
+        names = list(dict.fromkeys(name for name, score in semantic_fn(query)))
+        return db_manager.get_items_by_names(names)
+    return Stage("semantic", run)
+
+
+def build_pipeline(engine=None, semantic_fn=None, concurrent=None, phonetic=None):
+    """
+    engine "cascade": exact -> ranked (cutoff, critical tokens, strict numbers, fuzzy sort)
+                      -> fuzzy (edit-distance match over the whole catalogue)
+                      -> phonetic (sound-alike item words) -> semantic
+    engine "hybrid":  single fused BM25 + trigram + vector pass (hybrid_retrieval)
+    semantic_fn(query) -> [(item_name, score)]; None disables the vector side.
+    phonetic: a PhoneticIndex to share with the caller (one is built if omitted).
+    """
+    engine = engine if engine else config.SEARCH_ENGINE
+    if engine == "hybrid":
+        from hybrid_retrieval import HybridRetriever
+        vector_search = (lambda q, k: semantic_fn(q)[:k]) if semantic_fn else None
+        retriever = HybridRetriever(vector_search=vector_search)
+        return SearchPipeline([Stage("hybrid", lambda q: retriever.search(q).rows)], concurrent=False)
+
+    stages = [
+        Stage("exact", db_manager.search_items),
+        Stage("ranked", db_manager.search_items_ranked, refiners=[
+            ("cutoff", ranked_cutoff),
+            ("critical_tokens", filter_by_critical_tokens),
+            ("strict_numbers", filter_by_strict_numbers),
+            ("fuzzy_sort", fuzzy_sort),
+        ]),
+        Stage("fuzzy", FuzzyIndex().search_rows, refiners=[
+            ("strict_numbers", filter_by_strict_numbers),
+        ]),
+        Stage("phonetic", (phonetic if phonetic else PhoneticIndex()).search_rows, refiners=[
+            ("strict_numbers", filter_by_strict_numbers),
+        ]),
+    ]
+    if semantic_fn:
+        stages.append(semantic_stage(semantic_fn))
+    return SearchPipeline(stages, concurrent=concurrent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run inventory searches from plain text (no audio)")
+    parser.add_argument("query", nargs="*", help="Item text; omit for an interactive prompt")
+    parser.add_argument("--engine", choices=["cascade", "hybrid"], default=None, help="Default: config.SEARCH_ENGINE")
+    parser.add_argument("--semantic", action="store_true", help="Load the NLP model and semantic index")
+    parser.add_argument("--raw", action="store_true", help="Skip clean_entity_name (prefix/alias cleanup)")
+    parser.add_argument("--concurrent", action="store_true", help="Run all tiers at once")
+    args = parser.parse_args()
+
+    import mini_assistant
+    semantic_fn = None
+    if args.semantic:
+        from nlp_engine import IntentParser
+        nlp = IntentParser()
+        mini_assistant.build_semantic_index(nlp)
+        semantic_fn = lambda q: mini_assistant.semantic_search_inventory(q, nlp)
+
+    pipeline = build_pipeline(args.engine, semantic_fn, concurrent=True if args.concurrent else None)
+    mode = "concurrent" if pipeline.concurrent else "sequential"
+    print(f"Stages ({mode}): {' -> '.join(pipeline.stage_names())}")
+
+    def run(text):
+        item = text if args.raw else mini_assistant.clean_entity_name(text)
+        result = pipeline.search(item)
+        for row in result.rows[:20]:
+            print(f"  {row[0]:<55} qty {row[1]:<5} {row[2]!r}")
+        if len(result.rows) > 20:
+            print(f"  ... {len(result.rows) - 20} more")
+        print(result.summary())
+
+    if args.query:
+        run(" ".join(args.query))
+    else:
+        while True:
+            try:
+                text = input("\nsearch> ").strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if text: run(text)
+    pipeline.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import numpy as np
+import config
+from vector_index import normalize_rows
+
+# On-disk layout (config.SEMANTIC_INDEX_DIR):
+#   embeddings.f32  float32 matrix (capacity x dim), memory-mapped, rows L2-normalized
+#   meta.json       model name, dim, row count and per-row {name, hash, alive}
+EMB_FILE = "embeddings.f32"
+META_FILE = "meta.json"
+# Bump when the row format changes (2: rows stored pre-normalized)
+FORMAT_VERSION = 2
+
+
+def content_hash(name):
+    """
+    Per-row hash of the embedded text plus the model that produced it.
+    A renamed item or a model swap changes the hash, so the row is re-embedded.
+    """
+    return hashlib.sha1(f"{config.NLP_MODEL_NAME}\n{name}".encode("utf-8")).hexdigest()[:16]
+
+
+class PersistentSemanticIndex:
+    """
+    Item-name embedding matrix kept on disk between runs.
+    sync() re-embeds only new or renamed items, tombstones deleted ones,
+    and compacts the file once tombstones pass config.SEMANTIC_INDEX_COMPACT_RATIO.
+    """
+    def __init__(self, index_dir=None):
+        self.index_dir = index_dir if index_dir else config.SEMANTIC_INDEX_DIR
+        self.emb_path = os.path.join(self.index_dir, EMB_FILE)
+        self.meta_path = os.path.join(self.index_dir, META_FILE)
+        self.dim = None
+        self.capacity = 0
+        self.rows = []    # [{"name", "hash", "alive"}], one per used matrix row
+        self.matrix = None # np.memmap (capacity x dim)
+
+    # --- Storage ---
+    def _load(self):
+        """
+        Opens the existing index. Returns False if missing, corrupt or built by another model.
+        """
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.emb_path)):
+            return False
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model") != config.NLP_MODEL_NAME:
+                print(f"Semantic index was built with {meta.get('model')}. Rebuilding.")
+                return False
+            if meta.get("version") != FORMAT_VERSION:
+                print("Semantic index format changed. Rebuilding.")
+                return False
+            dim, capacity = int(meta["dim"]), int(meta["capacity"])
+            if os.path.getsize(self.emb_path) != capacity * dim * 4:
+                print("Semantic index file size mismatch. Rebuilding.")
+                return False
+            self.dim, self.capacity, self.rows = dim, capacity, meta["rows"]
+            self.matrix = np.memmap(self.emb_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            return True
+        except Exception as e:
+            print(f"Could not read semantic index ({e}). Rebuilding.")
+            return False
+
+    def _save_meta(self):
+        meta = {
+            "version": FORMAT_VERSION,
+            "model": config.NLP_MODEL_NAME,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "rows": self.rows,
+        }
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path) # Atomic: a crash never leaves half-written metadata
+
+    def _write_matrix(self, data, capacity):
+        """
+        Writes 'data' into a fresh file of the given capacity and swaps it in atomically.
+        """
+        tmp = self.emb_path + ".tmp"
+        new = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(capacity, self.dim))
+        if len(data):
+            new[:len(data)] = data
+        new.flush()
+        del new
+        self.matrix = None # Release the old mapping before replacing the file (Windows)
+        os.replace(tmp, self.emb_path)
+        self.capacity = capacity
+        self.matrix = np.memmap(self.emb_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _append(self, embeddings):
+        """
+        Appends rows, doubling the file capacity when full.
+        """
+        start = len(self.rows)
+        needed = start + len(embeddings)
+        if self.matrix is None or needed > self.capacity:
+            capacity = max(64, self.capacity)
+            while capacity < needed:
+                capacity *= 2
+            existing = np.array(self.matrix[:start]) if self.matrix is not None else np.zeros((0, self.dim), np.float32)
+            self._write_matrix(existing, capacity)
+        self.matrix[start:needed] = embeddings
+        self.matrix.flush()
+
+    # --- Public API ---
+    def sync(self, names, encode_fn):
+        """
+        Brings the index in line with the current inventory names.
+        encode_fn(list_of_names) -> (n x dim) array. Only called for new/renamed items.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        loaded = self._load()
+        if not loaded:
+            self.rows, self.capacity, self.matrix, self.dim = [], 0, None, None
+
+        wanted = {name: content_hash(name) for name in names}
+        live = {}
+        tombstoned = 0
+        for row in self.rows:
+            if not row["alive"]: continue
+            if wanted.get(row["name"]) == row["hash"]:
+                live[row["name"]] = row
+            else:
+                row["alive"] = False # Deleted or renamed
+                tombstoned += 1
+
+        missing = [name for name in names if name not in live]
+        if missing:
+            print(f"Embedding {len(missing)} new/changed items ({len(live)} reused from disk)...")
+            # Stored pre-normalized: cosine search is then a single matmul with no per-row work
+            embs = normalize_rows(encode_fn(missing))
+            if self.dim is None:
+                self.dim = embs.shape[1]
+            self._append(embs)
+            for name in missing:
+                self.rows.append({"name": name, "hash": wanted[name], "alive": True})
+        else:
+            print(f"Semantic index up to date ({len(live)} items loaded from disk).")
+
+        if tombstoned:
+            print(f"Tombstoned {tombstoned} deleted/renamed items.")
+        if self.tombstone_ratio() > config.SEMANTIC_INDEX_COMPACT_RATIO:
+            self.compact()
+        elif missing or tombstoned or not loaded:
+            self._save_meta()
+
+        return self.live_view()
+
+    def tombstone_ratio(self):
+        if not self.rows: return 0.0
+        dead = sum(1 for r in self.rows if not r["alive"])
+        return dead / len(self.rows)
+
+    def compact(self):
+        """
+        Rewrites the matrix with only live rows, reclaiming tombstoned space.
+        """
+        if self.dim is None: return
+        alive_idx = [i for i, r in enumerate(self.rows) if r["alive"]]
+        dead = len(self.rows) - len(alive_idx)
+        data = np.array(self.matrix[alive_idx]) if alive_idx else np.zeros((0, self.dim), np.float32)
+        capacity = max(64, 1 << max(0, len(alive_idx) - 1).bit_length())
+        self._write_matrix(data, capacity)
+        self.rows = [self.rows[i] for i in alive_idx]
+        self._save_meta()
+        print(f"Semantic index compacted: reclaimed {dead} rows.")
+
+    def fingerprint(self):
+        """
+        Identifies the live row set (order + content). Derived indexes cached on disk
+        (e.g. the ANN index) are only reused when this matches.
+        """
+        h = hashlib.sha1()
+        for r in self.rows:
+            if r["alive"]: h.update(r["hash"].encode("ascii"))
+        return h.hexdigest()
+
+    def live_view(self):
+        """
+        Returns (item_names, embeddings) for live rows (L2-normalized).
+        Without tombstones this is a zero-copy view of the memory map.
+        """
+        if self.matrix is None or not self.rows:
+            return [], np.zeros((0, self.dim or 0), np.float32)
+        n = len(self.rows)
+        if all(r["alive"] for r in self.rows):
+            return [r["name"] for r in self.rows], self.matrix[:n]
+        alive_idx = [i for i, r in enumerate(self.rows) if r["alive"]]
+        return [self.rows[i]["name"] for i in alive_idx], np.asarray(self.matrix[alive_idx])
@@ -0,0 +1,52 @@
+import sys
+import os
+
+# Add current dir to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alias_engine import AliasExpander
+
+# Queries that name an item already: generic aliases must not rewrite them
+UNCHANGED = [
+    "seven segment display",
+    "12v power supply",
+    "10k resistor",
+    "pir sensor",
+    "soldering iron tip",
+    "servo motor",
+    "raspberry pi",
+    "servo motor mg996r", # 'any' alias whose target is already in the phrase
+    "ni myrio",
+]
+
+# (query, expansion)
+EXPANDED = [
+    ("display", "lcd display"), # Whole-phrase alias
+    ("power supply", "variable power supply"),
+    ("pir", "sensor pir"),
+    ("soldering iron", "soldering station"),
+    ("10k pot", "10k potentiometer"), # Aliases marked 'any' also apply inside a phrase
+    ("red servo", "red servo motor"),
+    ("where is the dso", "where is the oscilloscope"),
+    ("dso tektronics", "oscilloscope tektronicross"),
+    ("solder ion 25w", "soldering iron 25w"),
+    ("lithium polymer battery", "lipo battery"),
+]
+
+
+def test_unchanged():
+    expander = AliasExpander()
+    for query in UNCHANGED:
+        assert expander.expand(query) == query, f"{query!r} -> {expander.expand(query)!r}"
+
+
+def test_expanded():
+    expander = AliasExpander()
+    for query, expected in EXPANDED:
+        assert expander.expand(query) == expected, f"{query!r} -> {expander.expand(query)!r}"
+
+
+if __name__ == "__main__":
+    test_unchanged()
+    test_expanded()
+    print("Alias tests passed.")
@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Add current dir to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+import config
+from test_llm_scoring import load_engine
+
+PREFIX = (
+    "<|start_header_id|>system<|end_header_id|>\n\n"
+    "You are an ASR Correction Assistant. Answer with the letter of the item only.<|eot_id|>"
+    "<|start_header_id|>user<|end_header_id|>\n\nCandidate List:\n0. None of these\n"
+)
+SUFFIXES = [
+    "A. Servo Motor\nB. Stepper Motor\n\nUser Audio Input: 'sevro'\nWhich item did they mean?<|eot_id|>"
+    "<|start_header_id|>assistant<|end_header_id|>\n\n",
+    "A. Breadboard\nB. Bread Toaster\nC. Jumper Wires\n\nUser Audio Input: 'bread bord'\n"
+    "Which item did they mean?<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n",
+]
+
+
+def next_token_logits(engine, suffix):
+    tokens = engine._prefill("test", PREFIX, suffix)
+    return tokens, engine._last_logits()
+
+
+def test_restored_prefix_matches_fresh_eval():
+    """
+    A prefix restored from the saved llama.cpp state must give the same next-token
+    logits as evaluating the whole prompt from scratch.
+    """
+    engine = load_engine()
+    saved = config.LLM_PREFIX_CACHE
+    try:
+        for suffix in SUFFIXES:
+            config.LLM_PREFIX_CACHE = False
+            fresh_tokens, fresh = next_token_logits(engine, suffix)
+            config.LLM_PREFIX_CACHE = True
+            next_token_logits(engine, suffix) # Saves the prefix state (first call only)
+            cached_tokens, cached = next_token_logits(engine, suffix) # Restores it
+            assert cached_tokens == fresh_tokens
+            assert int(cached.argmax()) == int(fresh.argmax())
+            assert np.allclose(cached, fresh, atol=1e-2), f"max diff {np.abs(cached - fresh).max():.4f}"
+        # Only KV data is kept per prefix (not the logits buffer): a few MB, not hundreds
+        assert all(len(state) < 64 * 1024 * 1024 for tokens, state in engine._prefixes.values())
+    finally:
+        config.LLM_PREFIX_CACHE = saved
+        engine.close()
+    print("Restored prefix gives the same next-token logits as a fresh eval.")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,66 @@
+import sys
+import os
+
+# Add current dir to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+import config
+from llm_engine import ChatEngine, _import_llama
+
+
+def load_engine():
+    """
+    The configured model, or a pytest skip when llama_cpp or the GGUF file is missing
+    (a Git LFS pointer is not a model).
+    """
+    if _import_llama() is None:
+        pytest.skip("llama_cpp is not installed")
+    if not os.path.exists(config.LLM_MODEL_PATH) or os.path.getsize(config.LLM_MODEL_PATH) < 1024 * 1024:
+        pytest.skip(f"model not available: {config.LLM_MODEL_PATH}")
+    engine = ChatEngine()
+    if not engine.enabled:
+        pytest.skip("model did not load")
+    return engine
+
+
+def test_last_logits_match_greedy_token():
+    """
+    _last_logits() must be the real next-token distribution: its argmax is the token
+    greedy sampling picks after the same prompt.
+    """
+    engine = load_engine()
+    try:
+        tokens = engine.llm.tokenize(b"The capital of France is", add_bos=True, special=True)
+        engine.llm.reset()
+        engine.llm.eval(tokens)
+        logits = engine._last_logits()
+        assert logits.shape == (engine.llm.n_vocab(),)
+        greedy = next(iter(engine.llm.generate(tokens, temp=0.0)))
+        assert int(logits.argmax()) == greedy
+    finally:
+        engine.close()
+
+
+def test_choose_candidate_obvious_cases():
+    engine = load_engine()
+    try:
+        cases = [
+            ("servo motor", ["Stepper Motor", "Servo Motor", "Breadboard"], 1),
+            ("bread bord", ["Glue Gun", "Multimeter", "Breadboard"], 2),
+            ("where is the oscilloscope", ["Soldering Iron", "Oscilloscope  Tektronix"], 1),
+        ]
+        for text, candidates, expected in cases:
+            index, confidence = engine.choose_candidate(text, candidates)
+            assert index == expected, f"{text!r}: got {index} ({confidence:.2f})"
+        # The 10th candidate (label J) can be chosen
+        candidates = [f"Resistor {v}k" for v in range(1, 10)] + ["Servo Motor"]
+        index, confidence = engine.choose_candidate("servo motor", candidates)
+        assert index == 9, f"got {index} ({confidence:.2f})"
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Add current dir to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from phonetic_index import PhoneticIndex
+
+NAMES = [
+    "Micro Servo  9grams",
+    "Servo  MG996R and Similar",
+    "Servo  Single Phase Planetory Gear  24V",
+    "Soil Survey Instrument",
+    "Lidashion Battery  48V 24 AH  Ampere",
+    "Lead Acid Battery  12V  7 AH  20C",
+    "DC Motor  Plastic Gear Bocross  100 RPM",
+    "DC Motor  Plastic Gear Bocross  1000 RPM",
+    "DC Motor  L Shaped Metal Gear Bocross  100RPM",
+    "Soldering Iron  25W  Soldron",
+    "Breadboard  400 points",
+    "Cable  RMC",
+    "SBC  Jetson Nano  P3450",
+    "Development Board  Arduino UNO",
+]
+
+# (query, names the first results must be, in any order)
+RESOLVED = [
+    ("sevr", {"Micro Servo  9grams", "Servo  MG996R and Similar", "Servo  Single Phase Planetory Gear  24V"}),
+    ("dc motor 100 rqm", {"DC Motor  Plastic Gear Bocross  100 RPM", "DC Motor  L Shaped Metal Gear Bocross  100RPM"}),
+    ("solder ion", {"Soldering Iron  25W  Soldron"}),
+    ("twelve volt battery", {"Lead Acid Battery  12V  7 AH  20C"}),
+    ("twenty four volt servo", {"Servo  Single Phase Planetory Gear  24V"}),
+    ("bread bord", {"Breadboard  400 points"}),
+    ("kable", {"Cable  RMC"}),
+    ("jetson nano", {"SBC  Jetson Nano  P3450"}),
+]
+
+# (query, names that must not be returned)
+REJECTED = [
+    ("twenty four volt battery", {"Lidashion Battery  48V 24 AH  Ampere"}), # 24 is amp hours there
+    ("servo", {"Soil Survey Instrument"}), # spelled as in the catalogue, so no sound-alikes
+    ("dc motor 100 rpm", {"DC Motor  Plastic Gear Bocross  1000 RPM"}),
+    ("arduino nano", {"Development Board  Arduino UNO"}),
+]
+
+
+def test_resolved():
+    index = PhoneticIndex(NAMES)
+    for query, expected in RESOLVED:
+        found = index.correct(query)
+        print(f"{query!r} -> {found}")
+        assert set(found[:len(expected)]) == expected, query
+
+
+def test_rejected():
+    index = PhoneticIndex(NAMES)
+    for query, wrong in REJECTED:
+        found = index.search(query)
+        print(f"{query!r} -> {found}")
+        assert not wrong & set(found), query
+
+
+def test_commands_not_items():
+    index = PhoneticIndex(NAMES)
+    for query in ["no", "stop", "yes please", "xyz"]:
+        assert index.correct(query) == [], query
+
+
+if __name__ == "__main__":
+    test_resolved()
+    test_rejected()
+    test_commands_not_items()
+    print("Phonetic tests passed.")
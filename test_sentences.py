@@ -0,0 +1,34 @@
+import sys
+import os
+
+# Add current dir to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tts_engine import split_sentences
+
+
+def split(text, piece=3):
+    # Streamed in small pieces, like LLM tokens
+    return list(split_sentences(text[i:i + piece] for i in range(0, len(text), piece)))
+
+
+def test_no_before_number():
+    assert split("It is in drawer No. 5 of the red rack. Anything else?") == [
+        "It is in drawer No. 5 of the red rack.", "Anything else?"]
+
+
+def test_no_ends_sentence():
+    assert split("Do we have any left? The answer is no. Try the blue shelf instead.") == [
+        "Do we have any left?", "The answer is no.", "Try the blue shelf instead."]
+
+
+def test_abbreviation():
+    assert split("Use a small motor, e.g. the 100 RPM one. It is on shelf B.") == [
+        "Use a small motor, e.g. the 100 RPM one.", "It is on shelf B."]
+
+
+if __name__ == "__main__":
+    test_no_before_number()
+    test_no_ends_sentence()
+    test_abbreviation()
+    print("Sentence split tests passed.")
@@ -0,0 +1,74 @@
+import sys
+import os
+
+# Add current dir to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import config
+from asr_engine import Endpointer
+
+RATE = 16000
+
+
+def utterance(noise, speech_from=1.0, speech_sec=1.5, total_sec=4.0, hum=False, seed=0):
+    """
+    Background noise (hiss, or a low 100 Hz hum when 'hum'), plus syllable-modulated
+    voiced speech with short gaps between words.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(total_sec * RATE)) / RATE
+    if hum:
+        audio = noise * np.sqrt(2) * np.sin(2 * np.pi * 100 * t)
+    else:
+        audio = noise * rng.standard_normal(len(t))
+    voiced = (t >= speech_from) & (t < speech_from + speech_sec)
+    syllables = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * (t - speech_from)) # 3 syllables/s, dips to 0 between
+    speech = 0.25 * (np.sin(2 * np.pi * 150 * t) + 0.5 * np.sin(2 * np.pi * 450 * t)) * syllables
+    return (audio + voiced * speech).astype(np.float32)
+
+
+def run(audio, chunk=1600):
+    ep = Endpointer(RATE, config.AUDIO_VAD_THRESHOLD, config.AUDIO_VAD_SILENCE_SEC)
+    stopped = None
+    for i in range(0, len(audio), chunk):
+        if ep.process(audio[i:i + chunk]) and stopped is None:
+            stopped = ep.seconds(ep.frames)
+    return ep, stopped
+
+
+def check(label, audio, speech_from=1.0, speech_sec=1.5):
+    ep, stopped = run(audio)
+    print(f"{label}: speech {ep.seconds(ep.speech_start or 0):.2f}-{ep.seconds(ep.speech_end or 0):.2f}s, "
+          f"stopped at {stopped}")
+    assert ep.speech_start is not None, "speech not detected"
+    assert abs(ep.seconds(ep.speech_start) - speech_from) < 0.2
+    # The whole utterance is kept (not cut mid-sentence) and the endpoint fires after it
+    assert abs(ep.seconds(ep.speech_end) - (speech_from + speech_sec)) < 0.2
+    assert stopped is not None and stopped < speech_from + speech_sec + config.AUDIO_VAD_SILENCE_SEC + 0.3
+
+
+def test_quiet_room():
+    check("quiet", utterance(0.002))
+
+
+def test_moderate_hiss():
+    check("hiss 0.02", utterance(0.02))
+
+
+def test_hum_above_threshold():
+    # Steady low-frequency noise louder than AUDIO_VAD_THRESHOLD must be learned as noise
+    check("hum 0.03", utterance(0.03, hum=True))
+
+
+def test_noise_only():
+    ep, stopped = run(utterance(0.03, speech_sec=0.0, hum=True))
+    assert ep.speech_start is None and stopped is None
+
+
+if __name__ == "__main__":
+    test_quiet_room()
+    test_moderate_hiss()
+    test_hum_above_threshold()
+    test_noise_only()
+    print("VAD tests passed.")
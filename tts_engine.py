@@ -1,9 +1,40 @@
 import config
 import os
-import torch
+import re
 import subprocess
-import soundfile as sf
-import sounddevice as sd
+import time
+# Heavy/native deps (torch, TTS, sounddevice, soundfile) are imported where used,
+# so Piper mode never loads PyTorch.
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace, or a line break.
+# A decimal ("3.5") has no whitespace after the dot; abbreviations are skipped explicitly.
+_SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+_ABBREVIATIONS = {"e.g.", "i.e.", "etc.", "vs.", "approx.", "mr.", "mrs.", "dr.", "st."}
+# Abbreviations only before a number ("No. 5"); otherwise the word ends the sentence ("No. It is...")
+_NUMBER_ABBREVIATIONS = {"no."}
+
+def split_sentences(chunks, min_chars=12):
+    """
+    Regroups streamed text pieces (LLM tokens) into sentences as soon as each one
+    is complete. Pieces shorter than min_chars are merged into the next sentence.
+    """
+    buf = ""
+    for chunk in chunks:
+        buf += chunk
+        start = 0
+        for m in _SENTENCE_END.finditer(buf):
+            sentence = buf[start:m.end()].strip()
+            words = sentence.split()
+            if words and words[-1].lower() in _ABBREVIATIONS: continue
+            if words and words[-1].lower() in _NUMBER_ABBREVIATIONS:
+                if m.end() == len(buf): break # Next word not streamed yet
+                if buf[m.end()].isdigit(): continue
+            if len(sentence) >= min_chars:
+                yield sentence
+                start = m.end()
+        buf = buf[start:]
+    if buf.strip():
+        yield buf.strip()
 
 class Speaker:
     def __init__(self):
@@ -33,6 +64,7 @@ class Speaker:
 
         else:
             # XTTS (High Quality)
+            import torch
             from TTS.api import TTS
             device = "cuda" if torch.cuda.is_available() else "cpu"
             self.tts = TTS(model_name=config.TTS_MODEL_NAME).to(device)
@@ -42,6 +74,7 @@ class Speaker:
         if hasattr(config, 'AUDIO_OUTPUT_KEYWORD') and config.AUDIO_OUTPUT_KEYWORD:
              try:
                  print(f"Searching for Audio Output: {config.AUDIO_OUTPUT_KEYWORD}...")
+                 import sounddevice as sd
                  devices = sd.query_devices()
                  for i, dev in enumerate(devices):
                      if dev['max_output_channels'] > 0:
@@ -105,10 +138,43 @@ class Speaker:
             except Exception as e:
                 print(f"XTTS Error: {e}")
 
+    def speak_stream(self, chunks, on_first_sentence=None):
+        """
+        Speaks text while it is still being produced: 'chunks' (e.g. ChatEngine.stream_reply)
+        is consumed on a background thread and every completed sentence is spoken as
+        soon as it is ready. Returns the full text.
+        """
+        import queue
+        import threading
+        sentences = queue.Queue()
+        spoken = []
+
+        def produce():
+            try:
+                for sentence in split_sentences(chunks):
+                    sentences.put(sentence)
+            finally:
+                sentences.put(None) # End of stream (also after an error)
+
+        threading.Thread(target=produce, name="tts-stream", daemon=True).start()
+        start = time.time()
+        while True:
+            sentence = sentences.get()
+            if sentence is None: break
+            if not spoken:
+                print(f"TTS: first sentence ready after {time.time() - start:.2f}s")
+                if on_first_sentence: on_first_sentence()
+            print(f"Assistant: {sentence}")
+            spoken.append(sentence)
+            self.speak(sentence)
+        return " ".join(spoken)
+
     def play_audio(self, file_path):
         try:
             # Cross-platform storage playback using sounddevice (PortAudio)
             # Uses cached target_device_id from __init__
+            import sounddevice as sd
+            import soundfile as sf
             data, fs = sf.read(file_path)
             sd.play(data, fs, device=self.target_device_id)
             sd.wait()
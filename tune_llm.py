@@ -0,0 +1,211 @@
+"""
+One-shot llama.cpp runtime tuning on the device itself.
+
+Library defaults for threads, n_batch, mmap/mlock and the KV-cache type are far
+from optimal on a 4-core ARM board. This loads the model once per setting and
+times a correction-sized prompt (prefill) plus a short generation. Settings are
+tuned one axis at a time: threads, then n_batch, KV type, and memory mapping.
+Each axis keeps the setting with the lowest worst-case latency over the repeats.
+A setting whose repeats spread by more than --max-spread counts as unstable and
+only wins if nothing else is stable.
+
+The result is saved per model file and host in config.LLM_TUNING_PATH, and
+ChatEngine applies it at startup.
+
+Usage:
+    python tune_llm.py                          # config.LLM_MODEL_PATH
+    python tune_llm.py --model models/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf
+    python tune_llm.py --repeat 5 --gen 32
+    python tune_llm.py --dry-run                # print the result, do not save
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import time
+from datetime import datetime
+import config
+from llm_engine import _import_llama, llama_kwargs
+
+# About the size of a correct_query prompt (system rules + 10 candidates + transcript)
+REFERENCE_PROMPT = (
+    "<|start_header_id|>system<|end_header_id|>\n\n"
+    "You are an ASR Correction Assistant. Your job is to match a noisy audio transcript to the correct item from a list.\n"
+    "Rules:\n"
+    "1. Output ONLY the exact Item Name from the list. No explanations.\n"
+    "2. If the user input is a generic variation (e.g. 'Servo' vs 'Servo MG996R'), output the list item.\n"
+    "3. If NO reasonable match exists, validly return 'None'.\n<|eot_id|>"
+    "<|start_header_id|>user<|end_header_id|>\n\n"
+    "Candidate List:\n"
+    "1. Soldering Iron  25W  Soldron\n2. Soldering Iron  MAcrosscross  60W\n3. Soldering Station  Weller\n"
+    "4. Soldering Stand\n5. Soldering  Lead  50g\n6. Solder Wire  Flux Core\n7. Desoldering Pump\n"
+    "8. Hot Air Gun  Rework Station\n9. Glue Gun  60W\n10. Heat Shrink Tube  Kit\n\n"
+    "User Audio Input: 'where is the solder ion twenty five watt'\n"
+    "Which item did they mean?<|eot_id|>"
+    "<|start_header_id|>assistant<|end_header_id|>\n\n"
+)
+
+DEFAULTS = {"n_threads": os.cpu_count() or 4, "n_batch": 512, "use_mmap": True, "use_mlock": False, "kv_type": "f16"}
+
+
+def measure_speed(llm, prompt_tokens, n_gen):
+    """
+    Prefill of 'prompt_tokens' from an empty cache, then up to n_gen greedy tokens.
+    """
+    llm.reset()
+    t0 = time.perf_counter()
+    llm.eval(prompt_tokens)
+    prefill_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n = 0
+    eos = llm.token_eos()
+    # generate() finds the prompt in the KV cache and only re-evaluates its last token
+    for token in llm.generate(prompt_tokens, temp=0.0):
+        n += 1
+        if n >= n_gen or token == eos: break
+    gen_s = time.perf_counter() - t0
+    return {
+        "prefill_s": prefill_s,
+        "gen_s": gen_s,
+        "gen_tokens": n,
+        "prefill_tps": len(prompt_tokens) / prefill_s if prefill_s else 0.0,
+        "gen_tps": n / gen_s if gen_s else 0.0,
+    }
+
+
+def run_trial(model_path, params, n_gen, repeat):
+    """
+    Loads the model with 'params' and times the reference workload 'repeat' times.
+    """
+    Llama = _import_llama()
+    trial = {"params": dict(params), "ok": False}
+    llm = None
+    try:
+        t0 = time.perf_counter()
+        llm = Llama(model_path=model_path, n_ctx=config.LLM_CONTEXT_WINDOW,
+                    n_gpu_layers=config.LLM_GPU_LAYERS, verbose=False, **llama_kwargs(params))
+        trial["load_s"] = time.perf_counter() - t0
+        tokens = llm.tokenize(REFERENCE_PROMPT.encode("utf-8"), add_bos=True, special=True)
+        measure_speed(llm, tokens, 2) # Warm-up (page faults, thread pool start)
+        runs = [measure_speed(llm, tokens, n_gen) for _ in range(repeat)]
+    except Exception as e:
+        trial["error"] = str(e)
+        return trial
+    finally:
+        if llm is not None:
+            close = getattr(llm, "close", None)
+            if callable(close): close()
+            del llm
+            gc.collect()
+
+    latencies = [r["prefill_s"] + r["gen_s"] for r in runs]
+    trial.update({
+        "ok": True,
+        "prompt_tokens": len(tokens),
+        "latency_s": max(latencies), # Worst case: a lucky run should not win
+        "spread": (max(latencies) - min(latencies)) / min(latencies),
+        "prefill_tps": min(r["prefill_tps"] for r in runs),
+        "gen_tps": min(r["gen_tps"] for r in runs),
+    })
+    return trial
+
+
+def pick(trials, max_spread):
+    ok = [t for t in trials if t["ok"]]
+    if not ok: return None
+    stable = [t for t in ok if t["spread"] <= max_spread]
+    return min(stable if stable else ok, key=lambda t: t["latency_s"])
+
+
+def tune(model_path, n_gen, repeat, max_spread, max_threads):
+    threads = list(range(1, max_threads + 1))
+    axes = [
+        ("n_threads", [{"n_threads": n} for n in threads]),
+        ("n_batch", [{"n_batch": b} for b in (32, 64, 128, 256, 512)]),
+        ("kv_type", [{"kv_type": k} for k in ("f16", "q8_0")]),
+        ("memory", [{"use_mmap": True, "use_mlock": False}, {"use_mmap": True, "use_mlock": True},
+                    {"use_mmap": False, "use_mlock": False}]),
+    ]
+    best_params = dict(DEFAULTS, n_threads=min(DEFAULTS["n_threads"], max_threads))
+    all_trials = []
+    best = None
+    for axis, options in axes:
+        print(f"\n--- {axis} ---")
+        trials = []
+        for option in options:
+            params = dict(best_params, **option)
+            trial = run_trial(model_path, params, n_gen, repeat)
+            trials.append(trial)
+            label = ", ".join(f"{k}={v}" for k, v in option.items())
+            if trial["ok"]:
+                print(f"{label:<32} load {trial['load_s']:5.2f}s  prefill {trial['prefill_tps']:7.1f} tok/s  "
+                      f"gen {trial['gen_tps']:5.1f} tok/s  worst {trial['latency_s']:.2f}s  spread {trial['spread']:.0%}")
+            else:
+                print(f"{label:<32} FAILED: {trial['error']}")
+        all_trials.extend(trials)
+        winner = pick(trials, max_spread)
+        if winner is None:
+            print(f"Every {axis} setting failed; keeping {best_params}")
+            continue
+        best_params = winner["params"]
+        best = winner
+    return best, all_trials
+
+
+def save(model_path, best, trials, path):
+    tuning = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            tuning = json.load(f)
+    tuning[os.path.basename(model_path)] = {
+        "params": best["params"],
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "tuned_at": datetime.now().isoformat(timespec="seconds"),
+        "metrics": {k: best[k] for k in ("load_s", "prompt_tokens", "prefill_tps", "gen_tps", "latency_s", "spread")},
+        "trials": len(trials),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune llama.cpp threads, n_batch, KV type and mmap/mlock on this device")
+    parser.add_argument("--model", default=config.LLM_MODEL_PATH, help="GGUF file (default: config.LLM_MODEL_PATH)")
+    parser.add_argument("--gen", type=int, default=16, help="Tokens generated per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per setting")
+    parser.add_argument("--max-spread", type=float, default=0.25, help="Max (worst-best)/best latency for a stable setting")
+    parser.add_argument("--max-threads", type=int, default=os.cpu_count() or 4, help="Highest thread count tried")
+    parser.add_argument("--dry-run", action="store_true", help="Do not write config.LLM_TUNING_PATH")
+    args = parser.parse_args()
+
+    if _import_llama() is None: return
+    if not os.path.exists(args.model):
+        print(f"Model not found: {args.model}")
+        return
+
+    print(f"Tuning {os.path.basename(args.model)} on {platform.node()} ({os.cpu_count()} CPUs)")
+    baseline = run_trial(args.model, DEFAULTS, args.gen, args.repeat)
+    best, trials = tune(args.model, args.gen, args.repeat, args.max_spread, args.max_threads)
+    if best is None:
+        print("\nNo setting could be loaded.")
+        return
+
+    print(f"\nBest: {best['params']}")
+    if baseline["ok"]:
+        print(f"Worst-case latency {baseline['latency_s']:.2f}s (defaults) -> {best['latency_s']:.2f}s | "
+              f"prefill {baseline['prefill_tps']:.1f} -> {best['prefill_tps']:.1f} tok/s | "
+              f"gen {baseline['gen_tps']:.1f} -> {best['gen_tps']:.1f} tok/s")
+    if args.dry_run:
+        return
+    save(args.model, best, trials, config.LLM_TUNING_PATH)
+    print(f"Saved to {config.LLM_TUNING_PATH} (ChatEngine loads it at startup).")
+
+
+if __name__ == "__main__":
+    main()
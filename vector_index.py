@@ -0,0 +1,326 @@
+import os
+import numpy as np
+import config
+
+
+def normalize_rows(x):
+    """
+    L2-normalizes rows so a dot product equals cosine similarity.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    if x.ndim == 1: x = x.reshape(1, -1)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def top_k(scores, k):
+    """
+    Indices of the k largest scores, best first. argpartition keeps this O(n).
+    """
+    k = min(k, len(scores))
+    if k <= 0: return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def kmeans(x, n_clusters, iters=10, seed=0, chunk=8192):
+    """
+    Plain Lloyd's k-means in NumPy (squared L2). Assignment is chunked so the
+    distance matrix never exceeds chunk x n_clusters floats.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    n_clusters = min(n_clusters, n)
+    centroids = x[rng.choice(n, n_clusters, replace=False)].copy()
+    assign = np.zeros(n, dtype=np.int64)
+
+    for _ in range(iters):
+        c_sq = (centroids ** 2).sum(1)
+        for start in range(0, n, chunk):
+            block = x[start:start + chunk]
+            # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+            assign[start:start + chunk] = np.argmin(c_sq[None, :] - 2.0 * block @ centroids.T, axis=1)
+
+        # Per-cluster means via sort + reduceat (much faster than np.add.at)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = counts == 0
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        centroids[~empty] = sums / counts[~empty, None].astype(np.float32)
+        if empty.any():
+            # Re-seed dead clusters from random points
+            centroids[empty] = x[rng.choice(n, int(empty.sum()), replace=False)]
+
+    return centroids.astype(np.float32), assign
+
+
+def assign_nearest(x, centroids, chunk=8192):
+    c_sq = (centroids ** 2).sum(1)
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        out[start:start + chunk] = np.argmin(c_sq[None, :] - 2.0 * block @ centroids.T, axis=1)
+    return out
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search: one matmul against the normalized matrix, then top-k.
+    """
+    kind = "exact"
+
+    def __init__(self):
+        self.vectors = None
+
+    def build(self, embeddings, normalized=False):
+        """
+        normalized=True: rows are already unit length (PersistentSemanticIndex), so the
+        caller's array (e.g. a memmap) is used as-is with no copy.
+        """
+        if normalized:
+            self.vectors = np.asarray(embeddings, dtype=np.float32)
+        else:
+            self.vectors = normalize_rows(embeddings)
+        return self
+
+    def __len__(self):
+        return 0 if self.vectors is None else len(self.vectors)
+
+    def search(self, query, k=5):
+        """
+        Returns (scores, indices), best first.
+        """
+        if not len(self): return np.zeros(0, np.float32), np.zeros(0, np.int64)
+        q = normalize_rows(query)[0]
+        scores = self.vectors @ q
+        idx = top_k(scores, k)
+        return scores[idx], idx
+
+    def memory_bytes(self):
+        return 0 if self.vectors is None else self.vectors.nbytes
+
+
+class QuantizedIndex:
+    """
+    Exact-scan cosine search over a compressed matrix: int8 with one scale per vector
+    (4x smaller than float32) or float16 (2x). Scores are dot products of the quantized
+    rows with the query; the best 'rescore' candidates can be re-scored in full precision
+    from the raw (memory-mapped) rows.
+    """
+    kind = "quantized"
+
+    def __init__(self, precision=None, rescore=None, chunk=16384):
+        self.precision = precision if precision else config.SEMANTIC_INDEX_PRECISION
+        if self.precision not in ("int8", "float16"):
+            raise ValueError(f"Unsupported precision '{self.precision}' (expected int8 or float16)")
+        self.rescore = config.SEMANTIC_RESCORE if rescore is None else rescore
+        self.chunk = chunk
+        self.codes = None  # (n, dim) int8 or float16
+        self.scales = None # (n,) float32, int8 only
+        self.vectors = None
+
+    def __len__(self):
+        return 0 if self.codes is None else len(self.codes)
+
+    def build(self, embeddings, keep_vectors=True):
+        x = normalize_rows(embeddings)
+        if self.precision == "int8":
+            # Symmetric per-vector scale: largest component maps to +-127
+            self.scales = np.abs(x).max(axis=1) / 127.0
+            self.scales[self.scales == 0] = 1.0
+            self.codes = np.clip(np.rint(x / self.scales[:, None]), -127, 127).astype(np.int8)
+            self.scales = self.scales.astype(np.float32)
+        else:
+            self.codes = x.astype(np.float16)
+        # Reference to the caller's rows for optional re-scoring (a memmap stays on disk)
+        self.vectors = embeddings if keep_vectors else None
+        return self
+
+    def _scores(self, q):
+        """
+        Quantized dot products, chunked so the float32 upcast stays small.
+        """
+        n = len(self.codes)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.chunk):
+            block = self.codes[start:start + self.chunk].astype(np.float32)
+            scores[start:start + self.chunk] = block @ q
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query, k=5, rescore=None):
+        """
+        Returns (scores, indices), best first.
+        """
+        if not len(self): return np.zeros(0, np.float32), np.zeros(0, np.int64)
+        rescore = self.rescore if rescore is None else rescore
+        q = normalize_rows(query)[0]
+        scores = self._scores(q)
+
+        if rescore and self.vectors is not None:
+            cand = top_k(scores, max(k, rescore))
+            exact = normalize_rows(self.vectors[cand]) @ q
+            best = top_k(exact, k)
+            return exact[best], cand[best]
+
+        idx = top_k(scores, k)
+        return scores[idx], idx
+
+    def memory_bytes(self):
+        if self.codes is None: return 0
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+
+class IVFPQIndex:
+    """
+    Approximate cosine search: inverted file (k-means coarse lists) with product-quantized residuals.
+    Each vector costs n_subvectors bytes instead of dim*4. Queries scan only 'nprobe' lists using a
+    per-query lookup table, then optionally re-rank the best 'rerank' candidates with exact vectors.
+    """
+    kind = "ivfpq"
+
+    def __init__(self, n_lists=None, n_subvectors=None, nprobe=None, rerank=None, train_size=65536, seed=0):
+        self.n_lists = n_lists
+        self.n_subvectors = n_subvectors if n_subvectors else config.ANN_PQ_SUBVECTORS
+        self.nprobe = nprobe if nprobe else config.ANN_NPROBE
+        self.rerank = config.ANN_RERANK if rerank is None else rerank
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids = None # (n_lists, dim)
+        self.codebooks = None # (m, 256, dsub)
+        self.codes = None     # (n, m) uint8, grouped by list
+        self.ids = None       # (n,) original row of each code
+        self.offsets = None   # (n_lists + 1,) list boundaries into codes/ids
+        self.vectors = None   # Optional raw rows for re-ranking (may be a memmap; normalized on the fly)
+
+    def __len__(self):
+        return 0 if self.ids is None else len(self.ids)
+
+    def build(self, embeddings, keep_vectors=True):
+        x = normalize_rows(embeddings)
+        n, dim = x.shape
+        m = self.n_subvectors
+        if dim % m != 0:
+            raise ValueError(f"dim {dim} is not divisible by n_subvectors {m}")
+        n_lists = self.n_lists if self.n_lists else max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(self.seed)
+        sample = x[rng.choice(n, min(n, self.train_size), replace=False)]
+
+        # 1. Coarse quantizer
+        self.centroids, _ = kmeans(sample, n_lists, seed=self.seed)
+        assign = assign_nearest(x, self.centroids)
+
+        # 2. Product quantizer on residuals (256 codes per sub-space -> uint8)
+        dsub = dim // m
+        sample_res = sample - self.centroids[assign_nearest(sample, self.centroids)]
+        ks = min(256, len(sample))
+        self.codebooks = np.zeros((m, ks, dsub), dtype=np.float32)
+        for j in range(m):
+            self.codebooks[j], _ = kmeans(sample_res[:, j * dsub:(j + 1) * dsub], ks, iters=8, seed=self.seed + j)
+
+        codes = np.empty((n, m), dtype=np.uint8)
+        chunk = 65536
+        for start in range(0, n, chunk):
+            res = x[start:start + chunk] - self.centroids[assign[start:start + chunk]]
+            for j in range(m):
+                codes[start:start + chunk, j] = assign_nearest(res[:, j * dsub:(j + 1) * dsub], self.codebooks[j])
+
+        # 3. Group by list for contiguous scans
+        order = np.argsort(assign, kind="stable")
+        self.codes = codes[order]
+        self.ids = order.astype(np.int64)
+        counts = np.bincount(assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        # Keep a reference to the caller's rows (no extra copy; a memmap stays on disk)
+        self.vectors = embeddings if keep_vectors else None
+        return self
+
+    def search(self, query, k=5, nprobe=None, rerank=None):
+        """
+        Returns (scores, indices), best first. Scores are approximate unless re-ranked.
+        """
+        if not len(self): return np.zeros(0, np.float32), np.zeros(0, np.int64)
+        nprobe = min(nprobe if nprobe else self.nprobe, len(self.centroids))
+        rerank = self.rerank if rerank is None else rerank
+        q = normalize_rows(query)[0]
+        m, ks, dsub = self.codebooks.shape
+
+        coarse = self.centroids @ q
+        lists = top_k(coarse, nprobe)
+
+        # q . (c + r_hat) = q.c + sum_j LUT[j, code_j]
+        lut = np.einsum("jkd,jd->jk", self.codebooks, q.reshape(m, dsub))
+        spans = [(self.offsets[l], self.offsets[l + 1]) for l in lists]
+        sel = np.concatenate([np.arange(a, b) for a, b in spans]) if spans else np.zeros(0, np.int64)
+        if not len(sel): return np.zeros(0, np.float32), np.zeros(0, np.int64)
+        base = np.concatenate([np.full(b - a, coarse[l], np.float32) for (a, b), l in zip(spans, lists)])
+        approx = base + lut[np.arange(m)[None, :], self.codes[sel]].sum(1)
+
+        if rerank and self.vectors is not None:
+            cand = top_k(approx, max(k, rerank))
+            cand_ids = self.ids[sel[cand]]
+            exact = normalize_rows(self.vectors[cand_ids]) @ q
+            best = top_k(exact, k)
+            return exact[best], cand_ids[best]
+
+        best = top_k(approx, k)
+        return approx[best], self.ids[sel[best]]
+
+    def memory_bytes(self):
+        """
+        Index structures only (re-rank vectors excluded: they can stay memory-mapped on disk).
+        """
+        if self.codes is None: return 0
+        return self.codes.nbytes + self.ids.nbytes + self.centroids.nbytes + self.codebooks.nbytes + self.offsets.nbytes
+
+    def save(self, path, fingerprint=""):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, centroids=self.centroids, codebooks=self.codebooks, codes=self.codes,
+                 ids=self.ids, offsets=self.offsets, fingerprint=np.array(fingerprint))
+        os.replace(tmp, path)
+
+    def load(self, path, fingerprint="", vectors=None):
+        """
+        Loads a saved index if its fingerprint matches. Returns False if stale or missing.
+        """
+        if not os.path.exists(path): return False
+        try:
+            with np.load(path) as data:
+                if str(data["fingerprint"]) != fingerprint: return False
+                self.centroids = data["centroids"]
+                self.codebooks = data["codebooks"]
+                self.codes = data["codes"]
+                self.ids = data["ids"]
+                self.offsets = data["offsets"]
+        except Exception as e:
+            print(f"Could not load ANN index ({e}). Rebuilding.")
+            return False
+        self.vectors = vectors
+        return True
+
+
+def make_vector_index(n_items, kind=None, precision=None):
+    """
+    Picks the index implementation. "auto" switches to IVF-PQ once the catalogue
+    reaches config.ANN_MIN_ITEMS; below that an exact scan is both fast and exact.
+    Exact scans use config.SEMANTIC_INDEX_PRECISION (float32, float16 or int8).
+    """
+    kind = kind if kind else config.VECTOR_INDEX
+    precision = precision if precision else config.SEMANTIC_INDEX_PRECISION
+    if kind == "auto":
+        kind = "ivfpq" if n_items >= config.ANN_MIN_ITEMS else "exact"
+    if kind == "ivfpq":
+        return IVFPQIndex()
+    if kind == "exact":
+        if precision == "float32":
+            return ExactIndex()
+        return QuantizedIndex(precision)
+    raise ValueError(f"Unknown VECTOR_INDEX '{kind}' (expected exact, ivfpq or auto)")